@@ -0,0 +1,205 @@
+import asyncio
+import math
+import threading
+import time
+from flask import g, jsonify, request
+from metrics import current_request_stats, registry
+
+WAIT_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5)
+
+shed_total = registry.counter(
+    'app_admission_shed_total', 'Requests rejected by admission control.', ('class', 'route', 'reason'))
+admission_wait = registry.histogram(
+    'app_admission_wait_seconds', 'Time admitted requests waited for a slot.', ('class',), WAIT_BUCKETS)
+
+
+class PriorityClass:
+    # share: the fraction of the concurrency limit the class may fill on its own, so
+    # lower classes always leave headroom for higher ones. queue: how many requests may
+    # wait for a slot; max_wait: how long one waits before it is shed.
+
+    def __init__(self, name, priority, share=1.0, queue=32, max_wait=1.0):
+        self.name = name
+        self.priority = priority
+        self.share = share
+        self.queue = queue
+        self.max_wait = max_wait
+        self.in_flight = 0
+        self.waiting = 0
+
+
+class Shed(Exception):
+    def __init__(self, status, reason, retry_after):
+        self.status = status
+        self.reason = reason
+        self.retry_after = retry_after
+
+    @property
+    def message(self):
+        return 'Too many concurrent requests for this route' if self.status == 429 else 'Server is overloaded'
+
+
+class AdmissionController:
+    # Bounds how many requests run at once, so a burst on expensive routes queues here,
+    # briefly, instead of exhausting the connection pool for every route. Endpoints belong
+    # to priority classes; when slots are scarce a higher class is admitted first and may
+    # use capacity a lower class may not. An endpoint can also carry its own concurrency
+    # cap and is answered with 429 beyond it; a full queue or a wait past max_wait gets
+    # 503. Both carry Retry-After.
+    #
+    # The limit adapts to the database (AIMD): every adjust_interval the average statement
+    # latency of finished requests is compared with target_latency. Above it the limit
+    # shrinks by `backoff`; below it, if the limit was actually reached, it grows by one.
+
+    def __init__(self, app, classes, routes, route_limits=None, default_class='normal',
+                 initial_limit=15, min_limit=2, max_limit=64, target_latency=0.05,
+                 adjust_interval=1.0, backoff=0.9):
+        self.classes = {cls.name: cls for cls in classes}
+        self.routes = routes
+        self.route_limits = route_limits or {}
+        self.default_class = default_class
+        self.limit = float(initial_limit)
+        self.min_limit = min_limit
+        self.max_limit = max_limit
+        self.target_latency = target_latency
+        self.adjust_interval = adjust_interval
+        self.backoff = backoff
+
+        self._condition = threading.Condition()
+        self._in_flight = 0
+        self._route_in_flight = {}
+        self._window = {'started': time.monotonic(), 'db_time': 0.0, 'queries': 0, 'saturated': False}
+        self._service_time = 0.05
+
+        app.before_request(self.before_request)
+        app.teardown_request(self.teardown_request)
+
+        registry.gauge('app_admission_limit', 'Current adaptive concurrency limit.',
+                       callback=lambda: [((), round(self.limit, 2))])
+        registry.gauge('app_admission_in_flight', 'Admitted requests running, by priority class.', ('class',),
+                       callback=lambda: [((cls.name,), cls.in_flight) for cls in self.classes.values()])
+        registry.gauge('app_admission_queue_depth', 'Requests waiting for a slot, by priority class.', ('class',),
+                       callback=lambda: [((cls.name,), cls.waiting) for cls in self.classes.values()])
+
+    def class_for(self, endpoint):
+        name = self.routes.get(endpoint, self.default_class)
+        return self.classes[name] if name is not None else None
+
+    def _can_run(self, cls):
+        return self._in_flight < max(1, math.floor(self.limit * cls.share))
+
+    def _preempted(self, cls):
+        # A waiting request of a higher class that could run now goes first.
+        return any(other.priority < cls.priority and other.waiting and self._can_run(other)
+                   for other in self.classes.values())
+
+    def _retry_after(self, cls):
+        # Roughly how long until the queue ahead has drained at the current limit.
+        return max(1, math.ceil((cls.waiting + 1) * self._service_time / max(self.limit * cls.share, 1)))
+
+    def acquire(self, cls, endpoint, wait=True):
+        # With wait=False a request that would have to queue is not admitted and False is
+        # returned instead; the route limit and a full queue still shed it.
+        with self._condition:
+            route_limit = self.route_limits.get(endpoint)
+            if route_limit is not None and self._route_in_flight.get(endpoint, 0) >= route_limit:
+                raise Shed(429, 'route_limit', max(1, math.ceil(self._service_time)))
+
+            started = time.monotonic()
+            if not (self._can_run(cls) and not self._preempted(cls)):
+                self._window['saturated'] = True
+                if cls.waiting >= cls.queue:
+                    raise Shed(503, 'queue_full', self._retry_after(cls))
+                if not wait:
+                    return False
+
+                cls.waiting += 1
+                try:
+                    deadline = started + cls.max_wait
+                    while not (self._can_run(cls) and not self._preempted(cls)):
+                        remaining = deadline - time.monotonic()
+                        if remaining <= 0:
+                            raise Shed(503, 'timeout', self._retry_after(cls))
+                        self._condition.wait(remaining)
+                finally:
+                    cls.waiting -= 1
+
+            self._in_flight += 1
+            cls.in_flight += 1
+            self._route_in_flight[endpoint] = self._route_in_flight.get(endpoint, 0) + 1
+
+        admission_wait.observe(time.monotonic() - started, cls.name)
+        return True
+
+    async def acquire_async(self, cls, endpoint):
+        # For the asyncio handlers: the same slots and limit as the Flask requests, but a
+        # request that has to queue waits on a worker thread, not on the event loop.
+        if self.acquire(cls, endpoint, wait=False):
+            return
+
+        waiter = asyncio.get_running_loop().run_in_executor(None, self.acquire, cls, endpoint)
+        try:
+            await asyncio.shield(waiter)
+        except asyncio.CancelledError:
+            # The client went away while queued; a slot the thread still wins goes back.
+            def give_back(future):
+                if not future.cancelled() and future.exception() is None:
+                    self.release(cls, endpoint, self._service_time, 0.0, 0)
+            waiter.add_done_callback(give_back)
+            raise
+
+    def release(self, cls, endpoint, elapsed, db_time, queries):
+        with self._condition:
+            self._in_flight -= 1
+            cls.in_flight -= 1
+            self._route_in_flight[endpoint] -= 1
+            self._service_time = 0.9 * self._service_time + 0.1 * elapsed
+
+            window = self._window
+            window['db_time'] += db_time
+            window['queries'] += queries
+            now = time.monotonic()
+            if now - window['started'] >= self.adjust_interval:
+                self._adjust(window)
+                self._window = {'started': now, 'db_time': 0.0, 'queries': 0, 'saturated': False}
+
+            self._condition.notify_all()
+
+    def _adjust(self, window):
+        if not window['queries']:
+            return
+        latency = window['db_time'] / window['queries']
+        if latency > self.target_latency:
+            self.limit = max(self.min_limit, self.limit * self.backoff)
+        elif window['saturated']:
+            self.limit = min(self.max_limit, self.limit + 1)
+
+    def before_request(self):
+        cls = self.class_for(request.endpoint)
+        if cls is None:
+            return None
+
+        try:
+            self.acquire(cls, request.endpoint)
+        except Shed as e:
+            route = request.url_rule.rule if request.url_rule else 'unmatched'
+            shed_total.inc(1, cls.name, route, e.reason)
+            response = jsonify({'message': e.message})
+            response.status_code = e.status
+            response.headers['Retry-After'] = str(e.retry_after)
+            return response
+
+        g.admission = (cls, request.endpoint, time.perf_counter())
+        return None
+
+    def teardown_request(self, exc):
+        admitted = g.pop('admission', None)
+        if admitted is None:
+            return
+        cls, endpoint, started = admitted
+
+        # Registered after the request instrumentation, so its teardown, which consumes
+        # the request's DB timings, has not run yet.
+        stats = current_request_stats()
+        db_time, queries = (stats['db_time'], stats['queries']) if stats is not None else (0.0, 0)
+        self.release(cls, endpoint, time.perf_counter() - started, db_time, queries)
@@ -0,0 +1,76 @@
+import numpy as np
+
+PERCENTILES = (10, 25, 50, 75, 90)
+
+
+def grade_distributions(groups, grades, group_count, expected, bucket=10):
+    # Grade statistics for many groups (assignments) at once, without a Python loop over
+    # submissions. `groups` holds each submission's group index, `grades` its grade with
+    # NaN when ungraded, and `expected` the submissions each group should have (one per
+    # enrolled student). Groups are summarized independently, in a single sort.
+    groups = np.asarray(groups, dtype=np.int64)
+    grades = np.asarray(grades, dtype=np.float64)
+    expected = np.broadcast_to(np.asarray(expected, dtype=np.int64), (group_count,))
+
+    submitted = np.bincount(groups, minlength=group_count)
+    is_graded = ~np.isnan(grades)
+    graded_groups = groups[is_graded]
+    values = grades[is_graded]
+    graded = np.bincount(graded_groups, minlength=group_count)
+
+    with np.errstate(invalid='ignore', divide='ignore'):
+        mean = np.bincount(graded_groups, weights=values, minlength=group_count) / graded
+        mean_square = np.bincount(graded_groups, weights=values * values, minlength=group_count) / graded
+        std = np.sqrt(np.maximum(mean_square - mean * mean, 0))
+
+    # Sorting by (group, grade) lays every group's grades out contiguously and in order,
+    # so any quantile of every group is a pair of gathers and an interpolation.
+    ordered = values[np.lexsort((values, graded_groups))]
+    starts = np.concatenate(([0], np.cumsum(graded)[:-1]))
+    has_grades = graded > 0
+
+    def quantile(q):
+        if not ordered.size:
+            return np.full(group_count, np.nan)
+        position = starts + q * np.maximum(graded - 1, 0)
+        lower = np.floor(position).astype(np.int64)
+        upper = np.ceil(position).astype(np.int64)
+        lower = np.where(has_grades, lower, 0)
+        upper = np.where(has_grades, upper, 0)
+        result = ordered[lower] + (ordered[upper] - ordered[lower]) * (position - lower)
+        return np.where(has_grades, result, np.nan)
+
+    # Buckets cover 0-100; anything above 100 lands in the top bucket.
+    bucket_count = int(np.ceil(100 / bucket))
+    buckets = np.clip((values // bucket).astype(np.int64), 0, bucket_count - 1)
+    histogram = np.bincount(graded_groups * bucket_count + buckets,
+                            minlength=group_count * bucket_count).reshape(group_count, bucket_count)
+
+    percentiles = {p: quantile(p / 100) for p in PERCENTILES}
+    minimum, maximum = quantile(0), quantile(1)
+
+    summaries = []
+    for n in range(group_count):
+        summaries.append({
+            'expected': int(expected[n]),
+            'submitted': int(submitted[n]),
+            'missing': int(max(expected[n] - submitted[n], 0)),
+            'graded': int(graded[n]),
+            'ungraded': int(submitted[n] - graded[n]),
+            'mean': rounded(mean[n]),
+            'median': rounded(percentiles[50][n]),
+            'std': rounded(std[n]),
+            'min': rounded(minimum[n]),
+            'max': rounded(maximum[n]),
+            'percentiles': {f'p{p}': rounded(percentiles[p][n]) for p in PERCENTILES},
+            'histogram': [{
+                'from': bucket * b,
+                'to': min(bucket * (b + 1), 100),
+                'count': int(histogram[n, b])
+            } for b in range(bucket_count)]
+        })
+    return summaries
+
+
+def rounded(value):
+    return None if np.isnan(value) else round(float(value), 2)
@@ -1,19 +1,602 @@
-from flask import Flask, request, jsonify
+from flask import Flask, Response, request, jsonify, g, stream_with_context
 from flask_sqlalchemy import SQLAlchemy
-from sqlalchemy import text
+from flask_migrate import Migrate
+from sqlalchemy import text, bindparam
+from sqlalchemy.exc import IntegrityError
 from dotenv import load_dotenv
 import os
-from datetime import datetime
-from werkzeug.security import generate_password_hash, check_password_hash
+import json
+import base64
+import binascii
+import hashlib
+import csv
+import io
+from decimal import Decimal, InvalidOperation
+from collections import Counter
+import jwt
+import numpy as np
+from functools import wraps
+from datetime import datetime, timedelta
+from cache import TTLCache, ResponseCache, build_backend
+from hashing import PasswordHasher, HashingBusy
+from analytics import grade_distributions
+from metrics import RequestInstrumentation, registry
+from replicas import RoutingSession, ReplicaRouter
+from admission import AdmissionController, PriorityClass
+from batch import BatchDispatcher
+from jsonstream import encode_rows
+from ingest import SubmissionQueue
 
 load_dotenv()
 
 app = Flask(__name__)
 app.config['SQLALCHEMY_DATABASE_URI'] = os.getenv('DATABASE_URL')
-db = SQLAlchemy(app)
+app.config['SECRET_KEY'] = os.getenv('SECRET_KEY')
+if not app.config['SECRET_KEY']:
+    raise RuntimeError('SECRET_KEY must be set; it signs the tokens issued at /login')
+
+# Optional read replicas, as a comma separated list of URIs. Each becomes a bind that
+# read-only requests can be routed to; everything else stays on the primary.
+REPLICA_URLS = [url.strip() for url in os.getenv('DATABASE_REPLICA_URLS', '').split(',') if url.strip()]
+app.config['SQLALCHEMY_BINDS'] = {f'replica_{n}': url for n, url in enumerate(REPLICA_URLS)}
+db = SQLAlchemy(app, session_options={'class_': RoutingSession})
+# Schema changes are alembic revisions under migrations/; apply them with `flask db upgrade`.
+migrate = Migrate(app, db)
+
+# Per-route query counts and DB, JSON and total time, exported at /metrics. Slow requests
+# are logged with their SQL and repeated statement shapes are flagged as likely N+1s.
+instrumentation = RequestInstrumentation(
+    app,
+    slow_request_ms=float(os.getenv('SLOW_REQUEST_MS', 500)),
+    repeat_threshold=int(os.getenv('REPEATED_STATEMENT_THRESHOLD', 10))
+)
+
+replica_router = ReplicaRouter(
+    app, db, app.config['SQLALCHEMY_BINDS'],
+    strategy=os.getenv('REPLICA_STRATEGY', 'round_robin'),
+    max_lag=float(os.getenv('REPLICA_MAX_LAG', 5)),
+    check_interval=float(os.getenv('REPLICA_LAG_CHECK_INTERVAL', 5)),
+    read_your_writes=float(os.getenv('READ_YOUR_WRITES_SECONDS', 5)),
+    allow_unreplicated=os.getenv('REPLICA_ALLOW_UNREPLICATED', '').lower() in ('1', 'true')
+)
+registry.gauge('app_replica_lag_seconds', 'Last measured replication lag per replica, -1 if unusable.',
+               ('replica',), callback=replica_router.lag_metrics)
+
+
+# Admission control keeps a burst on expensive routes from taking every pooled connection.
+# Endpoints not listed are 'normal'; None exempts an endpoint (metrics must stay scrapable,
+# and /batch sub-requests are admitted one by one). Overrides come as comma separated
+# endpoint=value pairs, e.g. ADMISSION_ROUTE_LIMITS=get_course_members=4.
+def env_pairs(name, convert=str):
+    pairs = (pair.split('=', 1) for pair in os.getenv(name, '').split(',') if '=' in pair)
+    return {key.strip(): convert(value.strip()) for key, value in pairs}
+
+
+ADMISSION_ROUTE_CLASSES = {
+    'metrics': None,
+    'cache_stats': None,
+    'batch': None,
+    'login': 'critical',
+    'register': 'critical',
+    'submit_assignment': 'critical',
+    'get_submission_status': 'critical',
+    'get_course_members': 'low',
+    'get_student_agenda': 'low',
+    'get_student_events': 'low',
+    'get_student_dashboard': 'low',
+    'get_lecturer_dashboard': 'low',
+    'assignment_grade_analytics': 'low',
+    'course_grade_analytics': 'low',
+    'search': 'low',
+    'bulk_register_courses': 'low',
+    'bulk_grade_assignment': 'low',
+    'report_courses_by_enrollment': 'low',
+    'report_top_enrolled_courses': 'low',
+    'report_students_by_course_count': 'low',
+    'report_top_students_by_grade': 'low',
+    'report_lecturers_by_course_count': 'low',
+}
+ADMISSION_ROUTE_CLASSES.update({endpoint: None if name == 'none' else name
+                                for endpoint, name in env_pairs('ADMISSION_ROUTE_CLASSES').items()})
+
+admission = None
+if os.getenv('ADMISSION_CONTROL', '1').lower() not in ('0', 'false'):
+    admission = AdmissionController(
+        app,
+        classes=[
+            PriorityClass('critical', 0, share=1.0, queue=int(os.getenv('ADMISSION_CRITICAL_QUEUE', 64)),
+                          max_wait=float(os.getenv('ADMISSION_CRITICAL_MAX_WAIT', 2))),
+            PriorityClass('normal', 1, share=0.8, queue=int(os.getenv('ADMISSION_NORMAL_QUEUE', 32)),
+                          max_wait=float(os.getenv('ADMISSION_NORMAL_MAX_WAIT', 1))),
+            PriorityClass('low', 2, share=0.5, queue=int(os.getenv('ADMISSION_LOW_QUEUE', 8)),
+                          max_wait=float(os.getenv('ADMISSION_LOW_MAX_WAIT', 0.5))),
+        ],
+        routes=ADMISSION_ROUTE_CLASSES,
+        route_limits=env_pairs('ADMISSION_ROUTE_LIMITS', int),
+        # The connection pool's size plus overflow, which is what a burst would exhaust.
+        initial_limit=int(os.getenv('ADMISSION_INITIAL_LIMIT', 15)),
+        min_limit=int(os.getenv('ADMISSION_MIN_LIMIT', 2)),
+        max_limit=int(os.getenv('ADMISSION_MAX_LIMIT', 64)),
+        target_latency=float(os.getenv('ADMISSION_TARGET_DB_MS', 50)) / 1000
+    )
+
+
+# GET requests of the decorated views may be served by a replica. Views that also accept
+# writes keep those on the primary.
+def read_only(view):
+    @wraps(view)
+    def wrapper(*args, **kwargs):
+        if request.method == 'GET':
+            replica_router.route_reads()
+        return view(*args, **kwargs)
+    return wrapper
 
 # We're not using ORM models, keeping this import for the db connection and text query execution only
 
+DEFAULT_PAGE_SIZE = int(os.getenv('DEFAULT_PAGE_SIZE', 50))
+MAX_PAGE_SIZE = int(os.getenv('MAX_PAGE_SIZE', 500))
+
+# Keyset pagination: every list route orders by an indexed key and resumes with
+# `key > :after`, so a page is a range scan no matter how deep the client goes.
+# Ids start at 1, so 0 doubles as the "first page" cursor.
+FIRST_PAGE = 0
+FIRST_PAGE_AT = '1000-01-01 00:00:00'
+
+
+class InvalidCursor(ValueError):
+    pass
+
+
+def encode_cursor(*values):
+    raw = json.dumps(values, separators=(',', ':'), default=str)
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip('=')
+
+
+def decode_cursor(token, arity):
+    try:
+        values = json.loads(base64.urlsafe_b64decode(token + '=' * (-len(token) % 4)))
+    except (ValueError, binascii.Error):
+        raise InvalidCursor(token)
+    if not isinstance(values, list) or len(values) != arity:
+        raise InvalidCursor(token)
+    return values
+
+
+def page_args(*first_page, max_size=MAX_PAGE_SIZE):
+    limit = request.args.get('limit', DEFAULT_PAGE_SIZE, type=int)
+    limit = max(1, min(limit, max_size))
+
+    after = request.args.get('after')
+    if not after:
+        return limit, list(first_page)
+    return limit, decode_cursor(after, len(first_page))
+
+
+def next_page(rows, limit, key):
+    # Queries fetch limit + 1 rows; the extra row only tells us another page exists.
+    if len(rows) <= limit:
+        return rows, None
+    rows = rows[:limit]
+    return rows, encode_cursor(*key(rows[-1]))
+
+
+def paginated(payload, next_cursor):
+    if isinstance(payload, dict):
+        payload['next_cursor'] = next_cursor
+    response = jsonify(payload)
+    if next_cursor:
+        response.headers['X-Next-Cursor'] = next_cursor
+    return response
+
+
+# Lists that can be exported whole are encoded row by row from a server-side cursor into
+# a chunked response, so the rows, their dicts and the JSON text never exist in full at
+# once and memory stays flat however large the page. Such routes allow far larger pages.
+STREAM_MAX_PAGE_SIZE = int(os.getenv('STREAM_MAX_PAGE_SIZE', 100000))
+STREAM_FETCH_SIZE = int(os.getenv('STREAM_FETCH_SIZE', 1000))
+
+
+def stream_rows(sql, params):
+    return db.session.execute(sql.execution_options(yield_per=STREAM_FETCH_SIZE), params)
+
+
+# Yields at most `limit` rows of a page queried with LIMIT limit + 1, like next_page for
+# a fetched page. Whether another page follows is only known once the rows have been
+# sent, so its cursor is left in page['next_cursor'] for the end of the body.
+def stream_page(rows, limit, key, page):
+    last = None
+    try:
+        for n, row in enumerate(rows):
+            if n == limit:
+                page['next_cursor'] = encode_cursor(*key(last))
+                return
+            last = row
+            yield row
+    finally:
+        rows.close()
+
+
+# For a streamed page whose cursor goes out in the X-Next-Cursor header, ahead of the
+# rows: walks the keys of the page, queried with LIMIT limit + 1, and returns the key of
+# its last row and the next page's cursor, or (None, None) on the last page. Only one key
+# is held at a time.
+def page_end(sql, params, limit):
+    keys = stream_rows(sql, params)
+    try:
+        last = None
+        for n, key in enumerate(keys):
+            if n == limit:
+                return tuple(last), encode_cursor(*last)
+            last = key
+        return None, None
+    finally:
+        keys.close()
+
+
+def streamed(chunks, next_cursor=None):
+    response = Response(stream_with_context(chunks), mimetype='application/json')
+    if next_cursor:
+        response.headers['X-Next-Cursor'] = next_cursor
+    return response
+
+
+@app.errorhandler(InvalidCursor)
+def invalid_cursor(e):
+    return jsonify({'message': 'Invalid pagination cursor'}), 400
+
+
+# Course rows are read by almost every handler but only change through create_course
+# and register_lecturer, which invalidate explicitly. The TTL bounds staleness across workers.
+course_cache = TTLCache(
+    maxsize=int(os.getenv('COURSE_CACHE_SIZE', 4096)),
+    ttl=float(os.getenv('COURSE_CACHE_TTL', 30))
+)
+
+# An assignment never moves to another course, nor a thread to another forum, so these
+# mappings only need the LRU bound.
+assignment_course_cache = TTLCache(
+    maxsize=int(os.getenv('ASSIGNMENT_CACHE_SIZE', 16384)),
+    ttl=float(os.getenv('ASSIGNMENT_CACHE_TTL', 3600))
+)
+
+thread_forum_cache = TTLCache(
+    maxsize=int(os.getenv('THREAD_CACHE_SIZE', 16384)),
+    ttl=float(os.getenv('THREAD_CACHE_TTL', 3600))
+)
+
+
+def get_course(course_id):
+    try:
+        course_id = int(course_id)
+    except (TypeError, ValueError):
+        return None
+
+    course = course_cache.get(course_id)
+    if course is None:
+        sql = text("SELECT course_id, course_name, lecturer_id FROM course WHERE course_id = :course_id")
+        course = db.session.execute(sql, {'course_id': course_id}).fetchone()
+        if course is not None:
+            course = tuple(course)
+            course_cache.set(course_id, course)
+    return course
+
+
+def get_course_lecturer(course_id):
+    course = get_course(course_id)
+    return course[2] if course else None
+
+
+def get_assignment_course_id(assign_id):
+    course_id = assignment_course_cache.get(assign_id)
+    if course_id is None:
+        sql = text("SELECT course_id FROM assignment WHERE assign_id = :assign_id")
+        course_id = db.session.execute(sql, {'assign_id': assign_id}).scalar()
+        if course_id is not None:
+            assignment_course_cache.set(assign_id, course_id)
+    return course_id
+
+
+def get_thread_forum_id(thread_id):
+    forum_id = thread_forum_cache.get(thread_id)
+    if forum_id is None:
+        sql = text("SELECT forum_id FROM discussion_thread WHERE thread_id = :thread_id")
+        forum_id = db.session.execute(sql, {'thread_id': thread_id}).scalar()
+        if forum_id is not None:
+            thread_forum_cache.set(thread_id, forum_id)
+    return forum_id
+
+
+password_hasher = PasswordHasher()
+
+
+@app.errorhandler(HashingBusy)
+def hashing_busy(e):
+    response = jsonify({'message': 'Server is busy, please try again shortly'})
+    response.headers['Retry-After'] = '1'
+    return response, 503
+
+
+TOKEN_TTL = int(os.getenv('TOKEN_TTL', 3600))
+
+
+def issue_token(userid, role):
+    now = datetime.utcnow()
+    return jwt.encode({
+        'sub': str(userid),
+        'role': role,
+        'iat': now,
+        'exp': now + timedelta(seconds=TOKEN_TTL)
+    }, app.config['SECRET_KEY'], algorithm='HS256')
+
+
+# Verifies the bearer token issued by /login and exposes its claims as g.user.
+# Returns an error response, or None when the request is authenticated.
+def authenticate():
+    header = request.headers.get('Authorization', '')
+    if not header.startswith('Bearer '):
+        return jsonify({'message': 'Authentication token is required'}), 401
+
+    try:
+        claims = jwt.decode(header[len('Bearer '):], app.config['SECRET_KEY'], algorithms=['HS256'])
+    except jwt.ExpiredSignatureError:
+        return jsonify({'message': 'Token has expired'}), 401
+    except jwt.InvalidTokenError:
+        return jsonify({'message': 'Invalid token'}), 401
+
+    g.user = {'userid': int(claims['sub']), 'role': claims['role']}
+    return None
+
+
+def token_required(view):
+    @wraps(view)
+    def wrapper(*args, **kwargs):
+        error = authenticate()
+        if error:
+            return error
+        return view(*args, **kwargs)
+    return wrapper
+
+
+def is_current_user(userid):
+    return userid is None or str(userid) == str(g.user['userid'])
+
+
+# MySQL error codes that let a single INSERT stand in for a separate existence check.
+DUPLICATE_KEY = 1062
+FOREIGN_KEY_VIOLATION = 1452
+
+
+def mysql_error_code(error):
+    args = getattr(error.orig, 'args', None)
+    return args[0] if args else None
+
+
+# The *_stats tables keep the reporting aggregates current. Every write that changes a
+# count adjusts them inside its own transaction; `flask rebuild-stats` repairs drift.
+def upsert_counts(table, key_column, count_column, counts):
+    if not counts:
+        return
+
+    values = ', '.join(f'(:key_{n}, :count_{n})' for n in range(len(counts)))
+    params = {}
+    for n, (key, count) in enumerate(counts.items()):
+        params[f'key_{n}'] = key
+        params[f'count_{n}'] = count
+
+    sql = text(f"""
+        INSERT INTO {table} ({key_column}, {count_column}) VALUES {values}
+        ON DUPLICATE KEY UPDATE {count_column} = {count_column} + VALUES({count_column})
+    """)
+    db.session.execute(sql, params)
+
+
+def record_enrollments(pairs):
+    upsert_counts('course_stats', 'course_id', 'student_count', Counter(course_id for _, course_id in pairs))
+    upsert_counts('student_stats', 'stud_id', 'course_count', Counter(stud_id for stud_id, _ in pairs))
+
+
+def record_grade(student_id, grade):
+    record_grades([(student_id, grade)])
+
+
+def record_grades(grades):
+    if not grades:
+        return
+
+    values = ', '.join(f'(:stud_id_{n}, :grade_{n}, 1)' for n in range(len(grades)))
+    params = {}
+    for n, (student_id, grade) in enumerate(grades):
+        params[f'stud_id_{n}'] = student_id
+        params[f'grade_{n}'] = grade
+
+    sql = text(f"""
+        INSERT INTO student_stats (stud_id, grade_sum, grade_count) VALUES {values}
+        ON DUPLICATE KEY UPDATE grade_sum = grade_sum + VALUES(grade_sum), grade_count = grade_count + VALUES(grade_count)
+    """)
+    db.session.execute(sql, params)
+
+
+# Polled list routes carry a strong ETag built from a per-(course, resource) version
+# counter that the matching POST handler bumps inside its transaction. A matching
+# If-None-Match is answered with 304 after one primary-key read on the primary, without
+# running the list query. The global course list uses course_id 0.
+GLOBAL_RESOURCE = 0
+
+
+def bump_version(resource, course_id=GLOBAL_RESOURCE):
+    sql = text("""
+        INSERT INTO resource_version (course_id, resource, version) VALUES (:course_id, :resource, 1)
+        ON DUPLICATE KEY UPDATE version = version + 1
+    """)
+    db.session.execute(sql, {'course_id': course_id, 'resource': resource})
+
+
+def resource_etag(resource, course_id=GLOBAL_RESOURCE):
+    sql = text("SELECT version FROM resource_version WHERE course_id = :course_id AND resource = :resource")
+    version = db.session.execute(sql, {'course_id': course_id, 'resource': resource}).scalar() or 0
+    # The query string picks the page or date range, so it is part of the representation.
+    variant = hashlib.sha1(request.query_string).hexdigest()[:12]
+    return f'{resource}-{course_id}-{version}-{variant}'
+
+
+def versioned(resource):
+    def decorator(view):
+        @wraps(view)
+        def wrapper(*args, **kwargs):
+            if request.method != 'GET':
+                return view(*args, **kwargs)
+
+            course_id = kwargs.get('course_id', GLOBAL_RESOURCE)
+            etag = None
+            if request.if_none_match:
+                # A lagging replica still reports the old version, so whether the client's
+                # copy is current is decided on the primary.
+                with replica_router.primary():
+                    current = resource_etag(resource, course_id)
+                if request.if_none_match.contains(current):
+                    response = app.response_class(status=304)
+                    response.set_etag(current)
+                    return response
+                if not g.get('db_bind'):
+                    etag = current
+
+            # On a replica the tag is read there, before the rows, so the rows served are
+            # at least as new as the version it names.
+            if etag is None:
+                etag = resource_etag(resource, course_id)
+
+            response = app.make_response(view(*args, **kwargs))
+            if response.status_code == 200:
+                response.set_etag(etag)
+            return response
+        return wrapper
+    return decorator
+
+
+# Read routes whose data only changes through a matching POST handler are served from
+# a response cache keyed by path and query string. Entries are tagged (courses,
+# lecturers, course:<id>, forum:<id>, ...) and the write handlers invalidate by tag. A tag
+# is a format string over the view arguments, or a callable taking them.
+# Set RESPONSE_CACHE_URL to a Redis URL to share the cache, and invalidations, between workers.
+response_cache = ResponseCache(
+    build_backend(os.getenv('RESPONSE_CACHE_URL'), int(os.getenv('RESPONSE_CACHE_MAX_BYTES', 64 * 1024 * 1024))),
+    ttl=float(os.getenv('RESPONSE_CACHE_TTL', 300))
+)
+
+UNCACHED_HEADERS = {'Content-Length', 'Set-Cookie'}
+
+
+STREAMED_CACHE_MAX_BYTES = int(os.getenv('STREAMED_CACHE_MAX_BYTES', 1024 * 1024))
+
+
+# Passes a streamed body through while keeping a copy, and caches it once it has been
+# sent in full. Bodies larger than STREAMED_CACHE_MAX_BYTES are not kept.
+def cache_streamed(chunks, key, headers, generations, ttl=None):
+    body = bytearray()
+    for chunk in chunks:
+        if body is not None:
+            body += chunk if isinstance(chunk, bytes) else chunk.encode()
+            if len(body) > STREAMED_CACHE_MAX_BYTES:
+                body = None
+        yield chunk
+    if body is not None:
+        response_cache.set(key, 200, headers, bytes(body), generations, ttl)
+
+
+def cached(*tags, authorize=None):
+    def decorator(view):
+        @wraps(view)
+        def wrapper(*args, **kwargs):
+            if request.method != 'GET':
+                return view(*args, **kwargs)
+
+            # A cache hit never reaches the view, so per-user access checks run here.
+            if authorize is not None:
+                error = authorize(**kwargs)
+                if error:
+                    return error
+
+            key = request.full_path
+            entry = response_cache.get(request.endpoint, key)
+            if entry is not None:
+                return app.response_class(
+                    entry['body'].encode('latin-1'),
+                    status=entry['status'],
+                    headers=entry['headers']
+                )
+
+            generations = response_cache.snapshot(
+                tag(**kwargs) if callable(tag) else tag.format(**kwargs) for tag in tags)
+            response = app.make_response(view(*args, **kwargs))
+            # Inside an atomic batch the response may show writes that are not committed yet.
+            if response.status_code == 200 and not g.get('batch_transaction'):
+                headers = [(name, value) for name, value in response.headers.items() if name not in UNCACHED_HEADERS]
+                # A replica can still return rows from before an invalidation that already
+                # happened, so an entry read from one lives no longer than replicas may lag.
+                ttl = min(response_cache.ttl, replica_router.max_lag) if g.get('db_bind') else None
+                if response.is_streamed:
+                    response.response = cache_streamed(response.response, key, headers, generations, ttl)
+                else:
+                    response_cache.set(key, response.status_code, headers, response.get_data(), generations, ttl)
+            return response
+        return wrapper
+    return decorator
+
+
+@app.route('/cache/stats', methods=['GET'])
+def cache_stats():
+    return jsonify({
+        'course': course_cache.stats(),
+        'assignment_course': assignment_course_cache.stats(),
+        'thread_forum': thread_forum_cache.stats(),
+        'responses': response_cache.stats()
+    })
+
+
+@app.route('/metrics', methods=['GET'])
+def metrics():
+    return Response(registry.render(), mimetype='text/plain; version=0.0.4')
+
+
+# Several sub-requests in one round trip for clients on high-latency links. Limits cap the
+# number of items and the size of the whole batch body.
+BATCH_MAX_ITEMS = int(os.getenv('BATCH_MAX_ITEMS', 50))
+BATCH_MAX_BYTES = int(os.getenv('BATCH_MAX_BYTES', 1024 * 1024))
+
+batch_dispatcher = BatchDispatcher(app, db, workers=int(os.getenv('BATCH_WORKERS', 4)))
+
+
+@app.route('/batch', methods=['POST'])
+def batch():
+    if request.content_length is None or request.content_length > BATCH_MAX_BYTES:
+        return jsonify({'message': f'Batch body must be at most {BATCH_MAX_BYTES} bytes'}), 413
+
+    data = request.get_json(silent=True)
+    items = data.get('requests') if isinstance(data, dict) else None
+    if not isinstance(items, list) or not items:
+        return jsonify({'message': 'requests must be a non-empty list'}), 400
+    if len(items) > BATCH_MAX_ITEMS:
+        return jsonify({'message': f'A batch can hold at most {BATCH_MAX_ITEMS} requests'}), 413
+
+    if not data.get('atomic'):
+        responses, _ = batch_dispatcher.run(items)
+        return jsonify({'responses': responses})
+
+    # The views invalidate caches before the batch commits, so a concurrent reader can
+    # cache the old data again in between; invalidate once more after the commit. A
+    # rollback may leave ids read inside the transaction in the id caches.
+    with response_cache.recording() as invalidated:
+        responses, committed = batch_dispatcher.run_atomic(items)
+    if committed:
+        response_cache.invalidate(*invalidated)
+    else:
+        course_cache.clear()
+        assignment_course_cache.clear()
+        thread_forum_cache.clear()
+
+    return jsonify({'committed': committed, 'responses': responses})
+
+
 @app.route('/register', methods=['POST'])
 def register():
     data = request.json
@@ -24,26 +607,20 @@ def register():
     if data['role'] not in ['student', 'lecturer', 'admin']:
         return jsonify({'message': 'Invalid role. Must be student, lecturer, or admin'}), 400
 
-    sql = text("SELECT * FROM user WHERE name = :name")
-    existing_user = db.session.execute(sql, {'name': data.get('name')}).fetchone()
-
-    if existing_user:
-        return jsonify({'message': 'User already exists'}), 400
+    hashed_password = password_hasher.hash(data['password'])
 
+    # The unique index on name rejects a taken name, also between concurrent registrations.
     try:
-        hashed_password = generate_password_hash(data['password'])
-
         sql = text("INSERT INTO user (password, role, name, email) VALUES (:password, :role, :name, :email)")
-        db.session.execute(sql, {
+        result = db.session.execute(sql, {
             'password': hashed_password,
             'role': data['role'],
             'name': data['name'],
             'email': data.get('email', '')
         })
+        last_inserted_id = result.lastrowid
         db.session.commit()
 
-        last_inserted_id = db.session.execute(text("SELECT LAST_INSERT_ID()")).fetchone()[0]
-
         return jsonify({
             'message': 'User registered successfully',
             'user': {
@@ -56,6 +633,8 @@ def register():
 
     except Exception as e:
         db.session.rollback()
+        if isinstance(e, IntegrityError) and mysql_error_code(e) == DUPLICATE_KEY:
+            return jsonify({'message': 'User already exists'}), 400
         return jsonify({'message': 'Registration failed', 'error': str(e)}), 500
 
 
@@ -73,175 +652,397 @@ def login():
         if not user:
             return jsonify({'message': 'Invalid credentials'}), 401
 
-        if check_password_hash(user.password, data['password']):  
+        if password_hasher.verify(user.password, data['password']):
+            if password_hasher.needs_rehash(user.password):
+                rehash_password(user.userid, user.password, data['password'])
+
             return jsonify({
                 'message': 'Login successful',
-                'role': user.role  
+                'role': user.role,
+                'token': issue_token(user.userid, user.role),
+                'expires_in': TOKEN_TTL
             })
 
         return jsonify({'message': 'Invalid credentials'}), 401
 
+    except HashingBusy:
+        raise
     except Exception as e:
         return jsonify({'message': 'An error occurred during login', 'error': str(e)}), 500
 
 
+# Upgrades a hash made with outdated cost parameters while the plaintext is at hand.
+# Best effort: a busy pool just leaves the old hash for the next login.
+def rehash_password(userid, old_hash, password):
+    try:
+        new_hash = password_hasher.hash(password)
+    except HashingBusy:
+        return
+
+    sql = text("UPDATE user SET password = :new_hash WHERE userid = :userid AND password = :old_hash")
+    db.session.execute(sql, {'new_hash': new_hash, 'userid': userid, 'old_hash': old_hash})
+    db.session.commit()
+
+
 @app.route('/courses', methods=['POST'])
+@token_required
 def create_course():
     data = request.json
 
-    sql = text("SELECT * FROM user WHERE userid = :userid")
-    admin = db.session.execute(sql, {'userid': data['userid']}).fetchone()
-    if not admin or admin[2] != 'admin':  
+    if g.user['role'] != 'admin' or not is_current_user(data.get('userid')):
         return jsonify({'message': 'Only admins can create courses'}), 403
 
     lecturer_id = data.get('lecturer_id')
 
     if lecturer_id is not None:
-        sql = text("SELECT * FROM user WHERE userid = :lecturer_id")
-        lecturer = db.session.execute(sql, {'lecturer_id': lecturer_id}).fetchone()
-        if not lecturer or lecturer[2] != 'lecturer': 
-            return jsonify({'message': 'Invalid lecturer. Please provide a valid user with a lecturer role.'}), 400
+        # The lecturer's role is checked by the INSERT itself: no row is inserted unless it matches.
+        sql = text("""
+            INSERT INTO course (course_name, lecturer_id)
+            SELECT :course_name, userid FROM user
+            WHERE userid = :lecturer_id AND role = 'lecturer'
+        """)
+    else:
+        sql = text("INSERT INTO course (course_name, lecturer_id) VALUES (:course_name, :lecturer_id)")
 
-    sql = text("INSERT INTO course (course_name, lecturer_id) VALUES (:course_name, :lecturer_id)")
-    db.session.execute(sql, {
+    result = db.session.execute(sql, {
         'course_name': data['course_name'],
         'lecturer_id': lecturer_id
     })
-    db.session.commit()
 
-    sql = text("SELECT LAST_INSERT_ID()")
-    course_id = db.session.execute(sql).fetchone()[0]
+    if result.rowcount == 0:
+        db.session.rollback()
+        return jsonify({'message': 'Invalid lecturer. Please provide a valid user with a lecturer role.'}), 400
+
+    course_id = result.lastrowid
+    if lecturer_id is not None:
+        upsert_counts('lecturer_stats', 'lecturer_id', 'course_count', {lecturer_id: 1})
+    bump_version('courses')
+    db.session.commit()
+    course_cache.invalidate(course_id)
+    response_cache.invalidate('courses', 'lecturers')
 
     return jsonify({'message': 'Course created', 'course_id': course_id})
 
 
 @app.route('/courses', methods=['GET'])
+@read_only
+@versioned('courses')
+@cached('courses')
 def get_courses():
-    sql = text("SELECT course_id, course_name FROM course")
-    result = db.session.execute(sql).fetchall()
-    return jsonify([{'course_id': row[0], 'course_name': row[1]} for row in result])
+    # Not streamed: the list is bare, so the cursor has to go out in the header before
+    # the rows, and with only ids and names in a row, finding the page end first would
+    # read the page twice. The page stays at MAX_PAGE_SIZE instead.
+    limit, (after,) = page_args(FIRST_PAGE)
+
+    sql = text("""
+        SELECT course_id, course_name
+        FROM course
+        WHERE course_id > :after
+        ORDER BY course_id
+        LIMIT :limit
+    """)
+    result = db.session.execute(sql, {'after': after, 'limit': limit + 1}).fetchall()
+    result, next_cursor = next_page(result, limit, lambda row: (row[0],))
+
+    return paginated([{'course_id': row[0], 'course_name': row[1]} for row in result], next_cursor)
 
 
 @app.route('/courses/student/<int:userid>', methods=['GET'])
+@read_only
+@token_required
 def get_student_courses(userid):
-    sql = text("SELECT * FROM user WHERE userid = :userid")
-    result = db.session.execute(sql, {'userid': userid}).fetchone()
-    
-    if not result:
-        return jsonify({'message': 'User not found'}), 404
-    
-    if result[2] != 'student': 
+    if g.user['role'] != 'student': 
         return jsonify({'message': 'Only students can access this route'}), 403
 
+    if not is_current_user(userid):
+        return jsonify({'message': 'Students can only view their own courses'}), 403
+
+    limit, (after,) = page_args(FIRST_PAGE)
+
     sql = text("""
         SELECT c.course_id, c.course_name 
         FROM course c
         JOIN course_registration cr ON c.course_id = cr.course_id
-        WHERE cr.stud_id = :userid
+        WHERE cr.stud_id = :userid AND cr.course_id > :after
+        ORDER BY cr.course_id
+        LIMIT :limit
     """)
     
-    courses = db.session.execute(sql, {'userid': userid}).fetchall()
-    return jsonify([{'course_id': row[0], 'course_name': row[1]} for row in courses])
+    courses = db.session.execute(sql, {'userid': userid, 'after': after, 'limit': limit + 1}).fetchall()
+    courses, next_cursor = next_page(courses, limit, lambda row: (row[0],))
+
+    return paginated([{'course_id': row[0], 'course_name': row[1]} for row in courses], next_cursor)
+
+
+def authorize_lecturer_courses(userid):
+    if g.user['role'] != 'lecturer':
+        return jsonify({'message': 'Only lecturers can access this route'}), 403
+    if not is_current_user(userid):
+        return jsonify({'message': 'Lecturers can only view their own courses'}), 403
+    return None
 
 
 @app.route('/courses/lecturer/<int:userid>', methods=['GET'])
+@read_only
+@token_required
+@cached('lecturers', authorize=authorize_lecturer_courses)
 def get_lecturer_courses(userid):
-    sql = text("SELECT * FROM user WHERE userid = :userid")
-    user = db.session.execute(sql, {'userid': userid}).fetchone()
-    if not user:
-        return jsonify({'message': 'User not found'}), 404
-    if user[2] != 'lecturer':
-        return jsonify({'message': 'Only lecturers can access this route'}), 403
+    limit, (after,) = page_args(FIRST_PAGE)
 
-    sql = text("SELECT course_id, course_name FROM course WHERE lecturer_id = :userid")
-    courses = db.session.execute(sql, {'userid': userid}).fetchall()
+    sql = text("""
+        SELECT course_id, course_name
+        FROM course
+        WHERE lecturer_id = :userid AND course_id > :after
+        ORDER BY course_id
+        LIMIT :limit
+    """)
+    courses = db.session.execute(sql, {'userid': userid, 'after': after, 'limit': limit + 1}).fetchall()
+    courses, next_cursor = next_page(courses, limit, lambda course: (course[0],))
 
-    return jsonify([{'course_id': course[0], 'course_name': course[1]} for course in courses])
+    return paginated([{'course_id': course[0], 'course_name': course[1]} for course in courses], next_cursor)
 
 
 @app.route('/register-student', methods=['POST'])
+@token_required
 def register_course():
     data = request.json
     
     if not all(field in data for field in ['stud_id', 'course_id']):
         return jsonify({'message': 'Missing stud_id or course_id'}), 400
-    
-    sql = text("SELECT * FROM user WHERE userid = :stud_id")
-    user = db.session.execute(sql, {'stud_id': data['stud_id']}).fetchone()
-    
-    if not user:
-        return jsonify({'message': 'User not found'}), 404
-    
-    if user[2] != 'student':
+
+    # Students enroll themselves straight from their token; only an admin enrolling
+    # someone else needs the target user's role from the database.
+    if g.user['role'] == 'student':
+        if not is_current_user(data['stud_id']):
+            return jsonify({'message': 'Students can only register themselves'}), 403
+    elif g.user['role'] == 'admin':
+        sql = text("SELECT * FROM user WHERE userid = :stud_id")
+        user = db.session.execute(sql, {'stud_id': data['stud_id']}).fetchone()
+
+        if not user:
+            return jsonify({'message': 'User not found'}), 404
+
+        if user[2] != 'student':
+            return jsonify({'message': 'Only students can register for courses'}), 403
+    else:
         return jsonify({'message': 'Only students can register for courses'}), 403
     
-    sql = text("SELECT * FROM course WHERE course_id = :course_id")
-    course = db.session.execute(sql, {'course_id': data['course_id']}).fetchone()
-    
-    if not course:
-        return jsonify({'message': 'Course not found'}), 404
-  
-    sql = text("""
-        SELECT COUNT(*) FROM course_registration 
-        WHERE stud_id = :stud_id AND course_id = :course_id
-    """)
-    exists = db.session.execute(sql, {
-        'stud_id': data['stud_id'], 
-        'course_id': data['course_id']
-    }).scalar()
-    
-    if exists > 0:
-        return jsonify({'message': 'Student already registered for the course'}), 400
-    
-    sql = text("INSERT INTO course_registration (stud_id, course_id) VALUES (:stud_id, :course_id)")
-    db.session.execute(sql, {'stud_id': data['stud_id'], 'course_id': data['course_id']})
-    db.session.commit()
+    # The primary key rejects duplicates and the course foreign key rejects unknown courses,
+    # so the INSERT is the only round trip.
+    try:
+        sql = text("INSERT INTO course_registration (stud_id, course_id) VALUES (:stud_id, :course_id)")
+        db.session.execute(sql, {'stud_id': data['stud_id'], 'course_id': data['course_id']})
+        record_enrollments([(data['stud_id'], data['course_id'])])
+        db.session.commit()
+    except IntegrityError as e:
+        db.session.rollback()
+        if mysql_error_code(e) == DUPLICATE_KEY:
+            return jsonify({'message': 'Student already registered for the course'}), 400
+        if mysql_error_code(e) == FOREIGN_KEY_VIOLATION:
+            return jsonify({'message': 'Course not found'}), 404
+        raise
+
+    response_cache.invalidate(f"enrollment:{data['course_id']}")
     
     return jsonify({'message': 'Student successfully registered for the course'})
 
 
+BULK_ENROLL_CHUNK_SIZE = int(os.getenv('BULK_ENROLL_CHUNK_SIZE', 1000))
+BULK_ENROLL_MAX_ROWS = int(os.getenv('BULK_ENROLL_MAX_ROWS', 20000))
+
+
+@app.route('/register-students', methods=['POST'])
+@token_required
+def bulk_register_courses():
+    if g.user['role'] != 'admin':
+        return jsonify({'message': 'Only admins can bulk register students'}), 403
+
+    registrations = (request.json or {}).get('registrations')
+
+    if not isinstance(registrations, list) or not registrations:
+        return jsonify({'message': 'registrations must be a non-empty list of {stud_id, course_id}'}), 400
+
+    if len(registrations) > BULK_ENROLL_MAX_ROWS:
+        return jsonify({'message': f'At most {BULK_ENROLL_MAX_ROWS} registrations per request'}), 413
+
+    results = []
+    for start in range(0, len(registrations), BULK_ENROLL_CHUNK_SIZE):
+        results.extend(enroll_chunk(registrations[start:start + BULK_ENROLL_CHUNK_SIZE]))
+
+    return jsonify({
+        'message': 'Bulk registration processed',
+        'summary': dict(Counter(result['status'] for result in results)),
+        'results': results
+    })
+
+
+class ConcurrentEnrollment(Exception):
+    pass
+
+
+# Validates and inserts one chunk with a fixed number of set-based statements and a
+# single commit, whatever the chunk size. Outcomes are returned in input order.
+def enroll_chunk(rows):
+    pairs = []
+    results = []
+    for row in rows:
+        try:
+            pair = (int(row['stud_id']), int(row['course_id']))
+        except (KeyError, TypeError, ValueError):
+            results.append({'stud_id': None, 'course_id': None, 'status': 'invalid'})
+            continue
+        pairs.append(pair)
+        results.append({'stud_id': pair[0], 'course_id': pair[1], 'status': None})
+
+    if not pairs:
+        return results
+
+    stud_ids = list({stud_id for stud_id, _ in pairs})
+    course_ids = list({course_id for _, course_id in pairs})
+
+    try:
+        sql = text("SELECT userid, role FROM user WHERE userid IN :stud_ids").bindparams(
+            bindparam('stud_ids', expanding=True))
+        roles = dict(db.session.execute(sql, {'stud_ids': stud_ids}).fetchall())
+
+        sql = text("SELECT course_id FROM course WHERE course_id IN :course_ids").bindparams(
+            bindparam('course_ids', expanding=True))
+        courses = {row[0] for row in db.session.execute(sql, {'course_ids': course_ids}).fetchall()}
+
+        # A locking read of exactly the chunk's valid pairs, as primary-key lookups: a
+        # concurrent request registering one of them either committed before it, and is
+        # seen here, or waits on that key until this chunk commits, so every pair counted
+        # below is one this chunk inserts. Pairs are locked in key order.
+        candidates = sorted({pair for pair in pairs if roles.get(pair[0]) == 'student' and pair[1] in courses})
+        existing = set()
+        if candidates:
+            keys = ', '.join(f'(:stud_id_{n}, :course_id_{n})' for n in range(len(candidates)))
+            params = {}
+            for n, (stud_id, course_id) in enumerate(candidates):
+                params[f'stud_id_{n}'] = stud_id
+                params[f'course_id_{n}'] = course_id
+
+            sql = text(f"""
+                SELECT stud_id, course_id FROM course_registration
+                WHERE (stud_id, course_id) IN ({keys})
+                FOR UPDATE
+            """)
+            existing = set(map(tuple, db.session.execute(sql, params).fetchall()))
+
+        inserts = []
+        for result in results:
+            if result['status'] == 'invalid':
+                continue
+            pair = (result['stud_id'], result['course_id'])
+            if pair[0] not in roles:
+                result['status'] = 'user_not_found'
+            elif roles[pair[0]] != 'student':
+                result['status'] = 'not_a_student'
+            elif pair[1] not in courses:
+                result['status'] = 'course_not_found'
+            elif pair in existing:
+                result['status'] = 'already_registered'
+            else:
+                existing.add(pair)
+                inserts.append(pair)
+                result['status'] = 'registered'
+
+        if inserts:
+            values = ', '.join(f'(:stud_id_{n}, :course_id_{n})' for n in range(len(inserts)))
+            params = {}
+            for n, (stud_id, course_id) in enumerate(inserts):
+                params[f'stud_id_{n}'] = stud_id
+                params[f'course_id_{n}'] = course_id
+
+            sql = text(f"INSERT IGNORE INTO course_registration (stud_id, course_id) VALUES {values}")
+            if db.session.execute(sql, params).rowcount != len(inserts):
+                # Without gap locks (READ COMMITTED) another request can still get in
+                # first. Which pairs it took is unknown, so the chunk is not applied.
+                raise ConcurrentEnrollment()
+            record_enrollments(inserts)
+
+        db.session.commit()
+        response_cache.invalidate(*{f'enrollment:{course_id}' for _, course_id in inserts})
+
+    except Exception:
+        db.session.rollback()
+        for result in results:
+            if result['status'] in (None, 'registered'):
+                result['status'] = 'failed'
+
+    return results
+
+
 @app.route('/register-lecturer', methods=['POST'])
+@token_required
 def register_lecturer():
     data = request.json
     
     if not all(field in data for field in ['lecturer_id', 'course_id']):
         return jsonify({'message': 'Missing lecturer_id or course_id'}), 400
-    
-    sql = text("SELECT * FROM user WHERE userid = :lecturer_id")
-    user = db.session.execute(sql, {'lecturer_id': data['lecturer_id']}).fetchone()
-    
-    if not user:
-        return jsonify({'message': 'User not found'}), 404
-    
-    if user[2] != 'lecturer':
+
+    if g.user['role'] == 'lecturer':
+        if not is_current_user(data['lecturer_id']):
+            return jsonify({'message': 'Lecturers can only register themselves'}), 403
+    elif g.user['role'] == 'admin':
+        sql = text("SELECT * FROM user WHERE userid = :lecturer_id")
+        user = db.session.execute(sql, {'lecturer_id': data['lecturer_id']}).fetchone()
+
+        if not user:
+            return jsonify({'message': 'User not found'}), 404
+
+        if user[2] != 'lecturer':
+            return jsonify({'message': 'Only lecturers can register for courses'}), 403
+    else:
         return jsonify({'message': 'Only lecturers can register for courses'}), 403
     
-    sql = text("SELECT * FROM course WHERE course_id = :course_id")
-    course = db.session.execute(sql, {'course_id': data['course_id']}).fetchone()
-    
-    if not course:
-        return jsonify({'message': 'Course not found'}), 404
+    params = {'lecturer_id': data['lecturer_id'], 'course_id': data['course_id']}
 
-    if course[2] == data['lecturer_id']:  
-        return jsonify({'message': 'Lecturer is already registered for this course'}), 400
+    # The outgoing lecturer loses the course before the row is reassigned.
+    sql = text("""
+        UPDATE lecturer_stats ls
+        JOIN course c ON c.lecturer_id = ls.lecturer_id
+        SET ls.course_count = ls.course_count - 1
+        WHERE c.course_id = :course_id AND NOT (c.lecturer_id <=> :lecturer_id)
+    """)
+    db.session.execute(sql, params)
 
-    sql = text("UPDATE course SET lecturer_id = :lecturer_id WHERE course_id = :course_id")
-    db.session.execute(sql, {'lecturer_id': data['lecturer_id'], 'course_id': data['course_id']})
-    db.session.commit()
+    sql = text("""
+        UPDATE course SET lecturer_id = :lecturer_id
+        WHERE course_id = :course_id AND NOT (lecturer_id <=> :lecturer_id)
+    """)
+    result = db.session.execute(sql, params)
+
+    if result.rowcount:
+        upsert_counts('lecturer_stats', 'lecturer_id', 'course_count', {data['lecturer_id']: 1})
+        db.session.commit()
+        course_cache.invalidate(data['course_id'])
+        response_cache.invalidate('lecturers')
+    else:
+        db.session.rollback()
+
+        # Only the failure path pays for working out why nothing matched.
+        course = get_course(data['course_id'])
+
+        if not course:
+            return jsonify({'message': 'Course not found'}), 404
+
+        return jsonify({'message': 'Lecturer is already registered for this course'}), 400
     
     return jsonify({'message': 'Lecturer successfully registered for the course'})
 
 
 @app.route('/course-members/<int:course_id>', methods=['GET'])
+@read_only
 def get_course_members(course_id):
-    sql = text("SELECT * FROM course WHERE course_id = :course_id")
-    course = db.session.execute(sql, {'course_id': course_id}).fetchone()
+    limit, (after,) = page_args(FIRST_PAGE, max_size=STREAM_MAX_PAGE_SIZE)
+
+    course = get_course(course_id)
     
     if not course:
         return jsonify({'message': 'Course not found'}), 404
     
     lecturer_info = None
-    students = []
 
     if course[2]:  
         sql = text("SELECT userid, name, email, role FROM user WHERE userid = :lecturer_id")
@@ -258,65 +1059,110 @@ def get_course_members(course_id):
         SELECT u.userid, u.name, u.email
         FROM user u
         JOIN course_registration cr ON u.userid = cr.stud_id
-        WHERE cr.course_id = :course_id AND u.role = 'student'
+        WHERE cr.course_id = :course_id AND cr.stud_id > :after AND u.role = 'student'
+        ORDER BY cr.stud_id
+        LIMIT :limit
     """)
-    student_results = db.session.execute(sql, {'course_id': course_id}).fetchall()
-    
-    for student in student_results:
-        students.append({
-            'student_id': student[0],
-            'name': student[1],
-            'email': student[2]
-        })
+    students = stream_rows(sql, {'course_id': course_id, 'after': after, 'limit': limit + 1})
 
-    return jsonify({
-        'message': 'Course members retrieved successfully',
-        'lecturer': lecturer_info,
-        'students': students
-    })
+    page = {'next_cursor': None}
+    return streamed(encode_rows(
+        stream_page(students, limit, lambda student: (student[0],), page),
+        ('student_id', 'name', 'email'),
+        key='students',
+        head={'message': 'Course members retrieved successfully', 'lecturer': lecturer_info},
+        tail=lambda: page
+    ))
 
 
 @app.route('/calendar', methods=['POST'])
+@token_required
 def create_event():
     data = request.json
 
     if not all(field in data for field in ['event_title', 'event_date', 'course_id']):
         return jsonify({'message': 'Missing required fields'}), 400
     
-    sql = text("SELECT * FROM course WHERE course_id = :course_id")
-    course = db.session.execute(sql, {'course_id': data['course_id']}).fetchone()
-    
-    if not course:
-        return jsonify({'message': 'Course not found'}), 404
-    
-    sql = text("""
-        INSERT INTO calendar_event (event_title, event_date, course_id) 
-        VALUES (:event_title, :event_date, :course_id)
-    """)
-    db.session.execute(sql, {
-        'event_title': data['event_title'],
-        'event_date': data['event_date'],
-        'course_id': data['course_id']
-    })
-    db.session.commit()
+    try:
+        sql = text("""
+            INSERT INTO calendar_event (event_title, event_date, course_id) 
+            VALUES (:event_title, :event_date, :course_id)
+        """)
+        db.session.execute(sql, {
+            'event_title': data['event_title'],
+            'event_date': data['event_date'],
+            'course_id': data['course_id']
+        })
+        bump_version('calendar', data['course_id'])
+        db.session.commit()
+    except IntegrityError as e:
+        db.session.rollback()
+        if mysql_error_code(e) == FOREIGN_KEY_VIOLATION:
+            return jsonify({'message': 'Course not found'}), 404
+        raise
 
     return jsonify({'message': 'Event created successfully'})
 
 
+AGENDA_DEFAULT_DAYS = int(os.getenv('AGENDA_DEFAULT_DAYS', 7))
+AGENDA_MAX_DAYS = int(os.getenv('AGENDA_MAX_DAYS', 366))
+
+
+# Bounds of MySQL's DATETIME, used when one side of a range is left open
+EARLIEST_DATETIME = datetime(1000, 1, 1)
+LATEST_DATETIME = datetime(9999, 12, 31, 23, 59, 59)
+
+
+class InvalidDateRange(ValueError):
+    pass
+
+
+@app.errorhandler(InvalidDateRange)
+def invalid_date_range(e):
+    return jsonify({'message': str(e)}), 400
+
+
+# Calendar queries use half-open ranges (event_date >= start AND event_date < end) so
+# they can be answered by a range scan on the (course_id, event_date) index.
+def date_range_args(default_start=None, default_days=None):
+    try:
+        start = request.args.get('from')
+        start = datetime.fromisoformat(start) if start else default_start
+        end = request.args.get('to')
+        end = datetime.fromisoformat(end) if end else None
+    except ValueError:
+        raise InvalidDateRange('from and to must be ISO 8601 dates or datetimes')
+
+    if end is None and start is not None and default_days is not None:
+        end = start + timedelta(days=default_days)
+
+    if start is not None and end is not None:
+        if end <= start:
+            raise InvalidDateRange('to must be later than from')
+        if default_days is not None and end - start > timedelta(days=AGENDA_MAX_DAYS):
+            raise InvalidDateRange(f'Date range cannot exceed {AGENDA_MAX_DAYS} days')
+
+    return start or EARLIEST_DATETIME, end or LATEST_DATETIME
+
+
 @app.route('/calendar/course/<int:course_id>', methods=['GET'])
+@read_only
+@versioned('calendar')
 def get_course_events(course_id):
-    sql = text("SELECT * FROM course WHERE course_id = :course_id")
-    course = db.session.execute(sql, {'course_id': course_id}).fetchone()
+    course = get_course(course_id)
     
     if not course:
         return jsonify({'message': 'Course not found'}), 404
+
+    start, end = date_range_args()
     
     sql = text("""
         SELECT event_id, event_title, event_date 
         FROM calendar_event
-        WHERE course_id = :course_id
+        WHERE course_id = :course_id AND event_date >= :start AND event_date < :end
+        ORDER BY event_date, event_id
     """)
-    events = db.session.execute(sql, {'course_id': course_id}).fetchall()
+    events = db.session.execute(sql, {'course_id': course_id, 'start': start, 'end': end}).fetchall()
     
     event_list = []
     for event in events:
@@ -329,34 +1175,292 @@ def get_course_events(course_id):
     return jsonify({'events': event_list})
 
 
-@app.route('/calendar/student/<int:student_id>/<date>', methods=['GET'])
-def get_student_events(student_id, date):
+# The student's registrations come from the (stud_id, course_id) primary key, then each
+# course contributes one (course_id, event_date) range scan, so the cost tracks the
+# events inside the window rather than every event on the calendar.
+def student_agenda(student_id, start, end):
+    sql = text("""
+        SELECT ce.event_id, ce.event_title, ce.event_date, ce.course_id
+        FROM course_registration cr
+        JOIN calendar_event ce ON ce.course_id = cr.course_id
+        WHERE cr.stud_id = :student_id AND ce.event_date >= :start AND ce.event_date < :end
+        ORDER BY ce.event_date, ce.event_id
+    """)
+    events = db.session.execute(sql, {'student_id': student_id, 'start': start, 'end': end}).fetchall()
+
+    return [{
+        'event_id': event[0],
+        'event_title': event[1],
+        'event_date': event[2],
+        'course_id': event[3]
+    } for event in events]
+
+
+@app.route('/calendar/student/<int:student_id>', methods=['GET'])
+@read_only
+@token_required
+def get_student_agenda(student_id):
+    if g.user['role'] != 'student':
+        return jsonify({'message': 'Only students can access this route'}), 403
+
+    if not is_current_user(student_id):
+        return jsonify({'message': 'Students can only view their own calendar'}), 403
+
+    today = datetime.utcnow().replace(hour=0, minute=0, second=0, microsecond=0)
+    start, end = date_range_args(default_start=today, default_days=AGENDA_DEFAULT_DAYS)
+
+    return jsonify({
+        'from': start.isoformat(),
+        'to': end.isoformat(),
+        'events': student_agenda(student_id, start, end)
+    })
+
+
+@app.route('/calendar/student/<int:student_id>/<date>', methods=['GET'])
+@read_only
+@token_required
+def get_student_events(student_id, date):
+    if g.user['role'] != 'student':
+        return jsonify({'message': 'Only students can access this route'}), 403
+
+    if not is_current_user(student_id):
+        return jsonify({'message': 'Students can only view their own calendar'}), 403
+
+    try:
+        start = datetime.strptime(date, '%Y-%m-%d')
+    except ValueError:
+        return jsonify({'message': 'Date must be in YYYY-MM-DD format'}), 400
+
+    return jsonify({'events': student_agenda(student_id, start, start + timedelta(days=1))})
+
+
+DASHBOARD_DEFAULT_DAYS = int(os.getenv('DASHBOARD_DEFAULT_DAYS', 14))
+DASHBOARD_MAX_ASSIGNMENTS = int(os.getenv('DASHBOARD_MAX_ASSIGNMENTS', 50))
+DASHBOARD_CONTENT_PER_COURSE = int(os.getenv('DASHBOARD_CONTENT_PER_COURSE', 5))
+
+
+# A dashboard replaces the course list plus the per-course assignments, calendar and
+# content calls with one request. The course query yields the course ids, and each
+# section is then one statement over all of them, so a dashboard costs four queries
+# however many courses the user has.
+def dashboard_window():
+    days = max(1, min(request.args.get('days', DASHBOARD_DEFAULT_DAYS, type=int), AGENDA_MAX_DAYS))
+    start = datetime.utcnow().replace(microsecond=0)
+    return start, start + timedelta(days=days)
+
+
+def dashboard_events(course_ids, start, end):
+    sql = text("""
+        SELECT event_id, event_title, event_date, course_id
+        FROM calendar_event
+        WHERE course_id IN :course_ids AND event_date >= :start AND event_date < :end
+        ORDER BY event_date, event_id
+    """).bindparams(bindparam('course_ids', expanding=True))
+    events = db.session.execute(sql, {'course_ids': course_ids, 'start': start, 'end': end}).fetchall()
+
+    return [{
+        'event_id': event[0],
+        'event_title': event[1],
+        'event_date': event[2].isoformat() if event[2] else None,
+        'course_id': event[3]
+    } for event in events]
+
+
+# The newest few items of every course, each read from the course's end of the
+# course_id index rather than by sorting all of the courses' content.
+def dashboard_content(course_ids):
+    sql = text("""
+        SELECT cc.content_id, cc.content_title, cc.content_url, cc.content_type, cc.section_id, c.course_id
+        FROM course c
+        JOIN LATERAL (
+            SELECT content_id, content_title, content_url, content_type, section_id
+            FROM course_content
+            WHERE course_id = c.course_id
+            ORDER BY content_id DESC
+            LIMIT :per_course
+        ) cc ON TRUE
+        WHERE c.course_id IN :course_ids
+        ORDER BY c.course_id, cc.content_id DESC
+    """).bindparams(bindparam('course_ids', expanding=True))
+    content = db.session.execute(sql, {'course_ids': course_ids, 'per_course': DASHBOARD_CONTENT_PER_COURSE}).fetchall()
+
+    return [{
+        'content_id': row[0],
+        'content_title': row[1],
+        'content_url': row[2],
+        'content_type': row[3],
+        'section_id': row[4],
+        'course_id': row[5]
+    } for row in content]
+
+
+def submission_status(submitted_at, grade):
+    if grade is not None:
+        return 'graded'
+    return 'submitted' if submitted_at is not None else 'not_submitted'
+
+
+@app.route('/dashboard/student/<int:userid>', methods=['GET'])
+@read_only
+@token_required
+def get_student_dashboard(userid):
+    if g.user['role'] != 'student':
+        return jsonify({'message': 'Only students can access this route'}), 403
+
+    if not is_current_user(userid):
+        return jsonify({'message': 'Students can only view their own dashboard'}), 403
+
+    start, end = dashboard_window()
+
+    sql = text("""
+        SELECT c.course_id, c.course_name, c.lecturer_id, u.name
+        FROM course_registration cr
+        JOIN course c ON c.course_id = cr.course_id
+        LEFT JOIN user u ON u.userid = c.lecturer_id
+        WHERE cr.stud_id = :userid
+        ORDER BY cr.course_id
+    """)
+    courses = db.session.execute(sql, {'userid': userid}).fetchall()
+    course_ids = [course[0] for course in courses]
+
+    events, assignment_list, content = [], [], []
+    if course_ids:
+        events = dashboard_events(course_ids, start, end)
+
+        # Open assignments of all the student's courses, each with the student's own
+        # submission, if any.
+        sql = text("""
+            SELECT a.assign_id, a.course_id, a.title, a.due_date, s.submitted_at, s.grade
+            FROM assignment a
+            LEFT JOIN submission s ON s.assign_id = a.assign_id AND s.stud_id = :userid
+            WHERE a.course_id IN :course_ids AND a.due_date >= :start AND a.due_date < :end
+            ORDER BY a.due_date, a.assign_id
+            LIMIT :limit
+        """).bindparams(bindparam('course_ids', expanding=True))
+        assignments = db.session.execute(sql, {
+            'userid': userid,
+            'course_ids': course_ids,
+            'start': start,
+            'end': end,
+            'limit': DASHBOARD_MAX_ASSIGNMENTS
+        }).fetchall()
+
+        assignment_list = [{
+            'assign_id': assignment[0],
+            'course_id': assignment[1],
+            'title': assignment[2],
+            'due_date': assignment[3].isoformat() if assignment[3] else None,
+            'status': submission_status(assignment[4], assignment[5]),
+            'submitted_at': assignment[4].isoformat() if assignment[4] else None,
+            'grade': float(assignment[5]) if assignment[5] is not None else None
+        } for assignment in assignments]
+
+        content = dashboard_content(course_ids)
+
+    return jsonify({
+        'from': start.isoformat(),
+        'to': end.isoformat(),
+        'courses': [{
+            'course_id': course[0],
+            'course_name': course[1],
+            'lecturer_id': course[2],
+            'lecturer_name': course[3]
+        } for course in courses],
+        'events': events,
+        'assignments': assignment_list,
+        'content': content
+    })
+
+
+@app.route('/dashboard/lecturer/<int:userid>', methods=['GET'])
+@read_only
+@token_required
+def get_lecturer_dashboard(userid):
+    error = authorize_lecturer_courses(userid)
+    if error:
+        return error
+
+    start, end = dashboard_window()
+
+    # The lecturer's courses as listed by get_lecturer_courses, with enrollment counts.
     sql = text("""
-        SELECT ce.event_id, ce.event_title, ce.event_date, ce.course_id
-        FROM calendar_event ce
-        JOIN course_registration cr ON ce.course_id = cr.course_id
-        WHERE cr.stud_id = :student_id AND ce.event_date = :date
+        SELECT c.course_id, c.course_name, COALESCE(cs.student_count, 0)
+        FROM course c
+        LEFT JOIN course_stats cs ON cs.course_id = c.course_id
+        WHERE c.lecturer_id = :userid
+        ORDER BY c.course_id
     """)
-    events = db.session.execute(sql, {'student_id': student_id, 'date': date}).fetchall()
-    
-    event_list = []
-    for event in events:
-        event_list.append({
-            'event_id': event[0],
-            'event_title': event[1],
-            'event_date': event[2],
-            'course_id': event[3]
-        })
-    
-    return jsonify({'events': event_list})
+    courses = db.session.execute(sql, {'userid': userid}).fetchall()
+    course_ids = [course[0] for course in courses]
+
+    events, assignment_list, content = [], [], []
+    if course_ids:
+        events = dashboard_events(course_ids, start, end)
+
+        sql = text("""
+            SELECT a.assign_id, a.course_id, a.title, a.due_date, COUNT(s.stud_id), COUNT(s.grade)
+            FROM assignment a
+            LEFT JOIN submission s ON s.assign_id = a.assign_id
+            WHERE a.course_id IN :course_ids AND a.due_date >= :start AND a.due_date < :end
+            GROUP BY a.assign_id, a.course_id, a.title, a.due_date
+            ORDER BY a.due_date, a.assign_id
+            LIMIT :limit
+        """).bindparams(bindparam('course_ids', expanding=True))
+        assignments = db.session.execute(sql, {
+            'course_ids': course_ids,
+            'start': start,
+            'end': end,
+            'limit': DASHBOARD_MAX_ASSIGNMENTS
+        }).fetchall()
+
+        assignment_list = [{
+            'assign_id': assignment[0],
+            'course_id': assignment[1],
+            'title': assignment[2],
+            'due_date': assignment[3].isoformat() if assignment[3] else None,
+            'submitted': assignment[4],
+            'graded': assignment[5],
+            'ungraded': assignment[4] - assignment[5]
+        } for assignment in assignments]
+
+        content = dashboard_content(course_ids)
+
+    return jsonify({
+        'from': start.isoformat(),
+        'to': end.isoformat(),
+        'courses': [{
+            'course_id': course[0],
+            'course_name': course[1],
+            'student_count': course[2]
+        } for course in courses],
+        'events': events,
+        'assignments': assignment_list,
+        'content': content
+    })
 
 
 @app.route('/forum/<int:course_id>', methods=['GET', 'POST'])
+@read_only
+@cached('course:{course_id}')
 def forum(course_id):
     if request.method == 'GET':
-        sql = text("SELECT forum_id, forum_title FROM forum WHERE course_id = :course_id")
-        result = db.session.execute(sql, {'course_id': course_id}).fetchall()
-        return jsonify([{'forum_id': row[0], 'forum_title': row[1]} for row in result])
+        limit, (after,) = page_args(FIRST_PAGE)
+
+        sql = text("""
+            SELECT forum_id, forum_title
+            FROM forum
+            WHERE course_id = :course_id AND forum_id > :after
+            ORDER BY forum_id
+            LIMIT :limit
+        """)
+        result = db.session.execute(sql, {'course_id': course_id, 'after': after, 'limit': limit + 1}).fetchall()
+        result, next_cursor = next_page(result, limit, lambda row: (row[0],))
+
+        return paginated([{'forum_id': row[0], 'forum_title': row[1]} for row in result], next_cursor)
+
+    error = authenticate()
+    if error:
+        return error
 
     data = request.json
     forum_title = data.get('forum_title')
@@ -365,47 +1469,66 @@ def forum(course_id):
         return jsonify({'error': 'Forum title is required'}), 400
 
     sql = text("INSERT INTO forum (course_id, forum_title) VALUES (:course_id, :forum_title)")
-    db.session.execute(sql, {'course_id': course_id, 'forum_title': forum_title})
+    result = db.session.execute(sql, {'course_id': course_id, 'forum_title': forum_title})
+    forum_id = result.lastrowid
     db.session.commit()
-
-    forum_id = db.session.execute(text("SELECT LAST_INSERT_ID()")).fetchone()[0]
+    response_cache.invalidate(f'course:{course_id}')
 
     return jsonify({'message': 'Forum created', 'forum_id': forum_id, 'forum_title': forum_title})
 
 
 @app.route('/threads/<int:forum_id>', methods=['GET', 'POST'])
+@read_only
+@cached('forum:{forum_id}')
 def threads(forum_id):
     if request.method == 'GET':
+        limit, (after,) = page_args(FIRST_PAGE)
+
         sql = text("""
-            SELECT t.thread_id, t.dis_title, t.created_by, u.name as creator_name
+            SELECT t.thread_id, t.dis_title, t.created_by, u.name as creator_name,
+                   t.reply_count, t.last_activity_at
             FROM discussion_thread t
             JOIN user u ON t.created_by = u.userid
-            WHERE t.forum_id = :forum_id
+            WHERE t.forum_id = :forum_id AND t.thread_id > :after
+            ORDER BY t.thread_id
+            LIMIT :limit
         """)
-        result = db.session.execute(sql, {'forum_id': forum_id}).fetchall()
-        return jsonify([{
+        result = db.session.execute(sql, {'forum_id': forum_id, 'after': after, 'limit': limit + 1}).fetchall()
+        result, next_cursor = next_page(result, limit, lambda row: (row[0],))
+
+        return paginated([{
             'thread_id': row[0], 
             'dis_title': row[1],
             'created_by': row[2],
-            'creator_name': row[3]
-        } for row in result])
+            'creator_name': row[3],
+            'reply_count': row[4],
+            'last_activity_at': row[5].isoformat() if row[5] else None
+        } for row in result], next_cursor)
 
+    error = authenticate()
+    if error:
+        return error
+
+    # The creator is the token's user; a created_by in the body has to match it.
     data = request.json
-    if not all(field in data for field in ['dis_title', 'created_by']):
-        return jsonify({'error': 'Discussion title and creator ID are required'}), 400
+    if not is_current_user(data.get('created_by')):
+        return jsonify({'error': 'Threads can only be created as yourself'}), 403
+    if 'dis_title' not in data:
+        return jsonify({'error': 'Discussion title is required'}), 400
     
     sql = text("""
-        INSERT INTO discussion_thread (forum_id, dis_title, created_by) 
-        VALUES (:forum_id, :dis_title, :created_by)
+        INSERT INTO discussion_thread (forum_id, dis_title, created_by, last_activity_at) 
+        VALUES (:forum_id, :dis_title, :created_by, :created_at)
     """)
-    db.session.execute(sql, {
+    result = db.session.execute(sql, {
         'forum_id': forum_id,
         'dis_title': data['dis_title'],
-        'created_by': data['created_by']
+        'created_by': g.user['userid'],
+        'created_at': datetime.utcnow()
     })
+    thread_id = result.lastrowid
     db.session.commit()
-
-    thread_id = db.session.execute(text("SELECT LAST_INSERT_ID()")).fetchone()[0]
+    response_cache.invalidate(f'forum:{forum_id}')
 
     return jsonify({
         'message': 'Thread added', 
@@ -415,70 +1538,194 @@ def threads(forum_id):
 
 
 @app.route('/threads/<int:thread_id>/replies', methods=['GET', 'POST'])
+@read_only
 def thread_replies(thread_id):
     if request.method == 'GET':
+        if request.args.get('nested') in ('1', 'true'):
+            limit, (after_at, after_id) = page_args(FIRST_PAGE_AT, FIRST_PAGE)
+            return nested_replies(thread_id, limit, after_at, after_id)
+
+        limit, (after_at, after_id) = page_args(FIRST_PAGE_AT, FIRST_PAGE, max_size=STREAM_MAX_PAGE_SIZE)
+        params = {'thread_id': thread_id, 'after_at': after_at, 'after_id': after_id}
+
+        # The flat view is a bare list, so its cursor can only go in the header. The page
+        # end is found from the (thread_id, replied_at, reply_id) index alone, and the
+        # replies and their text are then streamed up to it.
         sql = text("""
-            SELECT r.reply_id, r.user_id, u.name as user_name, r.reply_text, r.replied_at
+            SELECT replied_at, reply_id
+            FROM thread_reply
+            WHERE thread_id = :thread_id
+              AND (replied_at > :after_at OR (replied_at = :after_at AND reply_id > :after_id))
+            ORDER BY replied_at ASC, reply_id ASC
+            LIMIT :limit
+        """)
+        until, next_cursor = page_end(sql, dict(params, limit=limit + 1), limit)
+        until_at, until_id = until or (None, None)
+
+        sql = text("""
+            SELECT r.reply_id, r.user_id, u.name as user_name, r.reply_text, r.replied_at, r.parent_reply_id
             FROM thread_reply r
             JOIN user u ON r.user_id = u.userid
             WHERE r.thread_id = :thread_id
-            ORDER BY r.replied_at ASC
+              AND (r.replied_at > :after_at OR (r.replied_at = :after_at AND r.reply_id > :after_id))
+              AND (:until_id IS NULL OR r.replied_at < :until_at
+                   OR (r.replied_at = :until_at AND r.reply_id <= :until_id))
+            ORDER BY r.replied_at ASC, r.reply_id ASC
         """)
-        replies = db.session.execute(sql, {'thread_id': thread_id}).fetchall()
-        
-        return jsonify([{
-            'reply_id': reply[0],
-            'user_id': reply[1],
-            'user_name': reply[2],
-            'reply_text': reply[3],
-            'replied_at': reply[4].isoformat() if reply[4] else None
-        } for reply in replies])
+        replies = stream_rows(sql, dict(params, until_at=until_at, until_id=until_id))
+
+        return streamed(encode_rows(
+            replies, ('reply_id', 'user_id', 'user_name', 'reply_text', 'replied_at', 'parent_reply_id')
+        ), next_cursor)
     
+    error = authenticate()
+    if error:
+        return error
+
+    # As for threads, the author comes from the token.
     data = request.json
-    if not all(field in data for field in ['user_id', 'reply_text']):
-        return jsonify({'error': 'User ID and reply text are required'}), 400
-    
-    sql = text("SELECT * FROM discussion_thread WHERE thread_id = :thread_id")
-    thread = db.session.execute(sql, {'thread_id': thread_id}).fetchone()
-    
-    if not thread:
-        return jsonify({'error': 'Thread not found'}), 404
-    
+    if not is_current_user(data.get('user_id')):
+        return jsonify({'error': 'Replies can only be posted as yourself'}), 403
+    if 'reply_text' not in data:
+        return jsonify({'error': 'Reply text is required'}), 400
+
+    parent_reply_id = data.get('parent_reply_id')
     now = datetime.utcnow()
     
+    # A parent reply has to belong to the same thread for the row to be inserted.
     sql = text("""
-        INSERT INTO thread_reply (thread_id, user_id, reply_text, replied_at) 
-        VALUES (:thread_id, :user_id, :reply_text, :replied_at)
+        INSERT INTO thread_reply (thread_id, user_id, reply_text, replied_at, parent_reply_id) 
+        SELECT t.thread_id, :user_id, :reply_text, :replied_at, :parent_reply_id
+        FROM discussion_thread t
+        WHERE t.thread_id = :thread_id
+          AND (:parent_reply_id IS NULL OR EXISTS (
+              SELECT 1 FROM thread_reply p
+              WHERE p.reply_id = :parent_reply_id AND p.thread_id = t.thread_id
+          ))
     """)
-    db.session.execute(sql, {
-        'thread_id': thread_id,
-        'user_id': data['user_id'],
-        'reply_text': data['reply_text'],
-        'replied_at': now
-    })
+    try:
+        result = db.session.execute(sql, {
+            'thread_id': thread_id,
+            'user_id': g.user['userid'],
+            'reply_text': data['reply_text'],
+            'replied_at': now,
+            'parent_reply_id': parent_reply_id
+        })
+    except IntegrityError as e:
+        db.session.rollback()
+        if mysql_error_code(e) == FOREIGN_KEY_VIOLATION:
+            return jsonify({'error': 'User not found'}), 404
+        raise
+
+    if result.rowcount == 0:
+        db.session.rollback()
+        if parent_reply_id is not None and get_thread_forum_id(thread_id) is not None:
+            return jsonify({'error': 'Parent reply not found in this thread'}), 400
+        return jsonify({'error': 'Thread not found'}), 404
+
+    reply_id = result.lastrowid
+
+    sql = text("""
+        UPDATE discussion_thread
+        SET reply_count = reply_count + 1, last_activity_at = :replied_at
+        WHERE thread_id = :thread_id
+    """)
+    db.session.execute(sql, {'thread_id': thread_id, 'replied_at': now})
     db.session.commit()
-    
-    reply_id = db.session.execute(text("SELECT LAST_INSERT_ID()")).fetchone()[0]
+    response_cache.invalidate(f'forum:{get_thread_forum_id(thread_id)}')
     
     return jsonify({
         'message': 'Reply added',
         'reply_id': reply_id,
+        'parent_reply_id': parent_reply_id,
         'replied_at': now.isoformat()
     })
 
 
+# Pages by top-level reply on (replied_at, reply_id) and returns each one with its whole
+# subtree. One recursive query fetches the page's roots and every descendant; the
+# tree is then assembled in a single pass over the rows.
+def nested_replies(thread_id, limit, after_at, after_id):
+    sql = text("""
+        WITH RECURSIVE page AS (
+            SELECT reply_id, replied_at
+            FROM thread_reply
+            WHERE thread_id = :thread_id AND parent_reply_id IS NULL
+              AND (replied_at > :after_at OR (replied_at = :after_at AND reply_id > :after_id))
+            ORDER BY replied_at, reply_id
+            LIMIT :fetch
+        ),
+        roots AS (
+            SELECT reply_id FROM page
+            ORDER BY replied_at, reply_id
+            LIMIT :limit
+        ),
+        tree AS (
+            SELECT r.reply_id, r.parent_reply_id, r.user_id, r.reply_text, r.replied_at
+            FROM thread_reply r
+            JOIN roots ON roots.reply_id = r.reply_id
+            UNION ALL
+            SELECT r.reply_id, r.parent_reply_id, r.user_id, r.reply_text, r.replied_at
+            FROM thread_reply r
+            JOIN tree ON r.parent_reply_id = tree.reply_id
+        )
+        SELECT tree.reply_id, tree.parent_reply_id, tree.user_id, u.name, tree.reply_text, tree.replied_at,
+               (SELECT COUNT(*) FROM page) > :limit AS has_more
+        FROM tree
+        JOIN user u ON u.userid = tree.user_id
+        ORDER BY tree.replied_at, tree.reply_id
+    """)
+    rows = db.session.execute(sql, {
+        'thread_id': thread_id,
+        'after_at': after_at,
+        'after_id': after_id,
+        'fetch': limit + 1,
+        'limit': limit
+    }).fetchall()
+
+    nodes = {}
+    roots = []
+    last_root_key = None
+    for row in rows:
+        node = nodes.setdefault(row[0], {'replies': []})
+        node.update({
+            'reply_id': row[0],
+            'user_id': row[2],
+            'user_name': row[3],
+            'reply_text': row[4],
+            'replied_at': row[5].isoformat() if row[5] else None
+        })
+        if row[1] is None:
+            roots.append(node)
+            last_root_key = (row[5], row[0])
+        else:
+            nodes.setdefault(row[1], {'replies': []})['replies'].append(node)
+
+    next_cursor = encode_cursor(*last_root_key) if rows and rows[0][6] else None
+
+    return paginated({'replies': roots}, next_cursor)
+
+
 @app.route('/content/<int:course_id>', methods=['GET', 'POST'])
+@read_only
+@versioned('content')
+@cached('course:{course_id}')
 def course_content(course_id):
     if request.method == 'GET':
+        limit, (after,) = page_args(FIRST_PAGE)
+
         try:
             sql = text("""
                 SELECT content_id, content_title, content_url, content_type, section_id 
                 FROM course_content 
-                WHERE course_id = :course_id
+                WHERE course_id = :course_id AND content_id > :after
+                ORDER BY content_id
+                LIMIT :limit
             """)
-            result = db.session.execute(sql, {'course_id': course_id}).fetchall()
+            result = db.session.execute(sql, {'course_id': course_id, 'after': after, 'limit': limit + 1}).fetchall()
+            result, next_cursor = next_page(result, limit, lambda row: (row[0],))
        
-            if not result:
+            if not result and after == FIRST_PAGE:
                 return jsonify({'message': 'No content found for this course'}), 404
 
             content_list = []
@@ -491,24 +1738,22 @@ def course_content(course_id):
                     'section_id': row[4]
                 })
             
-            return jsonify({'content': content_list})
+            return paginated({'content': content_list}, next_cursor)
 
         except Exception as e:
             return jsonify({'error': f'Error fetching course content: {str(e)}'}), 500
 
-    userid = request.json.get('userid')
-    if not userid:
-        return jsonify({'error': 'User ID is required'}), 400
+    error = authenticate()
+    if error:
+        return error
+
+    if not is_current_user(request.json.get('userid')):
+        return jsonify({'error': 'Unauthorized. Only the lecturer of this course can add content.'}), 403
 
     try:
-        lecturer_sql = text("""
-            SELECT lecturer_id 
-            FROM course 
-            WHERE course_id = :course_id
-        """)
-        lecturer_id = db.session.execute(lecturer_sql, {'course_id': course_id}).scalar()
+        lecturer_id = get_course_lecturer(course_id)
 
-        if lecturer_id != userid:
+        if lecturer_id != g.user['userid']:
             return jsonify({'error': 'Unauthorized. Only the lecturer of this course can add content.'}), 403
 
         data = request.json
@@ -522,16 +1767,17 @@ def course_content(course_id):
             (content_title, content_url, content_type, section_id, course_id) 
             VALUES (:content_title, :content_url, :content_type, :section_id, :course_id)
         """)
-        db.session.execute(sql, {
+        result = db.session.execute(sql, {
             'content_title': data['content_title'],
             'content_url': data['content_url'],
             'content_type': data['content_type'],
             'section_id': data['section_id'],
             'course_id': course_id
         })
+        content_id = result.lastrowid
+        bump_version('content', course_id)
         db.session.commit()
-
-        content_id = db.session.execute(text("SELECT LAST_INSERT_ID()")).fetchone()[0]
+        response_cache.invalidate(f'course:{course_id}')
 
         return jsonify({
             'message': 'Course content added',
@@ -544,36 +1790,39 @@ def course_content(course_id):
 
 
 @app.route('/assignments/<int:course_id>', methods=['GET', 'POST'])
+@read_only
+@versioned('assignments')
+@cached('course:{course_id}')
 def assignments(course_id):
     if request.method == 'GET':
+        limit, (after,) = page_args(FIRST_PAGE, max_size=STREAM_MAX_PAGE_SIZE)
+
         sql = text("""
             SELECT assign_id, title, description, due_date 
             FROM assignment
-            WHERE course_id = :course_id
+            WHERE course_id = :course_id AND assign_id > :after
+            ORDER BY assign_id
+            LIMIT :limit
         """)
-        assignments = db.session.execute(sql, {'course_id': course_id}).fetchall()
-        
-        assignment_list = []
-        for assignment in assignments:
-            assignment_list.append({
-                'assign_id': assignment[0],
-                'title': assignment[1],
-                'description': assignment[2],
-                'due_date': assignment[3].isoformat() if assignment[3] else None
-            })
-        
-        return jsonify({'assignments': assignment_list})
+        assignments = stream_rows(sql, {'course_id': course_id, 'after': after, 'limit': limit + 1})
+
+        # As in get_course_members, the cursor follows the rows in the body.
+        page = {'next_cursor': None}
+        return streamed(encode_rows(
+            stream_page(assignments, limit, lambda assignment: (assignment[0],), page),
+            ('assign_id', 'title', 'description', 'due_date'),
+            key='assignments', tail=lambda: page
+        ))
     
+    error = authenticate()
+    if error:
+        return error
+
     data = request.json
-    lecturer_id = data.get('lecturer_id')
     
-    if not lecturer_id:
-        return jsonify({'error': 'Lecturer ID is required'}), 400
+    course_lecturer = get_course_lecturer(course_id)
     
-    sql = text("SELECT lecturer_id FROM course WHERE course_id = :course_id")
-    course_lecturer = db.session.execute(sql, {'course_id': course_id}).scalar()
-    
-    if course_lecturer != lecturer_id:
+    if course_lecturer != g.user['userid'] or not is_current_user(data.get('lecturer_id')):
         return jsonify({'error': 'Unauthorized. Only the lecturer of this course can create assignments.'}), 403
     
     if not all(field in data for field in ['title', 'description', 'due_date']):
@@ -583,15 +1832,16 @@ def assignments(course_id):
         INSERT INTO assignment (course_id, title, description, due_date)
         VALUES (:course_id, :title, :description, :due_date)
     """)
-    db.session.execute(sql, {
+    result = db.session.execute(sql, {
         'course_id': course_id,
         'title': data['title'],
         'description': data['description'],
         'due_date': data['due_date']
     })
+    assign_id = result.lastrowid
+    bump_version('assignments', course_id)
     db.session.commit()
-    
-    assign_id = db.session.execute(text("SELECT LAST_INSERT_ID()")).fetchone()[0]
+    response_cache.invalidate(f'course:{course_id}', f'grades:{course_id}')
     
     return jsonify({
         'message': 'Assignment created successfully',
@@ -599,122 +1849,521 @@ def assignments(course_id):
     })
 
 
+# Deadline surges: with SUBMISSION_INGEST_MODE=queued a submission is validated, appended
+# to a durable local log and acknowledged with a signed receipt; a background writer then
+# stores queued submissions in multi-row batches, one commit per batch. Students confirm
+# that theirs was stored through GET /assignment/<id>/submission. Queues are per process,
+# so while a submission waits only the worker that took it knows about it.
+SUBMISSION_INGEST_MODE = os.getenv('SUBMISSION_INGEST_MODE', 'direct')
+
+submission_queue = None
+if SUBMISSION_INGEST_MODE == 'queued':
+    submission_queue = SubmissionQueue(
+        app, db,
+        directory=os.getenv('SUBMISSION_WAL_DIR', os.path.join(app.instance_path, 'submission-wal')),
+        batch_size=int(os.getenv('SUBMISSION_BATCH_SIZE', 500)),
+        flush_interval=float(os.getenv('SUBMISSION_FLUSH_INTERVAL', 0.05)),
+        on_flush=lambda records: [invalidate_grade_analytics(assign_id)
+                                  for assign_id in {record['assign_id'] for record in records}]
+    )
+    registry.gauge('app_submission_queue_depth', 'Acknowledged submissions not yet stored.',
+                   callback=submission_queue.depth)
+
+
+def issue_receipt(record):
+    return jwt.encode({
+        'receipt_id': record['receipt_id'],
+        'sub': str(record['stud_id']),
+        'assign_id': record['assign_id'],
+        'submitted_at': record['submitted_at']
+    }, app.config['SECRET_KEY'], algorithm='HS256')
+
+
+def queue_submission(assign_id, student_id, submission_url):
+    # The checks the direct INSERT makes implicitly, as one read.
+    sql = text("""
+        SELECT cr.stud_id IS NOT NULL, s.stud_id IS NOT NULL
+        FROM assignment a
+        LEFT JOIN course_registration cr ON cr.course_id = a.course_id AND cr.stud_id = :student_id
+        LEFT JOIN submission s ON s.assign_id = a.assign_id AND s.stud_id = :student_id
+        WHERE a.assign_id = :assign_id
+    """)
+    row = db.session.execute(sql, {'assign_id': assign_id, 'student_id': student_id}).fetchone()
+
+    if row is None:
+        return jsonify({'error': 'Assignment not found'}), 404
+    if not row[0]:
+        return jsonify({'error': 'Student not enrolled in this course.'}), 403
+
+    record = None if row[1] else submission_queue.enqueue(assign_id, student_id, submission_url)
+    if record is None:
+        return jsonify({'error': 'You have already submitted this assignment.'}), 400
+
+    return jsonify({
+        'message': 'Assignment submission received.',
+        'receipt_id': record['receipt_id'],
+        'submitted_at': record['submitted_at'],
+        'receipt': issue_receipt(record)
+    }), 202
+
+
 @app.route('/assignment/<int:assign_id>/submit', methods=['POST'])
+@token_required
 def submit_assignment(assign_id):
     data = request.json
-    student_id = data.get('student_id')
+    student_id = g.user['userid']
     submission_url = data.get('submission_url')
     
-    if not student_id or not submission_url:
-        return jsonify({'error': 'Student ID and submission URL are required'}), 400
+    if not submission_url:
+        return jsonify({'error': 'Submission URL is required'}), 400
 
-    sql = text("SELECT course_id FROM assignment WHERE assign_id = :assign_id")
-    assignment = db.session.execute(sql, {'assign_id': assign_id}).fetchone()
-    
-    if not assignment:
-        return jsonify({'error': 'Assignment not found'}), 404
-    
-    course_id = assignment[0]
-    
-    sql = text("""
-        SELECT 1 FROM course_registration
-        WHERE stud_id = :student_id AND course_id = :course_id
-    """)
-    enrolled = db.session.execute(sql, {'student_id': student_id, 'course_id': course_id}).fetchone()
-    
-    if not enrolled:
-        return jsonify({'error': 'Student not enrolled in this course.'}), 403
-    
-    sql = text("""
-        SELECT 1 FROM submission
-        WHERE assign_id = :assign_id AND stud_id = :student_id
-    """)
-    existing_submission = db.session.execute(sql, {
-        'assign_id': assign_id, 
-        'student_id': student_id
-    }).fetchone()
-    
-    if existing_submission:
-        return jsonify({'error': 'You have already submitted this assignment.'}), 400
-    
-    now = datetime.utcnow()
+    if g.user['role'] != 'student' or not is_current_user(data.get('student_id')):
+        return jsonify({'error': 'Only the submitting student can submit this assignment.'}), 403
+
+    if submission_queue is not None:
+        return queue_submission(assign_id, student_id, submission_url)
+
+    # Whole seconds, as the queued path stores them, so both judge lateness alike.
+    now = datetime.utcnow().replace(microsecond=0)
     
+    # Inserts only when the assignment exists and the student is enrolled in its course;
+    # the (assign_id, stud_id) primary key rejects a second submission.
     sql = text("""
         INSERT INTO submission (assign_id, stud_id, submission_url, submitted_at)
-        VALUES (:assign_id, :student_id, :submission_url, :submitted_at)
+        SELECT a.assign_id, cr.stud_id, :submission_url, :submitted_at
+        FROM assignment a
+        JOIN course_registration cr ON cr.course_id = a.course_id AND cr.stud_id = :student_id
+        WHERE a.assign_id = :assign_id
     """)
-    db.session.execute(sql, {
-        'assign_id': assign_id,
-        'student_id': student_id,
-        'submission_url': submission_url,
-        'submitted_at': now
-    })
-    db.session.commit()
+    try:
+        result = db.session.execute(sql, {
+            'assign_id': assign_id,
+            'student_id': student_id,
+            'submission_url': submission_url,
+            'submitted_at': now
+        })
+        db.session.commit()
+    except IntegrityError as e:
+        db.session.rollback()
+        if mysql_error_code(e) == DUPLICATE_KEY:
+            return jsonify({'error': 'You have already submitted this assignment.'}), 400
+        raise
+
+    if result.rowcount == 0:
+        if get_assignment_course_id(assign_id) is None:
+            return jsonify({'error': 'Assignment not found'}), 404
+        return jsonify({'error': 'Student not enrolled in this course.'}), 403
+
+    invalidate_grade_analytics(assign_id)
     
     return jsonify({'message': 'Assignment submitted successfully.'}), 201
 
 
+@app.route('/assignment/<int:assign_id>/submission', methods=['GET'])
+@token_required
+def get_submission_status(assign_id):
+    if g.user['role'] != 'student':
+        return jsonify({'error': 'Only students can check their submission'}), 403
+    student_id = g.user['userid']
+
+    # Checked before the table: a submission leaves the queue only after it is stored.
+    record = submission_queue.queued(assign_id, student_id) if submission_queue is not None else None
+    if record is not None:
+        return jsonify({'status': 'queued', 'receipt_id': record['receipt_id'], 'submitted_at': record['submitted_at']})
+
+    sql = text("SELECT submitted_at, grade FROM submission WHERE assign_id = :assign_id AND stud_id = :student_id")
+    row = db.session.execute(sql, {'assign_id': assign_id, 'student_id': student_id}).fetchone()
+    if row is None:
+        return jsonify({'status': 'not_submitted'}), 404
+
+    status = {'status': 'stored', 'submitted_at': row[0].isoformat(), 'graded': row[1] is not None}
+
+    # A receipt from a queued submission can be checked against what was stored.
+    receipt = request.args.get('receipt')
+    if receipt:
+        try:
+            claims = jwt.decode(receipt, app.config['SECRET_KEY'], algorithms=['HS256'])
+        except jwt.InvalidTokenError:
+            return jsonify({'error': 'Invalid receipt'}), 400
+        if claims['sub'] != str(student_id) or claims['assign_id'] != assign_id:
+            return jsonify({'error': 'Receipt is for another submission'}), 400
+        receipted_at = datetime.fromisoformat(claims['submitted_at']).replace(microsecond=0)
+        status['receipt_matches'] = row[0] == receipted_at
+
+    return jsonify(status)
+
+
 @app.route('/assignment/<int:assign_id>/grade', methods=['POST'])
+@token_required
 def grade_assignment(assign_id):
     data = request.json
-    lecturer_id = data.get('lecturer_id')
     student_id = data.get('student_id')
     grade = data.get('grade')
     
-    if not all([lecturer_id, student_id, grade is not None]):
-        return jsonify({'error': 'Lecturer ID, student ID, and grade are required'}), 400
+    if not all([student_id, grade is not None]):
+        return jsonify({'error': 'Student ID and grade are required'}), 400
     
-    sql = text("""
-        SELECT c.lecturer_id 
-        FROM assignment a
-        JOIN course c ON a.course_id = c.course_id
-        WHERE a.assign_id = :assign_id
-    """)
-    course_lecturer = db.session.execute(sql, {'assign_id': assign_id}).scalar()
+    course_lecturer = get_course_lecturer(get_assignment_course_id(assign_id))
     
-    if course_lecturer != lecturer_id:
+    if course_lecturer != g.user['userid'] or not is_current_user(data.get('lecturer_id')):
         return jsonify({'error': 'Unauthorized. Only the lecturer of this course can grade assignments.'}), 403
     
-    sql = text("""
-        SELECT grade FROM submission
-        WHERE assign_id = :assign_id AND stud_id = :student_id
-    """)
-    submission = db.session.execute(sql, {
-        'assign_id': assign_id, 
-        'student_id': student_id
-    }).fetchone()
-    
-    if not submission:
-        return jsonify({'error': 'Submission not found'}), 404
-    
-    if submission[0] is not None:
-        return jsonify({'error': 'Assignment already graded'}), 400
-
     sql = text("""
         UPDATE submission
         SET grade = :grade
-        WHERE assign_id = :assign_id AND stud_id = :student_id
+        WHERE assign_id = :assign_id AND stud_id = :student_id AND grade IS NULL
     """)
-    db.session.execute(sql, {
+    result = db.session.execute(sql, {
         'grade': grade,
         'assign_id': assign_id,
         'student_id': student_id
     })
+
+    if result.rowcount:
+        record_grade(student_id, grade)
     db.session.commit()
+
+    if result.rowcount:
+        invalidate_grade_analytics(assign_id)
+
+    if result.rowcount == 0:
+        sql = text("""
+            SELECT 1 FROM submission
+            WHERE assign_id = :assign_id AND stud_id = :student_id
+        """)
+        submission = db.session.execute(sql, {
+            'assign_id': assign_id, 
+            'student_id': student_id
+        }).fetchone()
+
+        if not submission:
+            return jsonify({'error': 'Submission not found'}), 404
+
+        return jsonify({'error': 'Assignment already graded'}), 400
     
     return jsonify({'message': 'Grade submitted successfully.'}), 200
 
 
+BULK_GRADE_CHUNK_SIZE = int(os.getenv('BULK_GRADE_CHUNK_SIZE', 500))
+UPLOAD_READ_SIZE = 64 * 1024
+# submission.grade is DECIMAL(5,2)
+MAX_GRADE = Decimal('999.99')
+
+
+class InvalidUpload(ValueError):
+    pass
+
+
+# Yields the elements of a JSON array as they arrive, holding at most one element and
+# one read buffer in memory.
+def iter_json_array(stream):
+    decoder = json.JSONDecoder()
+    reader = io.TextIOWrapper(stream, encoding='utf-8')
+    buffer = ''
+    opened = False
+
+    while True:
+        chunk = reader.read(UPLOAD_READ_SIZE)
+        buffer += chunk
+        while True:
+            buffer = buffer.lstrip()
+            if not buffer:
+                break
+            if not opened:
+                if buffer[0] != '[':
+                    raise InvalidUpload('JSON body must be an array')
+                buffer = buffer[1:]
+                opened = True
+                continue
+            if buffer[0] == ',':
+                buffer = buffer[1:]
+                continue
+            if buffer[0] == ']':
+                return
+            try:
+                item, end = decoder.raw_decode(buffer)
+            except json.JSONDecodeError:
+                if not chunk:
+                    raise InvalidUpload('Malformed JSON array')
+                break
+            yield item
+            buffer = buffer[end:]
+
+        if not chunk:
+            raise InvalidUpload('Unterminated JSON array')
+
+
+def iter_grade_rows():
+    if request.mimetype == 'text/csv':
+        for row in csv.reader(io.TextIOWrapper(request.stream, encoding='utf-8', newline='')):
+            if row and row[0].strip().lower() != 'student_id':
+                yield row
+        return
+
+    for item in iter_json_array(request.stream):
+        if isinstance(item, dict):
+            yield item.get('student_id'), item.get('grade')
+        elif isinstance(item, list):
+            yield item
+        else:
+            raise InvalidUpload('Each item must be a {student_id, grade} object or a [student_id, grade] pair')
+
+
+def parse_grade_row(row):
+    if not isinstance(row, (list, tuple)) or len(row) != 2:
+        return None
+    try:
+        student_id, grade = row
+        student_id = int(student_id)
+        grade = Decimal(str(grade).strip())
+    except (TypeError, ValueError, InvalidOperation):
+        return None
+    if not grade.is_finite() or grade < 0 or grade > MAX_GRADE:
+        return None
+    return student_id, grade
+
+
+# Grades one chunk with a single locking read, one CASE UPDATE and one commit. Rows that
+# are already graded, not submitted, or repeated within the chunk are reported, not applied.
+def grade_chunk(assign_id, rows):
+    results = []
+    pending = {}
+    for row in rows:
+        parsed = parse_grade_row(row)
+        if parsed is None:
+            results.append({'student_id': None, 'grade': None, 'status': 'invalid'})
+            continue
+        student_id, grade = parsed
+        result = {'student_id': student_id, 'grade': float(grade), 'status': None}
+        if student_id in pending:
+            result['status'] = 'duplicate'
+        else:
+            pending[student_id] = (grade, result)
+        results.append(result)
+
+    if not pending:
+        return results
+
+    try:
+        sql = text("""
+            SELECT stud_id, grade FROM submission
+            WHERE assign_id = :assign_id AND stud_id IN :student_ids
+            FOR UPDATE
+        """).bindparams(bindparam('student_ids', expanding=True))
+        submissions = dict(db.session.execute(sql, {
+            'assign_id': assign_id,
+            'student_ids': list(pending)
+        }).fetchall())
+
+        updates = []
+        for student_id, (grade, result) in pending.items():
+            if student_id not in submissions:
+                result['status'] = 'submission_not_found'
+            elif submissions[student_id] is not None:
+                result['status'] = 'already_graded'
+            else:
+                result['status'] = 'graded'
+                updates.append((student_id, grade))
+
+        if updates:
+            cases = ' '.join(f'WHEN :stud_id_{n} THEN :grade_{n}' for n in range(len(updates)))
+            params = {'assign_id': assign_id, 'student_ids': [student_id for student_id, _ in updates]}
+            for n, (student_id, grade) in enumerate(updates):
+                params[f'stud_id_{n}'] = student_id
+                params[f'grade_{n}'] = grade
+
+            sql = text(f"""
+                UPDATE submission
+                SET grade = CASE stud_id {cases} END
+                WHERE assign_id = :assign_id AND stud_id IN :student_ids AND grade IS NULL
+            """).bindparams(bindparam('student_ids', expanding=True))
+            db.session.execute(sql, params)
+            record_grades(updates)
+
+        db.session.commit()
+        if updates:
+            invalidate_grade_analytics(assign_id)
+
+    except Exception:
+        db.session.rollback()
+        for result in results:
+            if result['status'] in (None, 'graded'):
+                result['status'] = 'failed'
+
+    return results
+
+
+# Accepts a CSV (student_id,grade per line) or a JSON array of {student_id, grade}
+# objects or [student_id, grade] pairs, streamed in and graded in fixed-size chunks.
+# The per-row report is streamed back in input order, so memory does not grow with
+# the upload.
+@app.route('/assignment/<int:assign_id>/grades', methods=['POST'])
+@token_required
+def bulk_grade_assignment(assign_id):
+    course_lecturer = get_course_lecturer(get_assignment_course_id(assign_id))
+
+    if course_lecturer is None or course_lecturer != g.user['userid']:
+        return jsonify({'error': 'Unauthorized. Only the lecturer of this course can grade assignments.'}), 403
+
+    rows = iter_grade_rows()
+
+    # Returns the next chunk of rows and the error that cut the upload short, if any.
+    def read_chunk():
+        chunk = []
+        try:
+            for row in rows:
+                chunk.append(row)
+                if len(chunk) >= BULK_GRADE_CHUNK_SIZE:
+                    break
+        except (InvalidUpload, UnicodeDecodeError, csv.Error) as e:
+            return chunk, str(e)
+        return chunk, None
+
+    # An upload that is malformed before its first row is rejected outright; later
+    # errors can only be reported in the streamed body.
+    chunk, error = read_chunk()
+    if error and not chunk:
+        return jsonify({'error': error}), 400
+
+    def generate(chunk, error):
+        summary = Counter()
+        first = True
+        yield '{"message": "Bulk grading processed", "results": ['
+
+        while True:
+            for result in grade_chunk(assign_id, chunk):
+                summary[result['status']] += 1
+                yield ('' if first else ', ') + json.dumps(result)
+                first = False
+
+            if error or len(chunk) < BULK_GRADE_CHUNK_SIZE:
+                break
+            chunk, error = read_chunk()
+
+        yield f'], "summary": {json.dumps(dict(summary))}, "error": {json.dumps(error)}}}'
+
+    return Response(stream_with_context(generate(chunk, error)), mimetype='application/json')
+
+
+# Grade analytics are cached per assignment and per course. Submitting and grading
+# invalidate the assignment and its course; enrollment changes the expected submission
+# counts, so it invalidates both through the course's enrollment tag.
+def invalidate_grade_analytics(assign_id):
+    response_cache.invalidate(f'assignment:{assign_id}', f'grades:{get_assignment_course_id(assign_id)}')
+
+
+def authorize_course_grades(course_id):
+    if course_id is None or get_course(course_id) is None:
+        return jsonify({'error': 'Course not found'}), 404
+    if g.user['role'] != 'admin' and get_course_lecturer(course_id) != g.user['userid']:
+        return jsonify({'error': 'Only the lecturer of this course can view its grades'}), 403
+    return None
+
+
+def authorize_assignment_grades(assign_id):
+    course_id = get_assignment_course_id(assign_id)
+    if course_id is None:
+        return jsonify({'error': 'Assignment not found'}), 404
+    return authorize_course_grades(course_id)
+
+
+def histogram_bucket_arg():
+    return max(1, min(request.args.get('bucket', 10, type=int), 50))
+
+
+def enrolled_count(course_id):
+    sql = text("SELECT COUNT(*) FROM course_registration WHERE course_id = :course_id")
+    return db.session.execute(sql, {'course_id': course_id}).scalar()
+
+
+# Submissions come back as one (assign_id, grade) column pair; ungraded rows become NaN.
+def grade_columns(rows):
+    columns = np.array(rows, dtype=np.float64).reshape(-1, 2)
+    return columns[:, 0].astype(np.int64), columns[:, 1]
+
+
+@app.route('/analytics/assignment/<int:assign_id>', methods=['GET'])
+@read_only
+@token_required
+@cached('assignment:{assign_id}', lambda assign_id: f'enrollment:{get_assignment_course_id(assign_id)}',
+        authorize=authorize_assignment_grades)
+def assignment_grade_analytics(assign_id):
+    course_id = get_assignment_course_id(assign_id)
+
+    # Only submissions of currently enrolled students count towards the distribution.
+    sql = text("""
+        SELECT s.assign_id, s.grade
+        FROM submission s
+        JOIN course_registration cr ON cr.stud_id = s.stud_id AND cr.course_id = :course_id
+        WHERE s.assign_id = :assign_id
+    """)
+    rows = db.session.execute(sql, {'assign_id': assign_id, 'course_id': course_id}).fetchall()
+    _, grades = grade_columns(rows)
+    enrolled = enrolled_count(course_id)
+
+    summary = grade_distributions(np.zeros(len(grades), dtype=np.int64), grades, 1, enrolled,
+                                  histogram_bucket_arg())[0]
+
+    return jsonify(dict(summary, assign_id=assign_id, course_id=course_id, enrolled=enrolled))
+
+
+@app.route('/analytics/course/<int:course_id>', methods=['GET'])
+@read_only
+@token_required
+@cached('grades:{course_id}', 'enrollment:{course_id}', authorize=authorize_course_grades)
+def course_grade_analytics(course_id):
+    bucket = histogram_bucket_arg()
+
+    sql = text("SELECT assign_id, title FROM assignment WHERE course_id = :course_id ORDER BY assign_id")
+    assignments = db.session.execute(sql, {'course_id': course_id}).fetchall()
+
+    sql = text("""
+        SELECT s.assign_id, s.grade
+        FROM assignment a
+        JOIN submission s ON s.assign_id = a.assign_id
+        JOIN course_registration cr ON cr.stud_id = s.stud_id AND cr.course_id = a.course_id
+        WHERE a.course_id = :course_id
+    """)
+    assign_ids, grades = grade_columns(db.session.execute(sql, {'course_id': course_id}).fetchall())
+    enrolled = enrolled_count(course_id)
+
+    # Map assignment ids to group positions with a sorted lookup rather than a dict.
+    known = np.array([row[0] for row in assignments], dtype=np.int64)
+    groups = np.searchsorted(known, assign_ids)
+    # An assignment created between the two queries is left out until the next refresh.
+    listed = (groups < len(known)) & (known[np.minimum(groups, max(len(known) - 1, 0))] == assign_ids) \
+        if len(known) else np.zeros(len(groups), dtype=bool)
+    groups, grades = groups[listed], grades[listed]
+    per_assignment = grade_distributions(groups, grades, len(known), enrolled, bucket)
+    overall = grade_distributions(np.zeros(len(grades), dtype=np.int64), grades, 1,
+                                  enrolled * len(known), bucket)[0]
+
+    return jsonify({
+        'course_id': course_id,
+        'enrolled': enrolled,
+        'overall': overall,
+        'assignments': [dict(summary, assign_id=row[0], title=row[1])
+                        for row, summary in zip(assignments, per_assignment)]
+    })
+
+
 @app.route('/sections/<int:course_id>', methods=['GET', 'POST'])
+@read_only
+@versioned('sections')
+@cached('course:{course_id}')
 def sections(course_id):
     if request.method == 'GET':
+        limit, (after,) = page_args(FIRST_PAGE)
+
         sql = text("""
             SELECT section_id, section_title
             FROM section
-            WHERE course_id = :course_id
+            WHERE course_id = :course_id AND section_id > :after
             ORDER BY section_id
+            LIMIT :limit
         """)
-        sections = db.session.execute(sql, {'course_id': course_id}).fetchall()
+        sections = db.session.execute(sql, {'course_id': course_id, 'after': after, 'limit': limit + 1}).fetchall()
+        sections, next_cursor = next_page(sections, limit, lambda section: (section[0],))
         
         section_list = []
         for section in sections:
@@ -723,32 +2372,35 @@ def sections(course_id):
                 'section_title': section[1]
             })
         
-        return jsonify({'sections': section_list})
+        return paginated({'sections': section_list}, next_cursor)
     
+    error = authenticate()
+    if error:
+        return error
+
     data = request.json
-    lecturer_id = data.get('lecturer_id')
     section_title = data.get('section_title')
     
-    if not lecturer_id or not section_title:
-        return jsonify({'error': 'Lecturer ID and section title are required'}), 400
+    if not section_title:
+        return jsonify({'error': 'Section title is required'}), 400
     
-    sql = text("SELECT lecturer_id FROM course WHERE course_id = :course_id")
-    course_lecturer = db.session.execute(sql, {'course_id': course_id}).scalar()
+    course_lecturer = get_course_lecturer(course_id)
     
-    if course_lecturer != lecturer_id:
+    if course_lecturer != g.user['userid'] or not is_current_user(data.get('lecturer_id')):
         return jsonify({'error': 'Unauthorized. Only the lecturer of this course can create sections.'}), 403
     
     sql = text("""
         INSERT INTO section (section_title, course_id)
         VALUES (:section_title, :course_id)
     """)
-    db.session.execute(sql, {
+    result = db.session.execute(sql, {
         'section_title': section_title,
         'course_id': course_id
     })
+    section_id = result.lastrowid
+    bump_version('sections', course_id)
     db.session.commit()
-    
-    section_id = db.session.execute(text("SELECT LAST_INSERT_ID()")).fetchone()[0]
+    response_cache.invalidate(f'course:{course_id}')
     
     return jsonify({
         'message': 'Section created successfully',
@@ -757,5 +2409,281 @@ def sections(course_id):
     })
 
 
+SEARCH_SNIPPET_LENGTH = int(os.getenv('SEARCH_SNIPPET_LENGTH', 200))
+# Above any relevance MySQL reports, so the first page starts from the top score
+SEARCH_FIRST_PAGE_SCORE = 1e308
+
+
+# Course-scoped search over thread titles, reply text and content titles. Each source
+# has a FULLTEXT index that InnoDB maintains as rows are inserted, so new posts become
+# searchable without a rebuild. Results are ranked by relevance and paged by keyset
+# on (score, type, id).
+@app.route('/search/<int:course_id>', methods=['GET'])
+@read_only
+def search(course_id):
+    query = request.args.get('q', '').strip()
+    if not query:
+        return jsonify({'message': 'Search query q is required'}), 400
+
+    limit, (after_score, after_kind, after_id) = page_args(SEARCH_FIRST_PAGE_SCORE, '', FIRST_PAGE)
+
+    sql = text("""
+        SELECT kind, id, title, detail, parent_id, score FROM (
+            SELECT 'content' AS kind, c.content_id AS id, c.content_title AS title,
+                   c.content_url AS detail, c.section_id AS parent_id,
+                   MATCH (c.content_title) AGAINST (:q IN NATURAL LANGUAGE MODE) AS score
+            FROM course_content c
+            WHERE c.course_id = :course_id
+              AND MATCH (c.content_title) AGAINST (:q IN NATURAL LANGUAGE MODE)
+            UNION ALL
+            SELECT 'reply', r.reply_id, t.dis_title, LEFT(r.reply_text, :snippet_length), r.thread_id,
+                   MATCH (r.reply_text) AGAINST (:q IN NATURAL LANGUAGE MODE)
+            FROM thread_reply r
+            JOIN discussion_thread t ON t.thread_id = r.thread_id
+            JOIN forum f ON f.forum_id = t.forum_id
+            WHERE f.course_id = :course_id
+              AND MATCH (r.reply_text) AGAINST (:q IN NATURAL LANGUAGE MODE)
+            UNION ALL
+            SELECT 'thread', t.thread_id, t.dis_title, NULL, t.forum_id,
+                   MATCH (t.dis_title) AGAINST (:q IN NATURAL LANGUAGE MODE)
+            FROM discussion_thread t
+            JOIN forum f ON f.forum_id = t.forum_id
+            WHERE f.course_id = :course_id
+              AND MATCH (t.dis_title) AGAINST (:q IN NATURAL LANGUAGE MODE)
+        ) results
+        WHERE score < :after_score
+           OR (score = :after_score AND (kind > :after_kind OR (kind = :after_kind AND id > :after_id)))
+        ORDER BY score DESC, kind, id
+        LIMIT :limit
+    """)
+    rows = db.session.execute(sql, {
+        'q': query,
+        'course_id': course_id,
+        'snippet_length': SEARCH_SNIPPET_LENGTH,
+        'after_score': after_score,
+        'after_kind': after_kind,
+        'after_id': after_id,
+        'limit': limit + 1
+    }).fetchall()
+    rows, next_cursor = next_page(rows, limit, lambda row: (row[5], row[0], row[1]))
+
+    results = []
+    for kind, item_id, title, detail, parent_id, score in rows:
+        if kind == 'content':
+            result = {'content_id': item_id, 'content_url': detail, 'section_id': parent_id}
+        elif kind == 'reply':
+            result = {'reply_id': item_id, 'thread_id': parent_id, 'snippet': detail}
+        else:
+            result = {'thread_id': item_id, 'forum_id': parent_id}
+        result.update({'type': kind, 'title': title, 'score': round(score, 4)})
+        results.append(result)
+
+    return paginated({'query': query, 'results': results}, next_cursor)
+
+
+def require_admin():
+    error = authenticate()
+    if error:
+        return error
+    if g.user['role'] != 'admin':
+        return jsonify({'message': 'Only admins can view reports'}), 403
+    return None
+
+
+# Reporting routes mirror the views in course_management.sql, but read the
+# incrementally maintained *_stats tables instead of grouping Course_Registration
+# or Submission on every request.
+@app.route('/reports/courses', methods=['GET'])
+@read_only
+def report_courses_by_enrollment():
+    error = require_admin()
+    if error:
+        return error
+
+    min_students = request.args.get('min_students', 50, type=int)
+    limit, (after,) = page_args(FIRST_PAGE)
+
+    sql = text("""
+        SELECT c.course_id, c.course_name, cs.student_count
+        FROM course_stats cs
+        JOIN course c ON c.course_id = cs.course_id
+        WHERE cs.student_count >= :min_students AND cs.course_id > :after
+        ORDER BY cs.course_id
+        LIMIT :limit
+    """)
+    rows = db.session.execute(sql, {'min_students': min_students, 'after': after, 'limit': limit + 1}).fetchall()
+    rows, next_cursor = next_page(rows, limit, lambda row: (row[0],))
+
+    return paginated({'courses': [{
+        'course_id': row[0],
+        'course_name': row[1],
+        'student_count': row[2]
+    } for row in rows]}, next_cursor)
+
+
+@app.route('/reports/courses/top-enrolled', methods=['GET'])
+@read_only
+def report_top_enrolled_courses():
+    error = require_admin()
+    if error:
+        return error
+
+    limit = max(1, min(request.args.get('limit', 10, type=int), MAX_PAGE_SIZE))
+
+    sql = text("""
+        SELECT c.course_id, c.course_name, cs.student_count
+        FROM course_stats cs
+        JOIN course c ON c.course_id = cs.course_id
+        ORDER BY cs.student_count DESC
+        LIMIT :limit
+    """)
+    rows = db.session.execute(sql, {'limit': limit}).fetchall()
+
+    return jsonify({'courses': [{
+        'course_id': row[0],
+        'course_name': row[1],
+        'student_count': row[2]
+    } for row in rows]})
+
+
+@app.route('/reports/students', methods=['GET'])
+@read_only
+def report_students_by_course_count():
+    error = require_admin()
+    if error:
+        return error
+
+    min_courses = request.args.get('min_courses', 5, type=int)
+    limit, (after,) = page_args(FIRST_PAGE)
+
+    sql = text("""
+        SELECT u.userid, u.name, ss.course_count
+        FROM student_stats ss
+        JOIN user u ON u.userid = ss.stud_id
+        WHERE ss.course_count >= :min_courses AND ss.stud_id > :after
+        ORDER BY ss.stud_id
+        LIMIT :limit
+    """)
+    rows = db.session.execute(sql, {'min_courses': min_courses, 'after': after, 'limit': limit + 1}).fetchall()
+    rows, next_cursor = next_page(rows, limit, lambda row: (row[0],))
+
+    return paginated({'students': [{
+        'userid': row[0],
+        'name': row[1],
+        'course_count': row[2]
+    } for row in rows]}, next_cursor)
+
+
+@app.route('/reports/students/top-by-grade', methods=['GET'])
+@read_only
+def report_top_students_by_grade():
+    error = require_admin()
+    if error:
+        return error
+
+    limit = max(1, min(request.args.get('limit', 10, type=int), MAX_PAGE_SIZE))
+
+    sql = text("""
+        SELECT u.userid, u.name, ss.average_grade
+        FROM student_stats ss
+        JOIN user u ON u.userid = ss.stud_id
+        WHERE ss.average_grade IS NOT NULL
+        ORDER BY ss.average_grade DESC
+        LIMIT :limit
+    """)
+    rows = db.session.execute(sql, {'limit': limit}).fetchall()
+
+    return jsonify({'students': [{
+        'userid': row[0],
+        'name': row[1],
+        'average_grade': float(row[2])
+    } for row in rows]})
+
+
+@app.route('/reports/lecturers', methods=['GET'])
+@read_only
+def report_lecturers_by_course_count():
+    error = require_admin()
+    if error:
+        return error
+
+    min_courses = request.args.get('min_courses', 3, type=int)
+    limit, (after,) = page_args(FIRST_PAGE)
+
+    sql = text("""
+        SELECT u.userid, u.name, ls.course_count
+        FROM lecturer_stats ls
+        JOIN user u ON u.userid = ls.lecturer_id
+        WHERE ls.course_count >= :min_courses AND ls.lecturer_id > :after
+        ORDER BY ls.lecturer_id
+        LIMIT :limit
+    """)
+    rows = db.session.execute(sql, {'min_courses': min_courses, 'after': after, 'limit': limit + 1}).fetchall()
+    rows, next_cursor = next_page(rows, limit, lambda row: (row[0],))
+
+    return paginated({'lecturers': [{
+        'userid': row[0],
+        'name': row[1],
+        'course_count': row[2]
+    } for row in rows]}, next_cursor)
+
+
+@app.cli.command('rebuild-stats')
+def rebuild_stats():
+    """Recompute the *_stats tables and thread reply counters from the base tables."""
+    statements = [
+        "DELETE FROM course_stats",
+        """
+        INSERT INTO course_stats (course_id, student_count)
+        SELECT course_id, COUNT(*) FROM course_registration GROUP BY course_id
+        """,
+        "DELETE FROM student_stats",
+        """
+        INSERT INTO student_stats (stud_id, course_count)
+        SELECT stud_id, COUNT(*) FROM course_registration GROUP BY stud_id
+        """,
+        """
+        INSERT INTO student_stats (stud_id, grade_sum, grade_count)
+        SELECT stud_id, SUM(grade), COUNT(grade) FROM submission
+        WHERE grade IS NOT NULL
+        GROUP BY stud_id
+        ON DUPLICATE KEY UPDATE grade_sum = VALUES(grade_sum), grade_count = VALUES(grade_count)
+        """,
+        "DELETE FROM lecturer_stats",
+        """
+        INSERT INTO lecturer_stats (lecturer_id, course_count)
+        SELECT lecturer_id, COUNT(*) FROM course
+        WHERE lecturer_id IS NOT NULL
+        GROUP BY lecturer_id
+        """,
+        """
+        UPDATE discussion_thread t
+        LEFT JOIN (
+            SELECT thread_id, COUNT(*) AS reply_count, MAX(replied_at) AS last_reply_at
+            FROM thread_reply
+            GROUP BY thread_id
+        ) r ON r.thread_id = t.thread_id
+        SET t.reply_count = COALESCE(r.reply_count, 0),
+            t.last_activity_at = COALESCE(r.last_reply_at, t.last_activity_at)
+        """
+    ]
+
+    try:
+        for statement in statements:
+            db.session.execute(text(statement))
+        db.session.commit()
+    except Exception:
+        db.session.rollback()
+        raise
+
+    print("stats rebuilt successfully")
+
+
+# Started once the whole module is loaded, since stored batches call back into it. Logs
+# that crashed workers left behind are replayed now, not at the next submission.
+if submission_queue is not None:
+    submission_queue.start()
+
+
 if __name__ == '__main__':
     app.run(debug=True)
\ No newline at end of file
@@ -0,0 +1,362 @@
+import asyncio
+import contextvars
+import os
+import re
+import time
+from datetime import datetime, timedelta
+from urllib.parse import parse_qs
+
+import jwt
+from sqlalchemy import text
+from sqlalchemy.engine import make_url
+from sqlalchemy.ext.asyncio import create_async_engine
+
+from admission import Shed, shed_total
+from app import (
+    app, admission, course_cache, decode_cursor, encode_cursor, InvalidCursor, InvalidDateRange,
+    DEFAULT_PAGE_SIZE, MAX_PAGE_SIZE, STREAM_MAX_PAGE_SIZE, FIRST_PAGE, FIRST_PAGE_AT,
+    AGENDA_DEFAULT_DAYS, AGENDA_MAX_DAYS, EARLIEST_DATETIME, LATEST_DATETIME
+)
+
+# ASGI serving mode: the hot read routes run on asyncio with an async MySQL driver,
+# so a worker keeps serving while its queries are in flight, and a handler's
+# independent queries run concurrently. Every other route is passed to the Flask app
+# through asgiref's WSGI adapter when asgiref is installed.
+#
+#   pip install aiomysql uvicorn asgiref
+#   uvicorn asgi_app:application --workers 1
+#
+# Connections are only held while a statement runs, so thousands of idle or slow
+# clients share a pool sized for the database, not for the number of clients.
+#
+# The native handlers bypass the Flask request hooks, so they take their admission slot
+# here, from the same controller and under the same endpoint names as the Flask views:
+# requests in both modes count against one adaptive limit.
+try:
+    from asgiref.wsgi import WsgiToAsgi
+    wsgi_fallback = WsgiToAsgi(app)
+except ImportError:
+    wsgi_fallback = None
+
+
+def async_database_url():
+    url = os.getenv('ASYNC_DATABASE_URL')
+    if url:
+        return url
+    return make_url(os.getenv('DATABASE_URL')).set(drivername='mysql+aiomysql')
+
+
+engine = create_async_engine(
+    async_database_url(),
+    pool_size=int(os.getenv('ASYNC_POOL_SIZE', 20)),
+    max_overflow=int(os.getenv('ASYNC_POOL_OVERFLOW', 20)),
+    pool_timeout=float(os.getenv('ASYNC_POOL_TIMEOUT', 10)),
+    pool_recycle=int(os.getenv('ASYNC_POOL_RECYCLE', 1800)),
+    pool_pre_ping=True
+)
+
+
+class HTTPError(Exception):
+    def __init__(self, status, message):
+        self.status = status
+        self.message = message
+
+
+class Request:
+    def __init__(self, scope, params):
+        self.method = scope['method']
+        self.path = scope['path']
+        self.params = params
+        self.args = {key: values[0] for key, values in parse_qs(scope['query_string'].decode()).items()}
+        self.headers = {name.decode().lower(): value.decode() for name, value in scope['headers']}
+
+
+# The admitted request's statement time and count, which admission control adapts to.
+request_db_stats = contextvars.ContextVar('request_db_stats', default=None)
+
+
+async def fetch_all(sql, params):
+    # Each statement checks out its own connection, which is what lets asyncio.gather
+    # run a handler's queries side by side.
+    started = time.perf_counter()
+    async with engine.connect() as conn:
+        rows = (await conn.execute(text(sql), params)).fetchall()
+
+    stats = request_db_stats.get()
+    if stats is not None:
+        stats['db_time'] += time.perf_counter() - started
+        stats['queries'] += 1
+    return rows
+
+
+# max_size is the Flask view's, so a URL gets the same page in both serving modes.
+def page_args(req, *first_page, max_size=MAX_PAGE_SIZE):
+    try:
+        limit = int(req.args.get('limit', DEFAULT_PAGE_SIZE))
+    except ValueError:
+        limit = DEFAULT_PAGE_SIZE
+    limit = max(1, min(limit, max_size))
+
+    after = req.args.get('after')
+    if not after:
+        return limit, list(first_page)
+    return limit, decode_cursor(after, len(first_page))
+
+
+def next_page(rows, limit, key):
+    if len(rows) <= limit:
+        return rows, None
+    rows = rows[:limit]
+    return rows, encode_cursor(*key(rows[-1]))
+
+
+def authenticate(req):
+    header = req.headers.get('authorization', '')
+    if not header.startswith('Bearer '):
+        raise HTTPError(401, 'Authentication token is required')
+
+    try:
+        claims = jwt.decode(header[len('Bearer '):], app.config['SECRET_KEY'], algorithms=['HS256'])
+    except jwt.ExpiredSignatureError:
+        raise HTTPError(401, 'Token has expired')
+    except jwt.InvalidTokenError:
+        raise HTTPError(401, 'Invalid token')
+
+    return {'userid': int(claims['sub']), 'role': claims['role']}
+
+
+async def get_student_courses(req):
+    user = authenticate(req)
+    userid = req.params['userid']
+    if user['role'] != 'student':
+        raise HTTPError(403, 'Only students can access this route')
+    if userid != user['userid']:
+        raise HTTPError(403, 'Students can only view their own courses')
+
+    limit, (after,) = page_args(req, FIRST_PAGE)
+    courses = await fetch_all("""
+        SELECT c.course_id, c.course_name
+        FROM course c
+        JOIN course_registration cr ON c.course_id = cr.course_id
+        WHERE cr.stud_id = :userid AND cr.course_id > :after
+        ORDER BY cr.course_id
+        LIMIT :limit
+    """, {'userid': userid, 'after': after, 'limit': limit + 1})
+    courses, next_cursor = next_page(courses, limit, lambda row: (row[0],))
+
+    return [{'course_id': row[0], 'course_name': row[1]} for row in courses], next_cursor
+
+
+async def get_course_members(req):
+    course_id = req.params['course_id']
+    limit, (after,) = page_args(req, FIRST_PAGE, max_size=STREAM_MAX_PAGE_SIZE)
+
+    # The course row, its lecturer and the page of students do not depend on each
+    # other, so both queries are issued at once.
+    course_rows, student_results = await asyncio.gather(
+        fetch_all("""
+            SELECT c.course_id, c.course_name, c.lecturer_id, u.userid, u.name, u.email, u.role
+            FROM course c
+            LEFT JOIN user u ON u.userid = c.lecturer_id
+            WHERE c.course_id = :course_id
+        """, {'course_id': course_id}),
+        fetch_all("""
+            SELECT u.userid, u.name, u.email
+            FROM user u
+            JOIN course_registration cr ON u.userid = cr.stud_id
+            WHERE cr.course_id = :course_id AND cr.stud_id > :after AND u.role = 'student'
+            ORDER BY cr.stud_id
+            LIMIT :limit
+        """, {'course_id': course_id, 'after': after, 'limit': limit + 1})
+    )
+
+    if not course_rows:
+        raise HTTPError(404, 'Course not found')
+
+    course = course_rows[0]
+    course_cache.set(course_id, tuple(course[:3]))
+
+    lecturer_info = None
+    if course[3] is not None and course[6] == 'lecturer':
+        lecturer_info = {'lecturer_id': course[3], 'name': course[4], 'email': course[5]}
+
+    student_results, next_cursor = next_page(student_results, limit, lambda student: (student[0],))
+
+    return {
+        'message': 'Course members retrieved successfully',
+        'lecturer': lecturer_info,
+        'students': [{
+            'student_id': student[0],
+            'name': student[1],
+            'email': student[2]
+        } for student in student_results]
+    }, next_cursor
+
+
+def date_range_args(req, default_start, default_days):
+    try:
+        start = req.args.get('from')
+        start = datetime.fromisoformat(start) if start else default_start
+        end = req.args.get('to')
+        end = datetime.fromisoformat(end) if end else start + timedelta(days=default_days)
+    except ValueError:
+        raise InvalidDateRange('from and to must be ISO 8601 dates or datetimes')
+
+    if end <= start:
+        raise InvalidDateRange('to must be later than from')
+    if end - start > timedelta(days=AGENDA_MAX_DAYS):
+        raise InvalidDateRange(f'Date range cannot exceed {AGENDA_MAX_DAYS} days')
+    return max(start, EARLIEST_DATETIME), min(end, LATEST_DATETIME)
+
+
+async def get_student_agenda(req):
+    user = authenticate(req)
+    student_id = req.params['student_id']
+    if user['role'] != 'student':
+        raise HTTPError(403, 'Only students can access this route')
+    if student_id != user['userid']:
+        raise HTTPError(403, 'Students can only view their own calendar')
+
+    today = datetime.utcnow().replace(hour=0, minute=0, second=0, microsecond=0)
+    start, end = date_range_args(req, today, AGENDA_DEFAULT_DAYS)
+
+    events = await fetch_all("""
+        SELECT ce.event_id, ce.event_title, ce.event_date, ce.course_id
+        FROM course_registration cr
+        JOIN calendar_event ce ON ce.course_id = cr.course_id
+        WHERE cr.stud_id = :student_id AND ce.event_date >= :start AND ce.event_date < :end
+        ORDER BY ce.event_date, ce.event_id
+    """, {'student_id': student_id, 'start': start, 'end': end})
+
+    return {
+        'from': start.isoformat(),
+        'to': end.isoformat(),
+        'events': [{
+            'event_id': event[0],
+            'event_title': event[1],
+            'event_date': event[2],
+            'course_id': event[3]
+        } for event in events]
+    }, None
+
+
+async def get_thread_replies(req):
+    limit, (after_at, after_id) = page_args(req, FIRST_PAGE_AT, FIRST_PAGE, max_size=STREAM_MAX_PAGE_SIZE)
+
+    replies = await fetch_all("""
+        SELECT r.reply_id, r.user_id, u.name as user_name, r.reply_text, r.replied_at, r.parent_reply_id
+        FROM thread_reply r
+        JOIN user u ON r.user_id = u.userid
+        WHERE r.thread_id = :thread_id
+          AND (r.replied_at > :after_at OR (r.replied_at = :after_at AND r.reply_id > :after_id))
+        ORDER BY r.replied_at ASC, r.reply_id ASC
+        LIMIT :limit
+    """, {'thread_id': req.params['thread_id'], 'after_at': after_at, 'after_id': after_id, 'limit': limit + 1})
+    replies, next_cursor = next_page(replies, limit, lambda reply: (reply[4], reply[0]))
+
+    return [{
+        'reply_id': reply[0],
+        'user_id': reply[1],
+        'user_name': reply[2],
+        'reply_text': reply[3],
+        'replied_at': reply[4].isoformat() if reply[4] else None,
+        'parent_reply_id': reply[5]
+    } for reply in replies], next_cursor
+
+
+def is_flat_replies(req):
+    return req.args.get('nested') not in ('1', 'true')
+
+
+# (method, path pattern, handler, extra condition, Flask endpoint). Requests that match
+# nothing here, such as the nested replies view, go to the Flask app.
+ROUTES = [
+    ('GET', r'/courses/student/(?P<userid>\d+)', get_student_courses, None, 'get_student_courses'),
+    ('GET', r'/course-members/(?P<course_id>\d+)', get_course_members, None, 'get_course_members'),
+    ('GET', r'/calendar/student/(?P<student_id>\d+)', get_student_agenda, None, 'get_student_agenda'),
+    ('GET', r'/threads/(?P<thread_id>\d+)/replies', get_thread_replies, is_flat_replies, 'thread_replies'),
+]
+ROUTES = [(method, re.compile(pattern + '$'), handler, condition, endpoint)
+          for method, pattern, handler, condition, endpoint in ROUTES]
+
+
+def match(scope):
+    for method, pattern, handler, condition, endpoint in ROUTES:
+        found = pattern.match(scope['path'])
+        if method == scope['method'] and found:
+            req = Request(scope, {name: int(value) for name, value in found.groupdict().items()})
+            if condition is None or condition(req):
+                return handler, req, endpoint
+    return None, None, None
+
+
+async def send_json(send, status, payload, next_cursor=None, headers=()):
+    # Same serialization as jsonify, so both serving modes return identical bodies.
+    body = app.json.dumps(payload).encode() + b'\n'
+    headers = [(b'content-type', b'application/json'), (b'content-length', str(len(body)).encode()), *headers]
+    if next_cursor:
+        headers.append((b'x-next-cursor', next_cursor.encode()))
+    await send({'type': 'http.response.start', 'status': status, 'headers': headers})
+    await send({'type': 'http.response.body', 'body': body})
+
+
+async def lifespan(receive, send):
+    while True:
+        message = await receive()
+        if message['type'] == 'lifespan.startup':
+            await send({'type': 'lifespan.startup.complete'})
+        elif message['type'] == 'lifespan.shutdown':
+            await engine.dispose()
+            await send({'type': 'lifespan.shutdown.complete'})
+            return
+
+
+def flask_rule(endpoint):
+    # The shed metric is labelled with the Flask route, whichever mode served it.
+    return next(app.url_map.iter_rules(endpoint)).rule
+
+
+async def respond(send, handler, req):
+    try:
+        payload, next_cursor = await handler(req)
+    except HTTPError as e:
+        return await send_json(send, e.status, {'message': e.message})
+    except InvalidCursor:
+        return await send_json(send, 400, {'message': 'Invalid pagination cursor'})
+    except InvalidDateRange as e:
+        return await send_json(send, 400, {'message': str(e)})
+
+    if isinstance(payload, dict):
+        payload['next_cursor'] = next_cursor
+    await send_json(send, 200, payload, next_cursor)
+
+
+async def application(scope, receive, send):
+    if scope['type'] == 'lifespan':
+        return await lifespan(receive, send)
+
+    handler, req, endpoint = match(scope)
+    if handler is None:
+        if wsgi_fallback is not None:
+            return await wsgi_fallback(scope, receive, send)
+        return await send_json(send, 404, {'message': 'Not found'})
+
+    cls = admission.class_for(endpoint) if admission is not None else None
+    if cls is None:
+        return await respond(send, handler, req)
+
+    try:
+        await admission.acquire_async(cls, endpoint)
+    except Shed as e:
+        shed_total.inc(1, cls.name, flask_rule(endpoint), e.reason)
+        return await send_json(send, e.status, {'message': e.message},
+                               headers=[(b'retry-after', str(e.retry_after).encode())])
+
+    stats = {'db_time': 0.0, 'queries': 0}
+    request_db_stats.set(stats)
+    started = time.perf_counter()
+    try:
+        await respond(send, handler, req)
+    finally:
+        admission.release(cls, endpoint, time.perf_counter() - started, stats['db_time'], stats['queries'])
+
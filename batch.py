@@ -0,0 +1,183 @@
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from flask import g, request
+from sqlalchemy.orm import Session
+from werkzeug.test import EnvironBuilder
+
+# Headers of the /batch request that every sub-request inherits, so sub-requests are
+# authenticated, and routed to replicas, exactly as the same calls made one by one.
+FORWARDED_HEADERS = ('Authorization', 'Cookie')
+DROPPED_HEADERS = {'Content-Length', 'Content-Type', 'Set-Cookie'}
+READ_METHODS = ('GET', 'HEAD')
+METHODS = ('GET', 'HEAD', 'POST', 'PUT', 'PATCH', 'DELETE')
+
+
+class BatchDispatcher:
+    # Runs the sub-requests of a /batch call through the app's own view functions, in
+    # process. Consecutive GETs run side by side on a thread pool, each on its own pooled
+    # connection; every other sub-request runs in order in the calling request, on its
+    # DB session. Results come back in request order. Once a sub-request has written,
+    # the ones after it read from the primary, as separate calls would through the
+    # read-your-writes cookie.
+    #
+    # In atomic mode the sequential sub-requests run in one transaction. Their session is
+    # joined to an outer transaction through savepoints, so a view's own commit only
+    # releases a savepoint; the batch commits once every write has succeeded and rolls
+    # everything back, skipping the rest, at the first write that fails.
+
+    def __init__(self, app, db, workers=4, path_prefix='/batch'):
+        self.app = app
+        self.db = db
+        self.workers = workers
+        self.path_prefix = path_prefix
+        self._pool = None
+        self._pool_lock = threading.Lock()
+
+    def _executor(self):
+        if self._pool is None:
+            with self._pool_lock:
+                if self._pool is None:
+                    self._pool = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix='batch')
+        return self._pool
+
+    def prepare(self, item):
+        # Returns the WSGI environ for a sub-request, or an error result for an item
+        # that cannot be dispatched. Built in the calling request, which the pool
+        # threads cannot see.
+        if not isinstance(item, dict):
+            return None, error(400, 'Each batch item must be an object')
+
+        method = str(item.get('method', 'GET')).upper()
+        path = item.get('path')
+        if method not in METHODS:
+            return None, error(400, f'Unsupported method: {method}')
+        if not isinstance(path, str) or not path.startswith('/'):
+            return None, error(400, 'path must be an absolute path')
+        if path.split('?', 1)[0].rstrip('/') == self.path_prefix:
+            return None, error(400, 'Batches cannot be nested')
+
+        headers = {name: request.headers[name] for name in FORWARDED_HEADERS if name in request.headers}
+        headers.update({str(name): str(value) for name, value in (item.get('headers') or {}).items()})
+
+        builder = EnvironBuilder(
+            path=path,
+            method=method,
+            base_url=request.host_url,
+            headers=headers,
+            json=item.get('body') if method not in READ_METHODS else None,
+            environ_base={'REMOTE_ADDR': request.remote_addr}
+        )
+        try:
+            return builder.get_environ(), None
+        finally:
+            builder.close()
+
+    def dispatch(self, environ, primary_only=False):
+        # The sub-request shares the calling request's app context, and so its g and
+        # DB session. What the view leaves in g (the user, a replica choice, request
+        # stats) is put back afterwards so it cannot leak into the next sub-request.
+        saved = dict(vars(g))
+        try:
+            if primary_only:
+                g.primary_only = True
+            with self.app.request_context(environ):
+                try:
+                    response = self.app.full_dispatch_request()
+                    # Streamed bodies need the sub-request's context while they run.
+                    return result(response)
+                except Exception:
+                    self.app.logger.exception('Batch sub-request %s %s failed',
+                                              environ['REQUEST_METHOD'], environ['PATH_INFO'])
+                    self.db.session.rollback()
+                    return error(500, 'Internal server error')
+        finally:
+            vars(g).clear()
+            vars(g).update(saved)
+
+    def dispatch_isolated(self, environ, primary_only=False):
+        with self.app.app_context():
+            return self.dispatch(environ, primary_only)
+
+    def run(self, items, atomic=False):
+        prepared = [self.prepare(item) for item in items]
+        results = [None] * len(items)
+        wrote = False
+        failed = False
+
+        n = 0
+        while n < len(prepared):
+            environ, invalid = prepared[n]
+            if failed:
+                results[n] = error(424, 'Not run: an earlier request in the atomic batch failed')
+                n += 1
+                continue
+            if invalid is not None:
+                results[n] = invalid
+                failed = atomic
+                n += 1
+                continue
+
+            # Reads after a write in an atomic batch must see the uncommitted write, so
+            # from then on they stay on the batch's own connection.
+            end = n
+            if not (atomic and wrote):
+                while (end < len(prepared) and prepared[end][0] is not None
+                       and prepared[end][0]['REQUEST_METHOD'] in READ_METHODS):
+                    end += 1
+
+            if end - n > 1:
+                environs = [environ for environ, _ in prepared[n:end]]
+                results[n:end] = list(self._executor().map(self.dispatch_isolated, environs,
+                                                           [wrote] * len(environs)))
+                n = end
+                continue
+
+            results[n] = self.dispatch(environ, wrote)
+            if environ['REQUEST_METHOD'] not in READ_METHODS:
+                wrote = True
+                failed = atomic and results[n]['status'] >= 400
+            n += 1
+
+        return results, not failed
+
+    def run_atomic(self, items):
+        registry = self.db.session.registry
+        previous = registry() if registry.has() else None
+
+        connection = self.db.engine.connect()
+        transaction = connection.begin()
+        session = Session(bind=connection, join_transaction_mode='create_savepoint')
+        registry.set(session)
+        g.batch_transaction = True
+        try:
+            results, succeeded = self.run(items, atomic=True)
+            if succeeded:
+                transaction.commit()
+            else:
+                transaction.rollback()
+            return results, succeeded
+        except Exception:
+            transaction.rollback()
+            raise
+        finally:
+            g.pop('batch_transaction', None)
+            session.close()
+            connection.close()
+            if previous is not None:
+                registry.set(previous)
+            else:
+                registry.clear()
+
+
+def result(response):
+    body = response.get_json(silent=True) if response.is_json else response.get_data(as_text=True)
+    response.close()
+    return {
+        'status': response.status_code,
+        'headers': {name: value for name, value in response.headers.items() if name not in DROPPED_HEADERS},
+        'body': body
+    }
+
+
+def error(status, message):
+    return {'status': status, 'headers': {}, 'body': {'message': message}}
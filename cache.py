@@ -0,0 +1,206 @@
+import json
+import threading
+import time
+from collections import OrderedDict
+from contextlib import contextmanager
+
+
+class TTLCache:
+    # In-process LRU cache whose entries also expire after `ttl` seconds, so
+    # changes made by other workers are picked up within that window.
+
+    def __init__(self, maxsize=1024, ttl=60):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or entry[1] < time.monotonic():
+                if entry is not None:
+                    del self._entries[key]
+                self.misses += 1
+                return None
+
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[0]
+
+    def set(self, key, value):
+        with self._lock:
+            self._entries[key] = (value, time.monotonic() + self.ttl)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+
+    def invalidate(self, key):
+        with self._lock:
+            self._entries.pop(key, None)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                'size': len(self._entries),
+                'maxsize': self.maxsize,
+                'ttl': self.ttl,
+                'hits': self.hits,
+                'misses': self.misses,
+                'hit_ratio': round(self.hits / lookups, 4) if lookups else None
+            }
+
+
+class LRUBackend:
+    # Process-local byte store for ResponseCache, bounded by the total size of the
+    # stored values. Tag generations live outside the LRU so they are never evicted.
+
+    def __init__(self, max_bytes=64 * 1024 * 1024):
+        self.max_bytes = max_bytes
+        self.size = 0
+        self._values = OrderedDict()
+        self._counters = {}
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            entry = self._values.get(key)
+            if entry is None:
+                return None
+            if entry[1] < time.monotonic():
+                self._remove(key)
+                return None
+            self._values.move_to_end(key)
+            return entry[0]
+
+    def set(self, key, value, ttl):
+        if len(value) > self.max_bytes:
+            return
+        with self._lock:
+            self._remove(key)
+            self._values[key] = (value, time.monotonic() + ttl)
+            self.size += len(value)
+            while self.size > self.max_bytes:
+                self._remove(next(iter(self._values)))
+
+    def get_counters(self, keys):
+        with self._lock:
+            return [self._counters.get(key, 0) for key in keys]
+
+    def incr(self, key):
+        with self._lock:
+            self._counters[key] = self._counters.get(key, 0) + 1
+
+    def _remove(self, key):
+        entry = self._values.pop(key, None)
+        if entry is not None:
+            self.size -= len(entry[0])
+
+
+class RedisBackend:
+    # Shared byte store for ResponseCache, so invalidations reach every worker.
+    # Any Redis-protocol server works, including a local redis-server stand-in.
+
+    def __init__(self, url):
+        import redis
+        self._client = redis.Redis.from_url(url)
+
+    def get(self, key):
+        return self._client.get(key)
+
+    def set(self, key, value, ttl):
+        self._client.set(key, value, ex=max(1, int(ttl)))
+
+    def get_counters(self, keys):
+        return [int(value or 0) for value in self._client.mget(keys)]
+
+    def incr(self, key):
+        self._client.incr(key)
+
+
+def build_backend(url=None, max_bytes=64 * 1024 * 1024):
+    if url:
+        return RedisBackend(url)
+    return LRUBackend(max_bytes)
+
+
+class ResponseCache:
+    # Caches serialized responses with tag-based invalidation. Each entry records the
+    # generation of its tags when stored; invalidating a tag bumps its generation, which
+    # makes every entry carrying the tag stale without having to find those entries.
+
+    def __init__(self, backend, ttl=300):
+        self.backend = backend
+        self.ttl = ttl
+        self._routes = {}
+        self._lock = threading.Lock()
+        self._recording = threading.local()
+
+    def get(self, route, key):
+        raw = self.backend.get(f'response:{key}')
+        entry = json.loads(raw) if raw is not None else None
+
+        if entry is not None:
+            tags = list(entry['tags'])
+            current = self.backend.get_counters([f'tag:{tag}' for tag in tags])
+            if current != [entry['tags'][tag] for tag in tags]:
+                entry = None
+
+        self._count(route, entry is not None)
+        return entry
+
+    def snapshot(self, tags):
+        # Taken before the response is built, so an invalidation that races with the
+        # query leaves the stored entry already stale rather than fresh-looking.
+        tags = list(tags)
+        return dict(zip(tags, self.backend.get_counters([f'tag:{tag}' for tag in tags])))
+
+    def set(self, key, status, headers, body, generations, ttl=None):
+        entry = {
+            'status': status,
+            'headers': headers,
+            'body': body.decode('latin-1'),
+            'tags': generations
+        }
+        self.backend.set(f'response:{key}', json.dumps(entry).encode(), self.ttl if ttl is None else ttl)
+
+    def invalidate(self, *tags):
+        recorded = getattr(self._recording, 'tags', None)
+        if recorded is not None:
+            recorded.update(tags)
+        for tag in tags:
+            self.backend.incr(f'tag:{tag}')
+
+    @contextmanager
+    def recording(self):
+        # Collects the tags this thread invalidates, for callers that commit later than
+        # the code doing the invalidating and must invalidate again once they have.
+        self._recording.tags = set()
+        try:
+            yield self._recording.tags
+        finally:
+            self._recording.tags = None
+
+    def _count(self, route, hit):
+        with self._lock:
+            counts = self._routes.setdefault(route, {'hits': 0, 'misses': 0})
+            counts['hits' if hit else 'misses'] += 1
+
+    def stats(self):
+        with self._lock:
+            routes = {}
+            for route, counts in self._routes.items():
+                lookups = counts['hits'] + counts['misses']
+                routes[route] = dict(counts, hit_ratio=round(counts['hits'] / lookups, 4))
+
+        stats = {'ttl': self.ttl, 'routes': routes}
+        if isinstance(self.backend, LRUBackend):
+            stats.update(bytes=self.backend.size, max_bytes=self.backend.max_bytes)
+        return stats
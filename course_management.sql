@@ -6,7 +6,8 @@ CREATE TABLE IF NOT EXISTS User (
     password VARCHAR(255) NOT NULL,
     role ENUM('student', 'lecturer', 'admin') NOT NULL,
     name VARCHAR(100) NOT NULL,
-    email VARCHAR(100) DEFAULT NULL
+    email VARCHAR(100) DEFAULT NULL,
+    UNIQUE KEY uq_user_name (name)
 );
 
 CREATE TABLE IF NOT EXISTS Course (
@@ -70,7 +71,9 @@ CREATE TABLE IF NOT EXISTS Discussion_Thread (
     thread_id INT AUTO_INCREMENT PRIMARY KEY,
     dis_title VARCHAR(255) NOT NULL,
     forum_id INT NOT NULL,
-    created_by INT NOT NULL
+    created_by INT NOT NULL,
+    reply_count INT NOT NULL DEFAULT 0,
+    last_activity_at DATETIME DEFAULT NULL
 );
 
 CREATE TABLE IF NOT EXISTS Thread_Reply (
@@ -82,6 +85,37 @@ CREATE TABLE IF NOT EXISTS Thread_Reply (
     parent_reply_id INT DEFAULT NULL
 );
 
+-- Aggregates behind the reporting routes, kept current by the write paths in app.py
+-- (rebuild with `flask rebuild-stats`).
+CREATE TABLE IF NOT EXISTS Course_Stats (
+    course_id INT PRIMARY KEY,
+    student_count INT NOT NULL DEFAULT 0,
+    INDEX idx_course_stats_student_count (student_count)
+);
+
+CREATE TABLE IF NOT EXISTS Student_Stats (
+    stud_id INT PRIMARY KEY,
+    course_count INT NOT NULL DEFAULT 0,
+    grade_sum DECIMAL(12,2) NOT NULL DEFAULT 0,
+    grade_count INT NOT NULL DEFAULT 0,
+    average_grade DECIMAL(5,2) AS (ROUND(grade_sum / NULLIF(grade_count, 0), 2)) STORED,
+    INDEX idx_student_stats_average_grade (average_grade)
+);
+
+CREATE TABLE IF NOT EXISTS Lecturer_Stats (
+    lecturer_id INT PRIMARY KEY,
+    course_count INT NOT NULL DEFAULT 0
+);
+
+-- Per-course change counters behind the ETags of the polled list routes.
+-- course_id 0 holds versions of global resources such as the course list.
+CREATE TABLE IF NOT EXISTS Resource_Version (
+    course_id INT NOT NULL,
+    resource VARCHAR(32) NOT NULL,
+    version BIGINT NOT NULL DEFAULT 0,
+    PRIMARY KEY (course_id, resource)
+);
+
 
 ALTER TABLE Course
 ADD FOREIGN KEY (lecturer_id) REFERENCES User(userid);
@@ -121,6 +155,37 @@ ADD FOREIGN KEY (parent_reply_id) REFERENCES Thread_Reply(reply_id);
 ALTER TABLE Section 
 ADD FOREIGN KEY (course_id) REFERENCES Course(course_id);
 
+ALTER TABLE Course_Stats
+ADD FOREIGN KEY (course_id) REFERENCES Course(course_id);
+
+ALTER TABLE Student_Stats
+ADD FOREIGN KEY (stud_id) REFERENCES User(userid);
+
+ALTER TABLE Lecturer_Stats
+ADD FOREIGN KEY (lecturer_id) REFERENCES User(userid);
+
+
+-- Hot lookups; existing databases get these through `flask db upgrade`
+CREATE INDEX idx_course_registration_course_stud ON Course_Registration (course_id, stud_id);
+CREATE INDEX idx_course_lecturer ON Course (lecturer_id, course_id);
+
+-- Keyset pagination over a thread's replies orders by (replied_at, reply_id)
+CREATE INDEX idx_thread_reply_thread_replied ON Thread_Reply (thread_id, replied_at, reply_id);
+
+-- Nested reply pages walk a thread's top-level replies in (replied_at, reply_id) order
+CREATE INDEX idx_thread_reply_thread_parent ON Thread_Reply (thread_id, parent_reply_id, replied_at, reply_id);
+
+-- Calendar lookups filter a course's events by a half-open date range
+CREATE INDEX idx_calendar_event_course_date ON Calendar_Event (course_id, event_date);
+
+-- Dashboards list each course's assignments due within a window
+CREATE INDEX idx_assignment_course_due ON Assignment (course_id, due_date);
+
+-- Course search; InnoDB keeps FULLTEXT indexes current as rows are inserted
+CREATE FULLTEXT INDEX ft_discussion_thread_title ON Discussion_Thread (dis_title);
+CREATE FULLTEXT INDEX ft_thread_reply_text ON Thread_Reply (reply_text);
+CREATE FULLTEXT INDEX ft_course_content_title ON Course_Content (content_title);
+
 
 CREATE OR REPLACE VIEW Courses_With_50_Or_More_Students AS
 SELECT 
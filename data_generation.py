@@ -1,73 +1,347 @@
+import argparse
+import csv
+import hashlib
+import os
+import random
+import shutil
+import tempfile
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime, timedelta
 from faker import Faker
-from random import randint, sample
-from collections import defaultdict
 
 NUM_ADMINS = 3
 NUM_LECTURERS = 40
-NUM_STUDENTS = 100000 
+NUM_STUDENTS = 100000
 NUM_COURSES = 200
 MIN_COURSES_PER_STUDENT = 3
 MAX_COURSES_PER_STUDENT = 6
-MIN_STUDENTS_PER_COURSE = 10
 MAX_COURSES_PER_LECTURER = 5
 
+SECTIONS_PER_COURSE = 12
+CONTENT_PER_SECTION = 3
+ASSIGNMENTS_PER_COURSE = 4
+EVENTS_PER_COURSE = 30
+FORUMS_PER_COURSE = 2
+THREADS_PER_FORUM = 20
+MAX_REPLIES_PER_THREAD = 16
+NESTED_REPLY_RATE = 0.4
+SUBMISSION_RATE = 0.7
+GRADED_RATE = 0.6
+
+TERM_START = datetime(2025, 1, 13, 9, 0)
+TERM_WEEKS = 15
+
+# Fixture passwords are real werkzeug hashes, so /login works against the generated
+# data, but at a low cost so generation stays fast. The app upgrades them to
+# PASSWORD_HASH_METHOD on first login.
+FIXTURE_HASH_ITERATIONS = 1000
+
+# Rows are generated in fixed-size shards, each from its own seeded RNG, so the output
+# is identical whatever the number of worker processes.
+STUDENT_SHARD_SIZE = 10000
+COURSE_SHARD_SIZE = 20
+
+# Load order respects the foreign keys.
+TABLES = [
+    ('User', ['userid', 'password', 'role', 'name', 'email']),
+    ('Course', ['course_id', 'course_name', 'lecturer_id']),
+    ('Section', ['section_id', 'section_title', 'course_id']),
+    ('Course_Content', ['content_id', 'content_title', 'content_url', 'content_type', 'section_id', 'course_id']),
+    ('Assignment', ['assign_id', 'course_id', 'title', 'description', 'due_date']),
+    ('Calendar_Event', ['event_id', 'event_title', 'event_date', 'course_id']),
+    ('Forum', ['forum_id', 'course_id', 'forum_title']),
+    ('Discussion_Thread', ['thread_id', 'dis_title', 'forum_id', 'created_by', 'reply_count', 'last_activity_at']),
+    ('Thread_Reply', ['reply_id', 'thread_id', 'user_id', 'reply_text', 'replied_at', 'parent_reply_id']),
+    ('Course_Registration', ['stud_id', 'course_id']),
+    ('Submission', ['assign_id', 'stud_id', 'grade', 'submission_url', 'submitted_at']),
+]
+COLUMNS = dict(TABLES)
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Generate a course_management dataset")
+    parser.add_argument('--scale', type=float, default=1.0,
+                        help='multiplies the number of students, lecturers and courses')
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--workers', type=int, default=os.cpu_count() or 1)
+    parser.add_argument('--format', choices=['sql', 'csv'], default='sql',
+                        help='multi-row INSERTs, or CSV files plus a LOAD DATA LOCAL INFILE script')
+    parser.add_argument('--output', default='database_population.sql',
+                        help='SQL file, or directory for --format csv')
+    parser.add_argument('--batch', type=int, default=1000, help='rows per INSERT statement')
+    parser.add_argument('--password', default='password', help='login password of every generated user')
+    return parser.parse_args()
+
+
+class Plan:
+    # Everything a shard needs to generate its rows without seeing any other shard.
+    # All ids are derived arithmetically from these counts.
+
+    def __init__(self, args):
+        self.seed = args.seed
+        self.format = args.format
+        self.batch = args.batch
+        self.num_admins = NUM_ADMINS
+        self.num_lecturers = max(1, round(NUM_LECTURERS * args.scale))
+        self.num_students = max(1, round(NUM_STUDENTS * args.scale))
+        self.num_courses = max(1, min(round(NUM_COURSES * args.scale), self.num_lecturers * MAX_COURSES_PER_LECTURER))
+        self.first_lecturer = self.num_admins + 1
+        self.first_student = self.first_lecturer + self.num_lecturers
+
+        fake = Faker()
+        Faker.seed(args.seed)
+        self.first_names = sorted({fake.first_name() for _ in range(1000)})
+        self.last_names = sorted({fake.last_name() for _ in range(2000)})
+        self.words = sorted({fake.word() for _ in range(3000)})
+        rng = self.rng('passwords', 0)
+        self.passwords = {role: fixture_hash(args.password, rng) for role in ('admin', 'lecturer', 'student')}
+
+    def rng(self, kind, shard):
+        return random.Random(f'{self.seed}:{kind}:{shard}')
+
+    def lecturer_of(self, course_id):
+        # Round-robin keeps every lecturer under MAX_COURSES_PER_LECTURER.
+        return self.first_lecturer + (course_id - 1) % self.num_lecturers
+
+    def courses_of(self, student_id, rng):
+        # The first course is fixed by the student id, which guarantees every course
+        # roughly num_students / num_courses members; the rest are sampled around it.
+        first = (student_id - self.first_student) % self.num_courses + 1
+        count = min(rng.randint(MIN_COURSES_PER_STUDENT, MAX_COURSES_PER_STUDENT), self.num_courses)
+        others = rng.sample(range(1, self.num_courses), count - 1)
+        return [first] + [course if course < first else course + 1 for course in others]
+
+    def member_of(self, course_id, rng):
+        # A student whose fixed first course is this one, so they are certainly enrolled.
+        members = (self.num_students - course_id) // self.num_courses + 1
+        if members <= 0:
+            return self.first_student
+        return self.first_student + course_id - 1 + rng.randrange(members) * self.num_courses
+
+    def assignment_due(self, course_id, n):
+        week = (n + 1) * TERM_WEEKS // (ASSIGNMENTS_PER_COURSE + 1)
+        return TERM_START + timedelta(weeks=week, days=course_id % 5, hours=14, minutes=59)
+
+    def text(self, rng, words):
+        return ' '.join(rng.choice(self.words) for _ in range(words)).capitalize()
+
+    def person(self, rng, userid):
+        # User names are unique (uq_user_name), so the id tells namesakes apart.
+        first, last = rng.choice(self.first_names), rng.choice(self.last_names)
+        return f'{first} {last} {userid}', f'{first}.{last}{userid}@example.com'.lower()
+
+
+class ShardWriter:
+    # Streams one shard's rows to a part file per table in the chosen output format.
+
+    def __init__(self, directory, shard, plan):
+        self.directory = directory
+        self.shard = shard
+        self.plan = plan
+        self._files = {}
+        self._pending = {}
+
+    def path(self, table):
+        return os.path.join(self.directory, f'{table}.{self.shard:06d}.part')
+
+    def write(self, table, row):
+        if table not in self._files:
+            self._files[table] = open(self.path(table), 'w', newline='', encoding='utf-8')
+            self._pending[table] = csv.writer(self._files[table], lineterminator='\n') if self.plan.format == 'csv' else []
+
+        if self.plan.format == 'csv':
+            self._pending[table].writerow(['NULL' if value is None else value for value in row])
+            return
+
+        pending = self._pending[table]
+        pending.append(row)
+        if len(pending) >= self.plan.batch:
+            self._flush(table)
+
+    def _flush(self, table):
+        pending = self._pending[table]
+        if pending:
+            values = ',\n'.join('(' + ', '.join(sql_literal(value) for value in row) + ')' for row in pending)
+            self._files[table].write(f"INSERT INTO {table} ({', '.join(COLUMNS[table])}) VALUES\n{values};\n")
+            pending.clear()
+
+    def close(self):
+        for table, f in self._files.items():
+            if self.plan.format == 'sql':
+                self._flush(table)
+            f.close()
+
+
+def fixture_hash(password, rng):
+    # Same format as werkzeug's generate_password_hash, but with a salt from the seeded
+    # RNG so the output stays reproducible.
+    salt = ''.join(rng.choice('abcdefghijklmnopqrstuvwxyzABCDEFGHIJKLMNOPQRSTUVWXYZ0123456789') for _ in range(16))
+    digest = hashlib.pbkdf2_hmac('sha256', password.encode(), salt.encode(), FIXTURE_HASH_ITERATIONS).hex()
+    return f'pbkdf2:sha256:{FIXTURE_HASH_ITERATIONS}${salt}${digest}'
+
+
+def sql_literal(value):
+    if value is None:
+        return 'NULL'
+    if isinstance(value, (int, float)):
+        return str(value)
+    if isinstance(value, datetime):
+        return f"'{value:%Y-%m-%d %H:%M:%S}'"
+    return "'" + str(value).replace('\\', '\\\\').replace("'", "''") + "'"
+
+
+def generate_staff(plan, writer):
+    rng = plan.rng('staff', 0)
+    for userid in range(1, plan.first_student):
+        role = 'admin' if userid < plan.first_lecturer else 'lecturer'
+        name, email = plan.person(rng, userid)
+        writer.write('User', (userid, plan.passwords[role], role, name, email))
+
+
+def generate_students(plan, writer, first, last):
+    rng = plan.rng('students', writer.shard)
+    for student_id in range(first, last):
+        name, email = plan.person(rng, student_id)
+        writer.write('User', (student_id, plan.passwords['student'], 'student', name, email))
+
+        for course_id in plan.courses_of(student_id, rng):
+            writer.write('Course_Registration', (student_id, course_id))
+
+            for n in range(ASSIGNMENTS_PER_COURSE):
+                if rng.random() >= SUBMISSION_RATE:
+                    continue
+                assign_id = (course_id - 1) * ASSIGNMENTS_PER_COURSE + n + 1
+                submitted_at = plan.assignment_due(course_id, n) - timedelta(minutes=rng.randrange(7 * 24 * 60))
+                grade = rng.randint(40, 100) if rng.random() < GRADED_RATE else None
+                writer.write('Submission', (assign_id, student_id, grade,
+                                            f'https://submissions.example.com/{assign_id}/{student_id}', submitted_at))
+
+
+def generate_courses(plan, writer, first, last):
+    rng = plan.rng('courses', writer.shard)
+    threads_per_course = FORUMS_PER_COURSE * THREADS_PER_FORUM
+    replies_per_course = threads_per_course * MAX_REPLIES_PER_THREAD
+
+    for course_id in range(first, last):
+        writer.write('Course', (course_id, f'{rng.choice(plan.words).title()} {rng.choice(plan.words).title()}',
+                                plan.lecturer_of(course_id)))
+
+        for s in range(SECTIONS_PER_COURSE):
+            section_id = (course_id - 1) * SECTIONS_PER_COURSE + s + 1
+            writer.write('Section', (section_id, f'Week {s + 1} - {rng.choice(plan.words).title()}', course_id))
+            for c in range(CONTENT_PER_SECTION):
+                content_id = (section_id - 1) * CONTENT_PER_SECTION + c + 1
+                writer.write('Course_Content', (content_id, plan.text(rng, 4),
+                                                f'https://content.example.com/{course_id}/{content_id}',
+                                                rng.choice(['link', 'file', 'slide']), section_id, course_id))
+
+        for n in range(ASSIGNMENTS_PER_COURSE):
+            writer.write('Assignment', ((course_id - 1) * ASSIGNMENTS_PER_COURSE + n + 1, course_id,
+                                        plan.text(rng, 3), plan.text(rng, 20), plan.assignment_due(course_id, n)))
+
+        for e in range(EVENTS_PER_COURSE):
+            event_date = TERM_START + timedelta(days=rng.randrange(TERM_WEEKS * 7), hours=rng.randrange(10))
+            writer.write('Calendar_Event', ((course_id - 1) * EVENTS_PER_COURSE + e + 1, plan.text(rng, 3),
+                                            event_date, course_id))
+
+        for f in range(FORUMS_PER_COURSE):
+            forum_id = (course_id - 1) * FORUMS_PER_COURSE + f + 1
+            writer.write('Forum', (forum_id, course_id, plan.text(rng, 2)))
+
+            for t in range(THREADS_PER_FORUM):
+                thread_id = (forum_id - 1) * THREADS_PER_FORUM + t + 1
+                first_reply = (course_id - 1) * replies_per_course + (f * THREADS_PER_FORUM + t) * MAX_REPLIES_PER_THREAD + 1
+                replied_at = TERM_START + timedelta(days=rng.randrange(TERM_WEEKS * 7), minutes=rng.randrange(600))
+
+                replies = []
+                for r in range(rng.randrange(MAX_REPLIES_PER_THREAD + 1)):
+                    replied_at += timedelta(minutes=rng.randrange(1, 24 * 60))
+                    parent = rng.choice(replies)[0] if replies and rng.random() < NESTED_REPLY_RATE else None
+                    author = plan.lecturer_of(course_id) if rng.random() < 0.1 else plan.member_of(course_id, rng)
+                    replies.append((first_reply + r, thread_id, author, plan.text(rng, 12), replied_at, parent))
+
+                last_activity_at = replies[-1][4] if replies else None
+                writer.write('Discussion_Thread', (thread_id, plan.text(rng, 5), forum_id,
+                                                   plan.member_of(course_id, rng), len(replies), last_activity_at))
+                for reply in replies:
+                    writer.write('Thread_Reply', reply)
+
+
+def run_shard(plan, directory, shard, kind, first, last):
+    writer = ShardWriter(directory, shard, plan)
+    try:
+        if kind == 'staff':
+            generate_staff(plan, writer)
+        elif kind == 'students':
+            generate_students(plan, writer, first, last)
+        else:
+            generate_courses(plan, writer, first, last)
+    finally:
+        writer.close()
+
+
+def shards(plan):
+    jobs = [('staff', 1, plan.first_student)]
+    last_student = plan.first_student + plan.num_students
+    for first in range(plan.first_student, last_student, STUDENT_SHARD_SIZE):
+        jobs.append(('students', first, min(first + STUDENT_SHARD_SIZE, last_student)))
+    for first in range(1, plan.num_courses + 1, COURSE_SHARD_SIZE):
+        jobs.append(('courses', first, min(first + COURSE_SHARD_SIZE, plan.num_courses + 1)))
+    return [(shard, *job) for shard, job in enumerate(jobs)]
+
+
+def part_files(directory, table):
+    return sorted(os.path.join(directory, name) for name in os.listdir(directory)
+                  if name.startswith(f'{table}.') and name.endswith('.part'))
+
+
+def merge_sql(directory, output):
+    with open(output, 'w', encoding='utf-8') as out:
+        out.write("SET FOREIGN_KEY_CHECKS = 0;\nSET UNIQUE_CHECKS = 0;\n")
+        for table, _ in TABLES:
+            out.write(f"\n-- {table.upper()}\n")
+            for path in part_files(directory, table):
+                with open(path, encoding='utf-8') as part:
+                    shutil.copyfileobj(part, out)
+        out.write("\nSET UNIQUE_CHECKS = 1;\nSET FOREIGN_KEY_CHECKS = 1;\n")
+
+
+def merge_csv(directory, output):
+    os.makedirs(output, exist_ok=True)
+    with open(os.path.join(output, 'load.sql'), 'w', encoding='utf-8') as script:
+        script.write("-- mysql --local-infile=1 course_management < load.sql\n")
+        script.write("SET FOREIGN_KEY_CHECKS = 0;\nSET UNIQUE_CHECKS = 0;\n")
+        for table, columns in TABLES:
+            path = os.path.join(output, f'{table.lower()}.csv')
+            with open(path, 'w', encoding='utf-8') as out:
+                for part in part_files(directory, table):
+                    with open(part, encoding='utf-8') as f:
+                        shutil.copyfileobj(f, out)
+            script.write(
+                f"LOAD DATA LOCAL INFILE '{os.path.abspath(path)}' INTO TABLE {table}\n"
+                f"    FIELDS TERMINATED BY ',' OPTIONALLY ENCLOSED BY '\"' ESCAPED BY ''\n"
+                f"    LINES TERMINATED BY '\\n'\n"
+                f"    ({', '.join(columns)});\n"
+            )
+        script.write("SET UNIQUE_CHECKS = 1;\nSET FOREIGN_KEY_CHECKS = 1;\n")
+
+
 if __name__ == "__main__":
-    fake = Faker()
-    user_id = 1
-    courses = []
-    course_registrations = defaultdict(set)
-    student_ids = []
-    lecturer_ids = []
-    
-    with open("database_population.sql", "w") as f:
-        for _ in range(NUM_ADMINS):
-            f.write(f"INSERT INTO User(userid, password, role, name, email) VALUES ({user_id}, '{fake.password()}', 'admin', '{fake.name()}', '{fake.email()}');\n")
-            user_id += 1
-
-        for _ in range(NUM_LECTURERS):
-            f.write(f"INSERT INTO User(userid, password, role, name, email) VALUES ({user_id}, '{fake.password()}', 'lecturer', '{fake.name()}', '{fake.email()}');\n")
-            lecturer_ids.append(user_id)
-            user_id += 1
-
-        for _ in range(NUM_STUDENTS):
-            f.write(f"INSERT INTO User(userid, password, role, name, email) VALUES ({user_id}, '{fake.password()}', 'student', '{fake.name()}', '{fake.email()}');\n")
-            student_ids.append(user_id)
-            user_id += 1
-
-        f.write("\n-- COURSES\n")
-      
-        course_id = 1
-        lecturer_course_count = defaultdict(int)
-        for _ in range(NUM_COURSES):
-            while True:
-                lecturer = lecturer_ids[randint(0, NUM_LECTURERS - 1)]
-                if lecturer_course_count[lecturer] < MAX_COURSES_PER_LECTURER:
-                    lecturer_course_count[lecturer] += 1
-                    break
-            course_name = f"{fake.word().title()} {fake.word().title()}"
-            f.write(f"INSERT INTO Course(course_id, course_name, lecturer_id) VALUES ({course_id}, '{course_name}', {lecturer});\n")
-            courses.append(course_id)
-            course_id += 1
-
-        for course_id in courses:
-            selected_students = sample(student_ids, MIN_STUDENTS_PER_COURSE)
-            for sid in selected_students:
-                course_registrations[sid].add(course_id)
-                f.write(f"INSERT INTO Course_Registration(stud_id, course_id) VALUES ({sid}, {course_id});\n")
-
-        for sid in student_ids:
-            current = len(course_registrations[sid])
-            target = randint(MIN_COURSES_PER_STUDENT, MAX_COURSES_PER_STUDENT)
-            if current >= target:
-                continue
-            available_courses = list(set(courses) - course_registrations[sid])
-            additional_courses = sample(available_courses, target - current)
-            for cid in additional_courses:
-                course_registrations[sid].add(cid)
-                f.write(f"INSERT INTO Course_Registration(stud_id, course_id) VALUES ({sid}, {cid});\n")
-
-        f.write("INSERT INTO Section (section_id, section_title, course_id) VALUES (1, 'Week 1 - Introduction', 1);\n")
-        
-        f.write("INSERT INTO Assignment (course_id, title, description, due_date) VALUES (1, 'Midterm Project', 'Build a web app', '2025-05-01 23:59:00');\n")
-
-        print("file generated successfully")
+    args = parse_args()
+    plan = Plan(args)
+    jobs = shards(plan)
+
+    with tempfile.TemporaryDirectory(prefix='data_generation_') as directory:
+        with ProcessPoolExecutor(max_workers=args.workers) as pool:
+            futures = [pool.submit(run_shard, plan, directory, *job) for job in jobs]
+            for future in futures:
+                future.result()
+
+        if args.format == 'csv':
+            merge_csv(directory, args.output)
+        else:
+            merge_sql(directory, args.output)
+
+    print(f"generated {plan.num_students} students, {plan.num_lecturers} lecturers and "
+          f"{plan.num_courses} courses into {args.output} (password: {args.password!r})")
+    print("run `flask rebuild-stats` after loading to fill the reporting tables")
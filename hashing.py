@@ -0,0 +1,80 @@
+import multiprocessing
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from werkzeug.security import DEFAULT_PBKDF2_ITERATIONS, generate_password_hash, check_password_hash
+
+PASSWORD_HASH_METHOD = os.getenv('PASSWORD_HASH_METHOD', 'pbkdf2:sha256:600000')
+HASH_WORKERS = int(os.getenv('HASH_WORKERS', max(1, (os.cpu_count() or 2) // 2)))
+HASH_QUEUE_DEPTH = int(os.getenv('HASH_QUEUE_DEPTH', HASH_WORKERS * 4))
+HASH_TIMEOUT = float(os.getenv('HASH_TIMEOUT', 10))
+
+
+class HashingBusy(Exception):
+    pass
+
+
+def expand_method(method):
+    # The method as werkzeug writes it into a hash, with its default parameters filled
+    # in: 'scrypt' is stored as 'scrypt:32768:8:1', 'pbkdf2:sha256' as
+    # 'pbkdf2:sha256:<DEFAULT_PBKDF2_ITERATIONS>'.
+    name, *args = method.split(':')
+    if name == 'scrypt' and not args:
+        args = [2 ** 15, 8, 1]
+    elif name == 'pbkdf2':
+        hash_name = args[0] if args else 'sha256'
+        iterations = args[1] if len(args) > 1 else DEFAULT_PBKDF2_ITERATIONS
+        args = [hash_name, iterations]
+    return ':'.join([name, *map(str, args)])
+
+
+class PasswordHasher:
+    # Runs PBKDF2 in a process pool so hashing never holds a request worker's CPU.
+    # At most `workers` hashes run at once and `queue_depth` more may wait; anything
+    # beyond that is rejected immediately with HashingBusy instead of piling up.
+
+    def __init__(self, method=PASSWORD_HASH_METHOD, workers=HASH_WORKERS,
+                 queue_depth=HASH_QUEUE_DEPTH, timeout=HASH_TIMEOUT):
+        self.method = expand_method(method)
+        self.workers = workers
+        self.timeout = timeout
+        self._slots = threading.BoundedSemaphore(workers + queue_depth)
+        self._pool = None
+        self._pool_lock = threading.Lock()
+
+    def _executor(self):
+        if self._pool is None:
+            with self._pool_lock:
+                if self._pool is None:
+                    # Workers come from a fork server, not from forking this threaded
+                    # process, whose locks may be held by other threads at fork time.
+                    context = multiprocessing.get_context(
+                        'forkserver' if 'forkserver' in multiprocessing.get_all_start_methods() else 'spawn')
+                    self._pool = ProcessPoolExecutor(max_workers=self.workers, mp_context=context)
+        return self._pool
+
+    def _run(self, fn, *args):
+        if not self._slots.acquire(blocking=False):
+            raise HashingBusy()
+        try:
+            future = self._executor().submit(fn, *args)
+        except Exception:
+            self._slots.release()
+            raise
+        # The slot stays taken until the job itself finishes, not just until the caller
+        # stops waiting, so timed-out hashes still count against the limit.
+        future.add_done_callback(lambda _: self._slots.release())
+        try:
+            return future.result(timeout=self.timeout)
+        except TimeoutError:
+            raise HashingBusy()
+
+    def hash(self, password):
+        return self._run(generate_password_hash, password, self.method)
+
+    def verify(self, pwhash, password):
+        return self._run(check_password_hash, pwhash, password)
+
+    def needs_rehash(self, pwhash):
+        # Werkzeug stores the method and its cost parameters before the first '$'.
+        return pwhash.split('$', 1)[0] != self.method
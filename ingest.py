@@ -0,0 +1,255 @@
+import fcntl
+import glob
+import json
+import os
+import socket
+import threading
+import time
+import uuid
+from datetime import datetime
+from sqlalchemy import text
+from sqlalchemy.exc import IntegrityError
+from metrics import registry
+
+FLUSH_ROW_BUCKETS = (1, 5, 10, 25, 50, 100, 250, 500, 1000, 2500)
+
+flush_rows = registry.histogram(
+    'app_submission_flush_rows', 'Submissions stored per group commit.', buckets=FLUSH_ROW_BUCKETS)
+flush_duration = registry.histogram(
+    'app_submission_flush_seconds', 'Time to store one batch of queued submissions.')
+flush_failures_total = registry.counter(
+    'app_submission_flush_failures_total', 'Batches of queued submissions that failed to store and were retried.')
+
+
+class SubmissionQueue:
+    # Write-ahead queue for submissions during deadline surges. A request appends its
+    # submission to a per-process log file and returns once the log is fsynced; requests
+    # arriving together share one fsync. A background thread stores the queued
+    # submissions with multi-row inserts, one commit per batch, so the database commits
+    # once per batch instead of once per student.
+    #
+    # submitted_at is taken while appending, so log order is submission order, and the
+    # stored row keeps that exact time. Storing is idempotent (an existing row keeps the
+    # earlier submission), which lets a log be replayed after a crash: start() replays
+    # the logs that dead processes on this host left, found by their unheld lock, and
+    # then keeps the writer running. Call it at startup; a forked worker restarts it.
+    #
+    # Each process only knows its own queue. Until a submission is stored, the status
+    # check and the duplicate check of another worker do not see it, so a student can
+    # get a second receipt there; storing still keeps only the earlier submission.
+
+    def __init__(self, app, db, directory, batch_size=500, flush_interval=0.05, on_flush=None):
+        self.app = app
+        self.db = db
+        self.directory = directory
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.on_flush = on_flush
+        self.path = None
+
+        self._lock = threading.Lock()
+        self._wakeup = threading.Condition(self._lock)
+        self._sync_lock = threading.Lock()
+        self._pid = None
+        self._file = None
+        self._started = False
+        self._pending = []
+        self._queued = {}
+        self._written = 0
+        self._synced = 0
+
+    def start(self):
+        with self._lock:
+            self._open()
+        if not self._started:
+            self._started = True
+            os.register_at_fork(after_in_child=self._after_fork)
+
+    def _after_fork(self):
+        # The child has none of the parent's threads, so a lock one of them held stays
+        # locked. The inherited log stays locked by the parent and is left to it.
+        self._lock = threading.Lock()
+        self._wakeup = threading.Condition(self._lock)
+        self._sync_lock = threading.Lock()
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+        self.start()
+
+    def _open(self):
+        # Called with the lock held. Opened at start, and again in a forked worker, which
+        # inherits neither the parent's writer thread nor the right to its log.
+        if self._pid == os.getpid():
+            return
+
+        os.makedirs(self.directory, exist_ok=True)
+        self.path = os.path.join(self.directory, f'submissions-{socket.gethostname()}-{os.getpid()}.wal')
+        self._file = open(self.path, 'a+b')
+        fcntl.flock(self._file, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        self._pid = os.getpid()
+
+        # A previous process with the same pid (a restarted container) left this log.
+        self._file.seek(0)
+        self._pending = read_records(self._file)
+        self._queued = {(record['assign_id'], record['stud_id']): record for record in self._pending}
+        self._written = self._synced = len(self._pending)
+
+        threading.Thread(target=self._run, name='submission-writer', daemon=True).start()
+
+    def enqueue(self, assign_id, student_id, submission_url):
+        # Returns the durable record, or None when the student already has a submission
+        # for the assignment waiting in this queue.
+        with self._lock:
+            self._open()
+            key = (assign_id, student_id)
+            if key in self._queued:
+                return None
+
+            record = {
+                'receipt_id': uuid.uuid4().hex,
+                'assign_id': assign_id,
+                'stud_id': student_id,
+                'submission_url': submission_url,
+                'submitted_at': datetime.utcnow().isoformat()
+            }
+            self._file.write(json.dumps(record).encode() + b'\n')
+            self._written += 1
+            sequence = self._written
+            self._queued[key] = record
+            self._pending.append(record)
+
+        self._sync(sequence)
+        with self._lock:
+            self._wakeup.notify()
+        return record
+
+    def _sync(self, sequence):
+        # Group fsync: whoever gets the sync lock syncs everything appended so far, and
+        # the requests that were waiting behind it find their record already covered.
+        with self._sync_lock:
+            if self._synced >= sequence:
+                return
+            with self._lock:
+                self._file.flush()
+                target = self._written
+            os.fsync(self._file.fileno())
+            self._synced = target
+
+    def queued(self, assign_id, student_id):
+        with self._lock:
+            return self._queued.get((assign_id, student_id))
+
+    def depth(self):
+        return [((), len(self._pending))]
+
+    def _run(self):
+        self.recover()
+        while True:
+            with self._lock:
+                self._wakeup.wait_for(lambda: self._pending)
+                # Wait briefly for more submissions to share the commit with.
+                self._wakeup.wait_for(lambda: len(self._pending) >= self.batch_size, timeout=self.flush_interval)
+                batch = self._pending[:self.batch_size]
+
+            try:
+                self.store(batch)
+            except Exception:
+                flush_failures_total.inc()
+                self.app.logger.exception('Storing %d queued submissions failed; retrying', len(batch))
+                time.sleep(1)
+                continue
+
+            with self._lock:
+                del self._pending[:len(batch)]
+                for record in batch:
+                    self._queued.pop((record['assign_id'], record['stud_id']), None)
+                # Everything logged is stored, so the log can start over.
+                if not self._pending and self._synced == self._written:
+                    self._file.truncate(0)
+
+    def store(self, records):
+        started = time.perf_counter()
+        with self.app.app_context():
+            try:
+                self._insert(records)
+                self.db.session.commit()
+            except IntegrityError:
+                # A row the database rejects (its assignment or student is gone) must not
+                # hold back the rest of the batch.
+                self.db.session.rollback()
+                for record in records:
+                    try:
+                        self._insert([record])
+                        self.db.session.commit()
+                    except IntegrityError:
+                        self.db.session.rollback()
+                        self.app.logger.error('Dropping queued submission that cannot be stored: %s', record)
+
+            if self.on_flush is not None:
+                self.on_flush(records)
+
+        flush_rows.observe(len(records))
+        flush_duration.observe(time.perf_counter() - started)
+
+    def _insert(self, records):
+        values = ', '.join(f'(:assign_id_{n}, :stud_id_{n}, :submission_url_{n}, :submitted_at_{n})'
+                           for n in range(len(records)))
+        params = {}
+        for n, record in enumerate(records):
+            params[f'assign_id_{n}'] = record['assign_id']
+            params[f'stud_id_{n}'] = record['stud_id']
+            params[f'submission_url_{n}'] = record['submission_url']
+            # The column keeps whole seconds and MySQL would round, which could move a
+            # submission made in the deadline's last half second past it.
+            params[f'submitted_at_{n}'] = datetime.fromisoformat(record['submitted_at']).replace(microsecond=0)
+
+        # An existing ungraded row is replaced only by an earlier submission, so replays
+        # and races between workers always leave the first submission in place.
+        sql = text(f"""
+            INSERT INTO submission (assign_id, stud_id, submission_url, submitted_at) VALUES {values}
+            ON DUPLICATE KEY UPDATE
+                submission_url = IF(grade IS NULL AND VALUES(submitted_at) < submitted_at,
+                                    VALUES(submission_url), submission_url),
+                submitted_at = IF(grade IS NULL AND VALUES(submitted_at) < submitted_at,
+                                  VALUES(submitted_at), submitted_at)
+        """)
+        self.db.session.execute(sql, params)
+
+    def recover(self):
+        pattern = os.path.join(self.directory, f'submissions-{socket.gethostname()}-*.wal')
+        for path in glob.glob(pattern):
+            if path == self.path:
+                continue
+            try:
+                f = open(path, 'rb')
+            except FileNotFoundError:
+                # Another worker replayed it first.
+                continue
+
+            with f:
+                try:
+                    fcntl.flock(f, fcntl.LOCK_EX | fcntl.LOCK_NB)
+                except BlockingIOError:
+                    # A live worker's log.
+                    continue
+
+                records = read_records(f)
+                try:
+                    for start in range(0, len(records), self.batch_size):
+                        self.store(records[start:start + self.batch_size])
+                except Exception:
+                    self.app.logger.exception('Replaying %s failed; it is retried on the next start', path)
+                    continue
+                os.remove(path)
+                self.app.logger.info('Replayed %d queued submissions from %s', len(records), path)
+
+
+def read_records(f):
+    records = []
+    for line in f.read().splitlines():
+        try:
+            records.append(json.loads(line))
+        except ValueError:
+            # The tail of a write cut short by a crash; it was never acknowledged.
+            break
+    return records
@@ -0,0 +1,80 @@
+import json
+import time
+from datetime import date, datetime, time as time_of_day
+from decimal import Decimal
+from metrics import current_request_stats
+
+# orjson is several times faster than the standard library encoder and encodes
+# datetimes itself; it is optional (pip install orjson).
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+CHUNK_SIZE = 64 * 1024
+
+
+def encode_default(value):
+    if isinstance(value, (datetime, date, time_of_day)):
+        return value.isoformat()
+    if isinstance(value, Decimal):
+        return float(value)
+    raise TypeError(f'Object of type {type(value).__name__} is not JSON serializable')
+
+
+if orjson is not None:
+    def dumps(value):
+        return orjson.dumps(value, default=encode_default)
+else:
+    _encoder = json.JSONEncoder(default=encode_default, separators=(',', ':'), ensure_ascii=False)
+
+    def dumps(value):
+        return _encoder.encode(value).encode()
+
+
+def encode_rows(rows, names, key=None, head=None, tail=None, chunk_size=CHUNK_SIZE):
+    # Yields the JSON document for `rows` in chunks of about chunk_size bytes, encoding
+    # each row as an object with the given field names as it is read, so a result read
+    # from a server-side cursor is never held in memory as a whole. Without a key the
+    # document is the bare array; with one it is an object holding the members of `head`,
+    # the array under `key`, then the members of `tail`. `tail` may be a callable, called
+    # once the rows are exhausted. Datetimes are encoded in ISO 8601, Decimals as numbers.
+    buffer = bytearray()
+    encoding = 0.0
+
+    started = time.perf_counter()
+    if key is None:
+        buffer += b'['
+    else:
+        buffer += b'{'
+        for name, value in (head or {}).items():
+            buffer += dumps(name) + b':' + dumps(value) + b','
+        buffer += dumps(key) + b':['
+    encoding += time.perf_counter() - started
+
+    first = True
+    for row in rows:
+        started = time.perf_counter()
+        if not first:
+            buffer += b','
+        buffer += dumps(dict(zip(names, row)))
+        first = False
+        encoding += time.perf_counter() - started
+
+        if len(buffer) >= chunk_size:
+            yield bytes(buffer)
+            buffer.clear()
+
+    started = time.perf_counter()
+    buffer += b']'
+    if key is not None:
+        for name, value in (tail() if callable(tail) else tail or {}).items():
+            buffer += b',' + dumps(name) + b':' + dumps(value)
+        buffer += b'}'
+    buffer += b'\n'
+    encoding += time.perf_counter() - started
+
+    stats = current_request_stats()
+    if stats is not None:
+        stats['json_time'] += encoding
+    yield bytes(buffer)
@@ -0,0 +1,265 @@
+import re
+import threading
+import time
+from collections import Counter
+from flask import g, has_request_context, request
+from flask.json.provider import DefaultJSONProvider
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+DURATION_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+QUERY_COUNT_BUCKETS = (0, 1, 2, 3, 5, 8, 13, 21, 34, 55, 100)
+
+
+def format_labels(names, values):
+    if not names:
+        return ''
+    pairs = []
+    for name, value in zip(names, values):
+        value = str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+        pairs.append(f'{name}="{value}"')
+    return '{' + ','.join(pairs) + '}'
+
+
+class Histogram:
+    # Cumulative-bucket histogram per label set, rendered in the Prometheus text format.
+
+    def __init__(self, name, help, labels=(), buckets=DURATION_BUCKETS):
+        self.name = name
+        self.help = help
+        self.labels = tuple(labels)
+        self.buckets = tuple(buckets)
+        self._series = {}
+        self._lock = threading.Lock()
+
+    def observe(self, value, *labels):
+        with self._lock:
+            series = self._series.get(labels)
+            if series is None:
+                series = self._series[labels] = [[0] * len(self.buckets), 0.0, 0]
+            for n, bound in enumerate(self.buckets):
+                if value <= bound:
+                    series[0][n] += 1
+            series[1] += value
+            series[2] += 1
+
+    def render(self):
+        lines = [f'# HELP {self.name} {self.help}', f'# TYPE {self.name} histogram']
+        with self._lock:
+            for labels, (counts, total, count) in sorted(self._series.items()):
+                for bound, bucket_count in zip(self.buckets, counts):
+                    bucket_labels = format_labels(self.labels + ('le',), labels + (bound,))
+                    lines.append(f'{self.name}_bucket{bucket_labels} {bucket_count}')
+                lines.append(f'{self.name}_bucket{format_labels(self.labels + ("le",), labels + ("+Inf",))} {count}')
+                lines.append(f'{self.name}_sum{format_labels(self.labels, labels)} {total}')
+                lines.append(f'{self.name}_count{format_labels(self.labels, labels)} {count}')
+        return lines
+
+
+class Metric:
+    # Counter or gauge per label set. Gauges may also be backed by a callback that is
+    # read at scrape time, for values another component already tracks.
+
+    def __init__(self, name, help, labels=(), kind='counter', callback=None):
+        self.name = name
+        self.help = help
+        self.labels = tuple(labels)
+        self.kind = kind
+        self.callback = callback
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def inc(self, amount=1, *labels):
+        with self._lock:
+            self._values[labels] = self._values.get(labels, 0) + amount
+
+    def set(self, value, *labels):
+        with self._lock:
+            self._values[labels] = value
+
+    def render(self):
+        lines = [f'# HELP {self.name} {self.help}', f'# TYPE {self.name} {self.kind}']
+        if self.callback is not None:
+            values = {tuple(labels): value for labels, value in self.callback()}
+        else:
+            with self._lock:
+                values = dict(self._values)
+        for labels, value in sorted(values.items()):
+            lines.append(f'{self.name}{format_labels(self.labels, labels)} {value}')
+        return lines
+
+
+class Registry:
+    # Metrics of this process, exposed at /metrics. Each worker process keeps its own,
+    # so Prometheus should scrape every worker (or aggregate by instance).
+
+    def __init__(self):
+        self._metrics = []
+        self._lock = threading.Lock()
+
+    def _add(self, metric):
+        with self._lock:
+            self._metrics.append(metric)
+        return metric
+
+    def histogram(self, name, help, labels=(), buckets=DURATION_BUCKETS):
+        return self._add(Histogram(name, help, labels, buckets))
+
+    def counter(self, name, help, labels=()):
+        return self._add(Metric(name, help, labels, 'counter'))
+
+    def gauge(self, name, help, labels=(), callback=None):
+        return self._add(Metric(name, help, labels, 'gauge', callback))
+
+    def render(self):
+        lines = []
+        with self._lock:
+            metrics = list(self._metrics)
+        for metric in metrics:
+            lines.extend(metric.render())
+        return '\n'.join(lines) + '\n'
+
+
+registry = Registry()
+
+request_duration = registry.histogram(
+    'app_request_duration_seconds', 'Total time spent handling a request.', ('method', 'route'))
+request_db_duration = registry.histogram(
+    'app_request_db_seconds', 'Time spent executing SQL per request.', ('method', 'route'))
+request_json_duration = registry.histogram(
+    'app_request_json_seconds', 'Time spent serializing JSON per request.', ('method', 'route'))
+request_queries = registry.histogram(
+    'app_request_db_queries', 'SQL statements executed per request.', ('method', 'route'), QUERY_COUNT_BUCKETS)
+requests_total = registry.counter(
+    'app_requests_total', 'Requests handled, by response status.', ('method', 'route', 'status'))
+slow_requests_total = registry.counter(
+    'app_slow_requests_total', 'Requests slower than the slow-request threshold.', ('method', 'route'))
+repeated_statements_total = registry.counter(
+    'app_repeated_statements_total', 'Requests that repeated one statement shape past the N+1 threshold.',
+    ('method', 'route'))
+
+# Bound values are already placeholders; this folds what still varies between calls of
+# the same query: literals, expanded IN lists and multi-row VALUES.
+SHAPE_PATTERNS = [
+    (re.compile(r"'(?:[^'\\]|\\.)*'"), '?'),
+    (re.compile(r'\b\d+(\.\d+)?\b'), '?'),
+    (re.compile(r'%\(\w+\)s|%s|\?|:\w+'), '?'),
+    (re.compile(r'\(\s*\?(\s*,\s*\?)*\s*\)(\s*,\s*\(\s*\?(\s*,\s*\?)*\s*\))*'), '(?)'),
+    (re.compile(r'\s+'), ' '),
+]
+
+
+def statement_shape(statement):
+    for pattern, replacement in SHAPE_PATTERNS:
+        statement = pattern.sub(replacement, statement)
+    return statement.strip()
+
+
+def current_request_stats():
+    if not has_request_context():
+        return None
+    return g.get('request_stats')
+
+
+@event.listens_for(Engine, 'before_cursor_execute')
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    conn.info.setdefault('query_started', []).append(time.perf_counter())
+
+
+@event.listens_for(Engine, 'after_cursor_execute')
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    elapsed = time.perf_counter() - conn.info['query_started'].pop()
+    stats = current_request_stats()
+    if stats is None:
+        return
+
+    stats['queries'] += 1
+    stats['db_time'] += elapsed
+    stats['shapes'][statement_shape(statement)] += 1
+    if len(stats['statements']) < stats['max_statements']:
+        stats['statements'].append((elapsed, statement))
+
+
+@event.listens_for(Engine, 'handle_error')
+def _handle_error(context):
+    # A failed statement never reaches after_cursor_execute.
+    if context.connection is not None and context.connection.info.get('query_started'):
+        context.connection.info['query_started'].pop()
+
+
+class TimedJSONProvider(DefaultJSONProvider):
+    # jsonify goes through the app's JSON provider, so timing it here covers every route.
+
+    def dumps(self, obj, **kwargs):
+        started = time.perf_counter()
+        try:
+            return super().dumps(obj, **kwargs)
+        finally:
+            stats = current_request_stats()
+            if stats is not None:
+                stats['json_time'] += time.perf_counter() - started
+
+
+class RequestInstrumentation:
+    # Records per-route query counts and DB, JSON and total time. Requests slower than
+    # slow_request_ms are logged with their SQL, and a request that runs one statement
+    # shape more than repeat_threshold times is reported as a likely N+1 query.
+
+    def __init__(self, app, slow_request_ms=500, repeat_threshold=10, max_statements=50):
+        self.app = app
+        self.slow_request_ms = slow_request_ms
+        self.repeat_threshold = repeat_threshold
+        self.max_statements = max_statements
+
+        app.json = TimedJSONProvider(app)
+        app.before_request(self.before_request)
+        app.after_request(self.after_request)
+        app.teardown_request(self.teardown_request)
+
+    def before_request(self):
+        g.request_stats = {
+            'started': time.perf_counter(),
+            'queries': 0,
+            'db_time': 0.0,
+            'json_time': 0.0,
+            'shapes': Counter(),
+            'statements': [],
+            'max_statements': self.max_statements,
+            'status': 500
+        }
+
+    def after_request(self, response):
+        stats = current_request_stats()
+        if stats is not None:
+            stats['status'] = response.status_code
+        return response
+
+    def teardown_request(self, exc):
+        stats = current_request_stats()
+        if stats is None:
+            return
+        g.pop('request_stats')
+
+        elapsed = time.perf_counter() - stats['started']
+        route = request.url_rule.rule if request.url_rule else 'unmatched'
+        method = request.method
+
+        request_duration.observe(elapsed, method, route)
+        request_db_duration.observe(stats['db_time'], method, route)
+        request_json_duration.observe(stats['json_time'], method, route)
+        request_queries.observe(stats['queries'], method, route)
+        requests_total.inc(1, method, route, stats['status'])
+
+        shape, repeats = stats['shapes'].most_common(1)[0] if stats['shapes'] else (None, 0)
+        if repeats > self.repeat_threshold:
+            repeated_statements_total.inc(1, method, route)
+            self.app.logger.warning('Repeated statement (%d times) in %s %s: %s', repeats, method, route, shape)
+
+        if elapsed * 1000 >= self.slow_request_ms:
+            slow_requests_total.inc(1, method, route)
+            statements = '\n'.join(f'  {duration * 1000:.2f}ms {" ".join(sql.split())}'
+                                   for duration, sql in stats['statements'])
+            self.app.logger.warning(
+                'Slow request %s %s: %.1fms total, %d queries in %.1fms, json %.1fms\n%s',
+                method, request.full_path, elapsed * 1000, stats['queries'], stats['db_time'] * 1000,
+                stats['json_time'] * 1000, statements)
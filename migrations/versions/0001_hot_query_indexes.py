@@ -0,0 +1,43 @@
+"""Hot query indexes
+
+Revision ID: 0001
+Revises:
+Create Date: 2026-10-17 23:20:00
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '0001'
+down_revision = None
+branch_labels = None
+depends_on = None
+
+INDEXES = [
+    # Course members page by (course_id, stud_id); the primary key leads with stud_id.
+    ('course_registration', 'idx_course_registration_course_stud', ['course_id', 'stud_id']),
+    ('calendar_event', 'idx_calendar_event_course_date', ['course_id', 'event_date']),
+    ('thread_reply', 'idx_thread_reply_thread_replied', ['thread_id', 'replied_at', 'reply_id']),
+    ('thread_reply', 'idx_thread_reply_thread_parent', ['thread_id', 'parent_reply_id', 'replied_at', 'reply_id']),
+    ('course', 'idx_course_lecturer', ['lecturer_id', 'course_id']),
+    # register checks for an existing user by name
+    ('user', 'idx_user_name', ['name']),
+]
+
+
+def has_index(table, name):
+    return name in {index['name'] for index in sa.inspect(op.get_bind()).get_indexes(table)}
+
+
+def upgrade():
+    for table, name, columns in INDEXES:
+        if not has_index(table, name):
+            op.create_index(name, table, columns)
+
+
+def downgrade():
+    for table, name, columns in reversed(INDEXES):
+        if has_index(table, name):
+            op.drop_index(name, table_name=table)
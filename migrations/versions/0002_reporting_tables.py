@@ -0,0 +1,58 @@
+"""Reporting tables
+
+Revision ID: 0002
+Revises: 0001
+Create Date: 2026-10-17 23:20:00
+
+"""
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision = '0002'
+down_revision = '0001'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # Filled by `flask rebuild-stats`.
+    op.execute("""
+        CREATE TABLE IF NOT EXISTS course_stats (
+            course_id INT PRIMARY KEY,
+            student_count INT NOT NULL DEFAULT 0,
+            INDEX idx_course_stats_student_count (student_count),
+            FOREIGN KEY (course_id) REFERENCES course(course_id)
+        )
+    """)
+    op.execute("""
+        CREATE TABLE IF NOT EXISTS student_stats (
+            stud_id INT PRIMARY KEY,
+            course_count INT NOT NULL DEFAULT 0,
+            grade_sum DECIMAL(12,2) NOT NULL DEFAULT 0,
+            grade_count INT NOT NULL DEFAULT 0,
+            average_grade DECIMAL(5,2) AS (ROUND(grade_sum / NULLIF(grade_count, 0), 2)) STORED,
+            INDEX idx_student_stats_average_grade (average_grade),
+            FOREIGN KEY (stud_id) REFERENCES user(userid)
+        )
+    """)
+    op.execute("""
+        CREATE TABLE IF NOT EXISTS lecturer_stats (
+            lecturer_id INT PRIMARY KEY,
+            course_count INT NOT NULL DEFAULT 0,
+            FOREIGN KEY (lecturer_id) REFERENCES user(userid)
+        )
+    """)
+    op.execute("""
+        CREATE TABLE IF NOT EXISTS resource_version (
+            course_id INT NOT NULL,
+            resource VARCHAR(32) NOT NULL,
+            version BIGINT NOT NULL DEFAULT 0,
+            PRIMARY KEY (course_id, resource)
+        )
+    """)
+
+
+def downgrade():
+    for table in ('resource_version', 'lecturer_stats', 'student_stats', 'course_stats'):
+        op.execute(f"DROP TABLE IF EXISTS {table}")
@@ -0,0 +1,49 @@
+"""Thread activity counters
+
+Revision ID: 0003
+Revises: 0002
+Create Date: 2026-10-17 23:20:00
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '0003'
+down_revision = '0002'
+branch_labels = None
+depends_on = None
+
+COLUMNS = [
+    sa.Column('reply_count', sa.Integer(), nullable=False, server_default='0'),
+    sa.Column('last_activity_at', sa.DateTime(), nullable=True),
+]
+
+
+def thread_columns():
+    return {column['name'] for column in sa.inspect(op.get_bind()).get_columns('discussion_thread')}
+
+
+def upgrade():
+    existing = thread_columns()
+    for column in COLUMNS:
+        if column.name not in existing:
+            op.add_column('discussion_thread', column.copy())
+
+    op.execute("""
+        UPDATE discussion_thread t
+        JOIN (
+            SELECT thread_id, COUNT(*) AS reply_count, MAX(replied_at) AS last_reply_at
+            FROM thread_reply
+            GROUP BY thread_id
+        ) r ON r.thread_id = t.thread_id
+        SET t.reply_count = r.reply_count, t.last_activity_at = r.last_reply_at
+    """)
+
+
+def downgrade():
+    existing = thread_columns()
+    for column in reversed(COLUMNS):
+        if column.name in existing:
+            op.drop_column('discussion_thread', column.name)
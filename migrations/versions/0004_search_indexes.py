@@ -0,0 +1,38 @@
+"""Full-text search indexes
+
+Revision ID: 0004
+Revises: 0003
+Create Date: 2026-10-17 23:20:00
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '0004'
+down_revision = '0003'
+branch_labels = None
+depends_on = None
+
+INDEXES = [
+    ('discussion_thread', 'ft_discussion_thread_title', ['dis_title']),
+    ('thread_reply', 'ft_thread_reply_text', ['reply_text']),
+    ('course_content', 'ft_course_content_title', ['content_title']),
+]
+
+
+def has_index(table, name):
+    return name in {index['name'] for index in sa.inspect(op.get_bind()).get_indexes(table)}
+
+
+def upgrade():
+    for table, name, columns in INDEXES:
+        if not has_index(table, name):
+            op.create_index(name, table, columns, mysql_prefix='FULLTEXT')
+
+
+def downgrade():
+    for table, name, columns in reversed(INDEXES):
+        if has_index(table, name):
+            op.drop_index(name, table_name=table)
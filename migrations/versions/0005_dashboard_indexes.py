@@ -0,0 +1,31 @@
+"""Dashboard indexes
+
+Revision ID: 0005
+Revises: 0004
+Create Date: 2026-10-17 23:20:00
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '0005'
+down_revision = '0004'
+branch_labels = None
+depends_on = None
+
+
+def has_index(table, name):
+    return name in {index['name'] for index in sa.inspect(op.get_bind()).get_indexes(table)}
+
+
+def upgrade():
+    # Dashboards read each course's assignments due within a window.
+    if not has_index('assignment', 'idx_assignment_course_due'):
+        op.create_index('idx_assignment_course_due', 'assignment', ['course_id', 'due_date'])
+
+
+def downgrade():
+    if has_index('assignment', 'idx_assignment_course_due'):
+        op.drop_index('idx_assignment_course_due', table_name='assignment')
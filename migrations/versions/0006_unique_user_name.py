@@ -0,0 +1,43 @@
+"""Unique user names
+
+Revision ID: 0006
+Revises: 0005
+Create Date: 2026-10-18 10:00:00
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '0006'
+down_revision = '0005'
+branch_labels = None
+depends_on = None
+
+
+def has_index(table, name):
+    return name in {index['name'] for index in sa.inspect(op.get_bind()).get_indexes(table)}
+
+
+def upgrade():
+    # register relies on this index to reject a taken name, so two concurrent
+    # registrations cannot both insert it. It replaces the plain index on name.
+    duplicates = op.get_bind().execute(sa.text(
+        "SELECT COUNT(*) FROM (SELECT name FROM user GROUP BY name HAVING COUNT(*) > 1) d"
+    )).scalar()
+    if duplicates:
+        raise RuntimeError(f'{duplicates} user name(s) are used more than once; rename those users '
+                           'before adding the unique index')
+
+    if not has_index('user', 'uq_user_name'):
+        op.create_index('uq_user_name', 'user', ['name'], unique=True)
+    if has_index('user', 'idx_user_name'):
+        op.drop_index('idx_user_name', table_name='user')
+
+
+def downgrade():
+    if not has_index('user', 'idx_user_name'):
+        op.create_index('idx_user_name', 'user', ['name'])
+    if has_index('user', 'uq_user_name'):
+        op.drop_index('uq_user_name', table_name='user')
@@ -0,0 +1,135 @@
+import itertools
+import threading
+import time
+from contextlib import contextmanager
+from flask import g, has_app_context, request
+from flask_sqlalchemy.session import Session
+from sqlalchemy import text
+
+READ_YOUR_WRITES_COOKIE = 'primary_until'
+
+
+class RoutingSession(Session):
+    # Sends a request's statements to the replica bind chosen for it, if any. Raw text()
+    # statements carry no table metadata, so without a choice everything goes to the
+    # default (primary) engine, as before.
+
+    def get_bind(self, mapper=None, clause=None, bind=None, **kwargs):
+        if bind is None and has_app_context() and g.get('db_bind'):
+            return self._db.engines[g.db_bind]
+        return super().get_bind(mapper=mapper, clause=clause, bind=bind, **kwargs)
+
+
+class ReplicaRouter:
+    # Picks a replica for read-only requests, round-robin or by fewest checked-out
+    # connections, skipping replicas whose replication lag is above max_lag or unknown.
+    # Lag is re-measured at most every check_interval seconds by the request that
+    # notices it is stale. After a successful write the client gets a cookie that keeps
+    # its reads on the primary for read_your_writes seconds, so it sees its own changes.
+    # Code that runs several requests in one (a /batch call) sets g.primary_only once
+    # it has written, for the same reason.
+
+    def __init__(self, app, db, binds, strategy='round_robin', max_lag=5.0, check_interval=5.0,
+                 read_your_writes=5.0, allow_unreplicated=False):
+        if strategy not in ('round_robin', 'least_connections'):
+            raise ValueError(f'Unknown replica selection strategy: {strategy}')
+
+        self.db = db
+        self.binds = list(binds)
+        self.strategy = strategy
+        self.max_lag = max_lag
+        self.check_interval = check_interval
+        self.read_your_writes = read_your_writes
+        # Two independent local servers can stand in for a replica set during testing;
+        # they report no replication status, which otherwise marks them unusable.
+        self.allow_unreplicated = allow_unreplicated
+        self._lag = {bind: None for bind in self.binds}
+        self._checked_at = {bind: 0.0 for bind in self.binds}
+        self._cycle = itertools.cycle(self.binds)
+        self._lock = threading.Lock()
+        self._check_lock = threading.Lock()
+
+        if self.binds:
+            app.after_request(self.after_request)
+
+    def measure_lag(self, bind):
+        engine = self.db.engines[bind]
+        try:
+            with engine.connect() as conn:
+                try:
+                    status = conn.execute(text("SHOW REPLICA STATUS")).mappings().fetchone()
+                    column = 'Seconds_Behind_Source'
+                except Exception:
+                    # MySQL before 8.0.22 and MariaDB only know the old spelling.
+                    conn.rollback()
+                    status = conn.execute(text("SHOW SLAVE STATUS")).mappings().fetchone()
+                    column = 'Seconds_Behind_Master'
+        except Exception:
+            return None
+
+        if status is None:
+            return 0.0 if self.allow_unreplicated else None
+        lag = status.get(column)
+        return float(lag) if lag is not None else None
+
+    def refresh(self):
+        now = time.monotonic()
+        stale = [bind for bind in self.binds if now - self._checked_at[bind] >= self.check_interval]
+        if not stale or not self._check_lock.acquire(blocking=False):
+            return
+        try:
+            for bind in stale:
+                self._lag[bind] = self.measure_lag(bind)
+                self._checked_at[bind] = time.monotonic()
+        finally:
+            self._check_lock.release()
+
+    def healthy(self):
+        return [bind for bind in self.binds if self._lag[bind] is not None and self._lag[bind] <= self.max_lag]
+
+    def choose(self):
+        self.refresh()
+        healthy = self.healthy()
+        if not healthy:
+            return None
+
+        if self.strategy == 'least_connections':
+            return min(healthy, key=lambda bind: self.db.engines[bind].pool.checkedout())
+
+        with self._lock:
+            for _ in range(len(self.binds)):
+                bind = next(self._cycle)
+                if bind in healthy:
+                    return bind
+        return None
+
+    def recently_wrote(self):
+        try:
+            return float(request.cookies.get(READ_YOUR_WRITES_COOKIE, 0)) > time.time()
+        except ValueError:
+            return False
+
+    @contextmanager
+    def primary(self):
+        # Runs the enclosed statements on the primary, whichever bind the request reads from.
+        bind = g.pop('db_bind', None)
+        try:
+            yield
+        finally:
+            if bind is not None:
+                g.db_bind = bind
+
+    def route_reads(self):
+        if not self.binds or g.get('primary_only') or self.recently_wrote():
+            return
+        g.db_bind = self.choose()
+
+    def after_request(self, response):
+        if request.method not in ('GET', 'HEAD', 'OPTIONS') and response.status_code < 400:
+            until = time.time() + self.read_your_writes
+            response.set_cookie(READ_YOUR_WRITES_COOKIE, f'{until:.3f}', max_age=int(self.read_your_writes) + 1,
+                                httponly=True, samesite='Lax')
+        return response
+
+    def lag_metrics(self):
+        return [((bind,), -1 if lag is None else lag) for bind, lag in self._lag.items()]
@@ -0,0 +1,94 @@
+# Shows that student agenda latency stays flat as the calendar grows.
+#
+# Runs against DATABASE_URL loaded with data_generation.py (100k students). For each
+# target size the calendar_event table is topped up with synthetic events spread
+# over a year across all courses, then a sample of students' 7-day agendas is timed
+# through the app. Synthetic events are tagged and removed at the end.
+
+import argparse
+import os
+import random
+import statistics
+import sys
+import time
+from datetime import datetime, timedelta
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from sqlalchemy import text
+from app import app, db, issue_token
+
+BENCH_TITLE = 'bench-agenda'
+YEAR_START = datetime(2025, 1, 1)
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Student agenda latency benchmark")
+    parser.add_argument('--sizes', default='10000,100000,1000000',
+                        help='comma separated total synthetic event counts')
+    parser.add_argument('--samples', type=int, default=200, help='agendas timed per size')
+    parser.add_argument('--batch', type=int, default=5000, help='rows per INSERT')
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--keep', action='store_true', help='leave synthetic events in place')
+    return parser.parse_args()
+
+
+def add_events(course_ids, count, batch, rng):
+    for start in range(0, count, batch):
+        rows = min(batch, count - start)
+        values = ', '.join(f'(:title, :date_{n}, :course_{n})' for n in range(rows))
+        params = {'title': BENCH_TITLE}
+        for n in range(rows):
+            params[f'date_{n}'] = YEAR_START + timedelta(minutes=rng.randrange(365 * 24 * 60))
+            params[f'course_{n}'] = rng.choice(course_ids)
+        db.session.execute(text(f"INSERT INTO calendar_event (event_title, event_date, course_id) VALUES {values}"), params)
+        db.session.commit()
+
+
+def percentile(values, pct):
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * pct / 100))]
+
+
+def main():
+    args = parse_args()
+    rng = random.Random(args.seed)
+    client = app.test_client()
+
+    with app.app_context():
+        course_ids = [row[0] for row in db.session.execute(text("SELECT course_id FROM course")).fetchall()]
+        student_ids = [row[0] for row in db.session.execute(
+            text("SELECT userid FROM user WHERE role = 'student'")).fetchall()]
+
+        if not course_ids or not student_ids:
+            raise SystemExit('Load data_generation.py output first')
+
+        print(f"{'events':>10}{'p50 ms':>10}{'p95 ms':>10}{'avg rows':>10}")
+        loaded = 0
+        try:
+            for size in sorted(int(size) for size in args.sizes.split(',')):
+                add_events(course_ids, size - loaded, args.batch, rng)
+                loaded = size
+
+                latencies = []
+                rows = []
+                for _ in range(args.samples):
+                    start = YEAR_START + timedelta(days=rng.randrange(358))
+                    student_id = rng.choice(student_ids)
+                    path = f'/calendar/student/{student_id}?from={start.date()}&to={(start + timedelta(days=7)).date()}'
+                    headers = {'Authorization': f'Bearer {issue_token(student_id, "student")}'}
+                    began = time.perf_counter()
+                    response = client.get(path, headers=headers)
+                    latencies.append((time.perf_counter() - began) * 1000)
+                    rows.append(len(response.get_json()['events']))
+
+                print(f"{size:>10}{statistics.median(latencies):>10.2f}{percentile(latencies, 95):>10.2f}"
+                      f"{statistics.mean(rows):>10.1f}")
+        finally:
+            if not args.keep:
+                db.session.execute(text("DELETE FROM calendar_event WHERE event_title = :title"), {'title': BENCH_TITLE})
+                db.session.commit()
+
+
+if __name__ == '__main__':
+    main()
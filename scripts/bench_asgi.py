@@ -0,0 +1,227 @@
+# Compares the WSGI app with the ASGI serving mode (asgi_app.py) at equal memory.
+#
+# Starts the ASGI server, loads it with many concurrent keep-alive clients and
+# records its resident memory. It then probes the RSS of a single WSGI worker and
+# starts the WSGI server with as many workers as fit into that same memory, and runs
+# the identical load. Requests cycle over the routes the ASGI mode serves natively,
+# with ids sampled from a database loaded with data_generation.py.
+#
+#   pip install gunicorn uvicorn aiomysql
+#   python scripts/bench_asgi.py --clients 2000 --duration 30
+
+import argparse
+import asyncio
+import os
+import random
+import shlex
+import socket
+import statistics
+import subprocess
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from sqlalchemy import text
+from app import app, db, issue_token
+
+APP_DIR = os.path.join(os.path.dirname(__file__), '..')
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="WSGI vs ASGI throughput at equal memory")
+    parser.add_argument('--asgi-cmd', default='uvicorn asgi_app:application --host 127.0.0.1 --port {port} --workers 1')
+    parser.add_argument('--wsgi-cmd', default='gunicorn --workers {workers} --bind 127.0.0.1:{port} app:app')
+    parser.add_argument('--wsgi-workers', type=int,
+                        help='fixed WSGI worker count instead of matching the ASGI server memory')
+    parser.add_argument('--port', type=int, default=8765)
+    parser.add_argument('--clients', type=int, default=1000, help='concurrent client connections')
+    parser.add_argument('--duration', type=float, default=30)
+    parser.add_argument('--warmup', type=float, default=5)
+    parser.add_argument('--samples', type=int, default=500, help='students sampled for request paths')
+    parser.add_argument('--seed', type=int, default=42)
+    return parser.parse_args()
+
+
+def sample_requests(count, seed):
+    rng = random.Random(seed)
+    with app.app_context():
+        registrations = db.session.execute(text("""
+            SELECT stud_id, course_id FROM course_registration ORDER BY RAND(:seed) LIMIT :count
+        """), {'seed': seed, 'count': count}).fetchall()
+        threads = [row[0] for row in db.session.execute(text("""
+            SELECT thread_id FROM discussion_thread ORDER BY RAND(:seed) LIMIT :count
+        """), {'seed': seed, 'count': count}).fetchall()]
+
+    if not registrations or not threads:
+        raise SystemExit('Load data_generation.py output first')
+
+    requests = []
+    for stud_id, course_id in registrations:
+        token = issue_token(stud_id, 'student')
+        requests.append((f'/courses/student/{stud_id}', token))
+        requests.append((f'/course-members/{course_id}', None))
+        requests.append((f'/calendar/student/{stud_id}?from=2025-02-03&to=2025-02-10', token))
+        requests.append((f'/threads/{rng.choice(threads)}/replies', None))
+    rng.shuffle(requests)
+    return requests
+
+
+def rss_bytes(pid):
+    # Resident memory of a process and all its descendants (pre-forked workers).
+    total = 0
+    pending = [pid]
+    while pending:
+        current = pending.pop()
+        try:
+            with open(f'/proc/{current}/status') as f:
+                for line in f:
+                    if line.startswith('VmRSS:'):
+                        total += int(line.split()[1]) * 1024
+            for task in os.listdir(f'/proc/{current}/task'):
+                with open(f'/proc/{current}/task/{task}/children') as f:
+                    pending.extend(int(child) for child in f.read().split())
+        except FileNotFoundError:
+            continue
+    return total
+
+
+def start_server(command, port):
+    process = subprocess.Popen(shlex.split(command), cwd=APP_DIR, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    deadline = time.monotonic() + 30
+    while time.monotonic() < deadline:
+        try:
+            socket.create_connection(('127.0.0.1', port), timeout=1).close()
+            return process
+        except OSError:
+            if process.poll() is not None:
+                raise SystemExit(f'{command!r} exited with {process.returncode}')
+            time.sleep(0.2)
+    process.terminate()
+    raise SystemExit(f'{command!r} did not start listening on port {port}')
+
+
+def stop_server(process):
+    process.terminate()
+    try:
+        process.wait(timeout=15)
+    except subprocess.TimeoutExpired:
+        process.kill()
+
+
+async def read_response(reader):
+    status_line = await reader.readline()
+    if not status_line:
+        raise ConnectionError('connection closed')
+    status = int(status_line.split()[1])
+
+    length = None
+    close = False
+    while True:
+        line = await reader.readline()
+        if line in (b'\r\n', b''):
+            break
+        name, _, value = line.decode('latin-1').partition(':')
+        name = name.strip().lower()
+        if name == 'content-length':
+            length = int(value)
+        elif name == 'connection' and value.strip().lower() == 'close':
+            close = True
+
+    if length is None:
+        await reader.read()
+        close = True
+    else:
+        await reader.readexactly(length)
+    return status, close
+
+
+async def client(port, requests, offset, stop_at, results):
+    # One keep-alive connection, reopened when the server closes it (gunicorn's sync
+    # workers close after every response).
+    connection = None
+    n = offset
+    while time.monotonic() < stop_at:
+        path, token = requests[n % len(requests)]
+        n += 1
+        headers = f'GET {path} HTTP/1.1\r\nHost: 127.0.0.1\r\n'
+        if token:
+            headers += f'Authorization: Bearer {token}\r\n'
+
+        started = time.perf_counter()
+        try:
+            if connection is None:
+                connection = await asyncio.open_connection('127.0.0.1', port)
+            reader, writer = connection
+            writer.write((headers + '\r\n').encode())
+            await writer.drain()
+            status, close = await read_response(reader)
+        except (OSError, ConnectionError, asyncio.IncompleteReadError):
+            results['errors'] += 1
+            connection = None
+            continue
+
+        results['latencies'].append(time.perf_counter() - started)
+        if status >= 500:
+            results['errors'] += 1
+        if close:
+            connection[1].close()
+            connection = None
+
+    if connection is not None:
+        connection[1].close()
+
+
+async def load(port, requests, clients, duration):
+    results = {'latencies': [], 'errors': 0}
+    stop_at = time.monotonic() + duration
+    await asyncio.gather(*(client(port, requests, n * 7, stop_at, results) for n in range(clients)))
+    return results
+
+
+def measure(name, process, args, requests):
+    asyncio.run(load(args.port, requests, args.clients, args.warmup))
+    started = time.monotonic()
+    results = asyncio.run(load(args.port, requests, args.clients, args.duration))
+    elapsed = time.monotonic() - started
+    rss = rss_bytes(process.pid)
+
+    latencies = sorted(results['latencies'])
+    rps = len(latencies) / elapsed
+    print(f"{name:<28}{rps:>10.1f}{statistics.median(latencies) * 1000:>10.1f}"
+          f"{latencies[int(len(latencies) * 0.99)] * 1000:>10.1f}{results['errors']:>8}"
+          f"{rss / 2**20:>10.0f}{rps / (rss / 2**20) * 100:>14.1f}")
+    return rss
+
+
+def main():
+    args = parse_args()
+    requests = sample_requests(args.samples, args.seed)
+
+    print(f"{'server':<28}{'req/s':>10}{'p50 ms':>10}{'p99 ms':>10}{'errors':>8}{'RSS MB':>10}{'req/s/100MB':>14}")
+
+    process = start_server(args.asgi_cmd.format(port=args.port), args.port)
+    try:
+        asgi_rss = measure('asgi', process, args, requests)
+    finally:
+        stop_server(process)
+
+    workers = args.wsgi_workers
+    if workers is None:
+        process = start_server(args.wsgi_cmd.format(port=args.port, workers=1), args.port)
+        try:
+            asyncio.run(load(args.port, requests, 4, args.warmup))
+            single_rss = rss_bytes(process.pid)
+        finally:
+            stop_server(process)
+        workers = max(1, int(asgi_rss // single_rss))
+
+    process = start_server(args.wsgi_cmd.format(port=args.port, workers=workers), args.port)
+    try:
+        measure(f'wsgi ({workers} workers)', process, args, requests)
+    finally:
+        stop_server(process)
+
+
+if __name__ == '__main__':
+    main()
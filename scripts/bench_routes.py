@@ -0,0 +1,344 @@
+# Route-level load benchmark driven by coll.postman_collection.json.
+#
+# Replays weighted mixes of the collection's requests against a database loaded with
+# data_generation.py, with ids and bodies filled from a sample of that dataset:
+#
+#   browse       read-heavy browsing by enrolled students
+#   enrollment   term start: logins and course registrations
+#   submission   assignment deadline: submissions, grading and forum traffic
+#
+# For every route it reports p50/p95/p99 latency, throughput, DB queries per request
+# (in-process runs only) and error counts. By default the app runs in-process through
+# the Flask test client; --base-url targets a running server instead, which must share
+# this environment's SECRET_KEY and DATABASE_URL.
+#
+#   python scripts/bench_routes.py --save baseline.json
+#   python scripts/bench_routes.py --baseline baseline.json --threshold 0.2   # exits 1 on regression
+
+import argparse
+import http.client
+import json
+import os
+import random
+import re
+import sys
+import threading
+import time
+from urllib.parse import urlsplit
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from sqlalchemy import event, text, bindparam
+from app import app, db, issue_token
+
+COLLECTION_PATH = os.path.join(os.path.dirname(__file__), '..', 'coll.postman_collection.json')
+
+# Numeric path segments of the collection's URLs, by URL shape.
+PATH_PARAMS = {
+    '/courses/student/{}': ('student_id',),
+    '/courses/lecturer/{}': ('lecturer_id',),
+    '/course-members/{}': ('course_id',),
+    '/forum/{}': ('course_id',),
+    '/threads/{}': ('forum_id',),
+    '/threads/{}/replies': ('thread_id',),
+    '/content/{}': ('course_id',),
+    '/assignment/{}/submit': ('assign_id',),
+    '/assignment/{}/grade': ('assign_id',),
+}
+
+# (collection request name, weight, acting role)
+SCENARIOS = {
+    'browse': [
+        ('Retrieving All Courses', 10, 'student'),
+        ('Retrieving Courses for Student', 20, 'student'),
+        ('Retrieving Courses For Lecturer', 5, 'lecturer'),
+        ('Get Members For a Course(Student + Lecturer))', 10, 'student'),
+        ('Fetch Forums for a Course', 15, 'student'),
+        ('Viewing Threads for a Forum', 20, 'student'),
+        ('Getting Content for a Course', 20, 'student'),
+    ],
+    'enrollment': [
+        ('Logging In User', 10, 'student'),
+        ('Registering a Student for a Course', 60, 'student'),
+        ('Retrieving Courses for Student', 20, 'student'),
+        ('Retrieving All Courses', 10, 'student'),
+    ],
+    'submission': [
+        ('Submitting Assignment as a Student', 55, 'student'),
+        ('Grading Assignment as a Lecturer', 15, 'lecturer'),
+        ('Getting Content for a Course', 10, 'student'),
+        ('Viewing Threads for a Forum', 10, 'student'),
+        ('User Replying to a Thread', 10, 'student'),
+    ],
+}
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Postman-driven route load benchmark")
+    parser.add_argument('--scenarios', default=','.join(SCENARIOS))
+    parser.add_argument('--requests', type=int, default=2000, help='requests per scenario')
+    parser.add_argument('--warmup', type=int, default=100, help='unmeasured requests per scenario')
+    parser.add_argument('--concurrency', type=int, default=8)
+    parser.add_argument('--students', type=int, default=2000, help='students sampled from the dataset')
+    parser.add_argument('--password', default='password', help='password data_generation.py gave the users')
+    parser.add_argument('--base-url', help='benchmark a running server instead of the in-process app')
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--save', help='write the results as a baseline')
+    parser.add_argument('--baseline', help='compare against a saved baseline')
+    parser.add_argument('--threshold', type=float, default=0.2,
+                        help='allowed relative growth of p95 latency and queries per request')
+    parser.add_argument('--min-delta-ms', type=float, default=1.0,
+                        help='ignore p95 regressions smaller than this')
+    return parser.parse_args()
+
+
+def load_collection():
+    with open(COLLECTION_PATH) as f:
+        collection = json.load(f)
+
+    requests = {}
+
+    def walk(items):
+        for item in items:
+            if 'item' in item:
+                walk(item['item'])
+                continue
+
+            request = item['request']
+            url = request['url']['raw'] if isinstance(request['url'], dict) else request['url']
+            path = urlsplit(url).path
+            shape = re.sub(r'/\d+', '/{}', path)
+            if shape != path and shape not in PATH_PARAMS:
+                raise SystemExit(f"No PATH_PARAMS entry for {shape} ({item['name']})")
+
+            # Postman bodies here carry // comments, which JSON does not allow.
+            raw = re.sub(r'(^|\s)//.*$', '', (request.get('body') or {}).get('raw', ''), flags=re.MULTILINE)
+            requests[item['name']] = {
+                'method': request['method'],
+                'shape': shape,
+                'body': json.loads(raw) if raw.strip() else None
+            }
+
+    walk(collection['item'])
+    return requests
+
+
+class Dataset:
+    # A sample of enrolled students with the ids reachable from their courses.
+
+    def __init__(self, students, seed):
+        with app.app_context():
+            rows = db.session.execute(text("""
+                SELECT cr.stud_id, cr.course_id
+                FROM (SELECT userid FROM user WHERE role = 'student' ORDER BY RAND(:seed) LIMIT :students) s
+                JOIN course_registration cr ON cr.stud_id = s.userid
+            """), {'students': students, 'seed': seed}).fetchall()
+            if not rows:
+                raise SystemExit('Load data_generation.py output first')
+
+            self.student_courses = {}
+            for stud_id, course_id in rows:
+                self.student_courses.setdefault(stud_id, []).append(course_id)
+            self.students = sorted(self.student_courses)
+            self.all_courses = [row[0] for row in db.session.execute(text("SELECT course_id FROM course")).fetchall()]
+
+            course_ids = sorted({course_id for _, course_id in rows})
+            self.lecturers = self._by_course("SELECT course_id, lecturer_id FROM course WHERE course_id IN :ids", course_ids)
+            self.forums = self._by_course("SELECT course_id, forum_id FROM forum WHERE course_id IN :ids", course_ids)
+            self.assignments = self._by_course("SELECT course_id, assign_id FROM assignment WHERE course_id IN :ids", course_ids)
+            self.threads = self._by_course("""
+                SELECT f.course_id, t.thread_id FROM forum f JOIN discussion_thread t ON t.forum_id = f.forum_id
+                WHERE f.course_id IN :ids
+            """, course_ids)
+
+    @staticmethod
+    def _by_course(sql, course_ids):
+        by_course = {}
+        for start in range(0, len(course_ids), 1000):
+            statement = text(sql).bindparams(bindparam('ids', expanding=True))
+            for course_id, value in db.session.execute(statement, {'ids': course_ids[start:start + 1000]}).fetchall():
+                by_course.setdefault(course_id, []).append(value)
+        return by_course
+
+    def context(self, rng, role, password):
+        student_id = rng.choice(self.students)
+        course_id = rng.choice(self.student_courses[student_id])
+        lecturer_id = (self.lecturers.get(course_id) or [None])[0]
+        actor = lecturer_id if role == 'lecturer' else student_id
+        return {
+            'actor': actor,
+            'role': role,
+            'userid': actor,
+            'student_id': student_id,
+            'stud_id': student_id,
+            'created_by': actor,
+            'user_id': actor,
+            'lecturer_id': lecturer_id,
+            # Enrollment targets any course; the student's own courses give the 400 path.
+            'course_id': rng.choice(self.all_courses) if rng.random() < 0.5 else course_id,
+            'forum_id': rng.choice(self.forums.get(course_id) or [0]),
+            'thread_id': rng.choice(self.threads.get(course_id) or [0]),
+            'assign_id': rng.choice(self.assignments.get(course_id) or [0]),
+            'password': password,
+            'grade': rng.randint(40, 100),
+            'submission_url': f'https://bench.example.com/{student_id}',
+            'reply_text': 'Benchmark reply',
+        }
+
+
+def build_request(spec, ctx):
+    params = iter(PATH_PARAMS.get(spec['shape'], ()))
+    path = re.sub(r'\{\}', lambda _: str(ctx[next(params)]), spec['shape'])
+
+    body = None
+    if spec['body'] is not None:
+        body = {key: ctx.get(key, value) for key, value in spec['body'].items()}
+    return spec['method'], path, body
+
+
+class Client:
+    # One per worker thread: a Flask test client, or a keep-alive HTTP connection.
+
+    def __init__(self, base_url):
+        if base_url:
+            parts = urlsplit(base_url)
+            self.connection = http.client.HTTPConnection(parts.hostname, parts.port or 80, timeout=30)
+        else:
+            self.test_client = app.test_client()
+
+    def send(self, method, path, body, headers):
+        if hasattr(self, 'test_client'):
+            return self.test_client.open(path, method=method, json=body, headers=headers).status_code
+
+        payload = json.dumps(body) if body is not None else None
+        if payload is not None:
+            headers = dict(headers, **{'Content-Type': 'application/json'})
+        self.connection.request(method, path, body=payload, headers=headers)
+        response = self.connection.getresponse()
+        response.read()
+        return response.status
+
+
+query_counter = threading.local()
+
+
+def count_queries(*_):
+    query_counter.count = getattr(query_counter, 'count', 0) + 1
+
+
+def run_scenario(name, collection, dataset, args):
+    steps = SCENARIOS[name]
+    names = [step[0] for step in steps]
+    weights = [step[1] for step in steps]
+    roles = {step[0]: step[2] for step in steps}
+    tokens = {}
+    samples = {}
+    lock = threading.Lock()
+
+    def worker(index, count, measured):
+        rng = random.Random(f'{args.seed}:{name}:{index}:{measured}')
+        client = Client(args.base_url)
+        for _ in range(count):
+            route = rng.choices(names, weights)[0]
+            ctx = dataset.context(rng, roles[route], args.password)
+            method, path, body = build_request(collection[route], ctx)
+
+            token = tokens.get(ctx['actor'])
+            if token is None:
+                token = tokens[ctx['actor']] = issue_token(ctx['actor'], ctx['role'])
+
+            query_counter.count = 0
+            started = time.perf_counter()
+            status = client.send(method, path, body, {'Authorization': f'Bearer {token}'})
+            elapsed = (time.perf_counter() - started) * 1000
+
+            if measured:
+                with lock:
+                    samples.setdefault(route, []).append((elapsed, query_counter.count, status))
+
+    def run(total, measured):
+        threads = [
+            threading.Thread(target=worker, args=(n, total // args.concurrency + (n < total % args.concurrency), measured))
+            for n in range(args.concurrency)
+        ]
+        started = time.perf_counter()
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        return time.perf_counter() - started
+
+    run(args.warmup, False)
+    wall = run(args.requests, True)
+
+    results = {}
+    for route, route_samples in samples.items():
+        latencies = sorted(sample[0] for sample in route_samples)
+        statuses = [sample[2] for sample in route_samples]
+        results[route] = {
+            'requests': len(route_samples),
+            'rps': len(route_samples) / wall,
+            'p50_ms': percentile(latencies, 50),
+            'p95_ms': percentile(latencies, 95),
+            'p99_ms': percentile(latencies, 99),
+            'queries': None if args.base_url else sum(sample[1] for sample in route_samples) / len(route_samples),
+            '4xx': sum(400 <= status < 500 for status in statuses),
+            '5xx': sum(status >= 500 for status in statuses),
+        }
+    return results, args.requests / wall
+
+
+def percentile(ordered, pct):
+    return ordered[min(len(ordered) - 1, int(len(ordered) * pct / 100))]
+
+
+def regressions(results, baseline, args):
+    found = []
+    for key, result in results.items():
+        before = baseline.get(key)
+        if not before:
+            continue
+        if (result['p95_ms'] > before['p95_ms'] * (1 + args.threshold)
+                and result['p95_ms'] - before['p95_ms'] > args.min_delta_ms):
+            found.append(f"{key}: p95 {before['p95_ms']:.2f}ms -> {result['p95_ms']:.2f}ms")
+        if (result['queries'] is not None and before.get('queries') is not None
+                and result['queries'] > before['queries'] * (1 + args.threshold) + 0.5):
+            found.append(f"{key}: queries/request {before['queries']:.1f} -> {result['queries']:.1f}")
+    return found
+
+
+def main():
+    args = parse_args()
+    collection = load_collection()
+    dataset = Dataset(args.students, args.seed)
+
+    if not args.base_url:
+        with app.app_context():
+            event.listen(db.engine, 'before_cursor_execute', count_queries)
+
+    results = {}
+    for name in args.scenarios.split(','):
+        scenario, throughput = run_scenario(name, collection, dataset, args)
+        print(f"\n{name}: {throughput:.1f} req/s over {args.requests} requests, concurrency {args.concurrency}")
+        print(f"{'route':<48}{'n':>6}{'req/s':>8}{'p50':>8}{'p95':>8}{'p99':>8}{'queries':>9}{'4xx':>6}{'5xx':>6}")
+        for route, result in sorted(scenario.items()):
+            queries = f"{result['queries']:.1f}" if result['queries'] is not None else '-'
+            print(f"{route[:47]:<48}{result['requests']:>6}{result['rps']:>8.1f}{result['p50_ms']:>8.2f}"
+                  f"{result['p95_ms']:>8.2f}{result['p99_ms']:>8.2f}{queries:>9}{result['4xx']:>6}{result['5xx']:>6}")
+            results[f'{name}/{route}'] = result
+
+    if args.save:
+        with open(args.save, 'w') as f:
+            json.dump(results, f, indent=2)
+
+    if args.baseline:
+        with open(args.baseline) as f:
+            found = regressions(results, json.load(f), args)
+        for problem in found:
+            print(f"REGRESSION {problem}")
+        if found:
+            sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,126 @@
+# Measures DB round trips, commits and latency for every write route.
+#
+# Runs the app in-process against DATABASE_URL (a database loaded with
+# data_generation.py) and replays a create-everything flow per iteration. To get
+# before/after numbers, run it once against an older checkout and compare:
+#
+#   git worktree add /tmp/before <rev>
+#   python scripts/bench_write_roundtrips.py --app-dir /tmp/before --save before.json ...
+#   python scripts/bench_write_roundtrips.py --compare before.json ...
+
+import argparse
+import json
+import os
+import statistics
+import sys
+import time
+import uuid
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Write-route round trip benchmark")
+    parser.add_argument('--app-dir', default=os.path.join(os.path.dirname(__file__), '..'))
+    parser.add_argument('--admin', type=int, default=1)
+    parser.add_argument('--lecturer', type=int, default=4)
+    parser.add_argument('--student', type=int, default=44)
+    parser.add_argument('--iterations', type=int, default=50)
+    parser.add_argument('--save')
+    parser.add_argument('--compare')
+    return parser.parse_args()
+
+
+def main():
+    args = parse_args()
+    sys.path.insert(0, os.path.abspath(args.app_dir))
+
+    from sqlalchemy import event
+    from app import app, db, issue_token
+
+    counters = {'statements': 0, 'commits': 0}
+
+    with app.app_context():
+        engine = db.engine
+
+    @event.listens_for(engine, 'before_cursor_execute')
+    def count_statement(*_):
+        counters['statements'] += 1
+
+    @event.listens_for(engine, 'commit')
+    def count_commit(*_):
+        counters['commits'] += 1
+
+    client = app.test_client()
+    tokens = {
+        'admin': issue_token(args.admin, 'admin'),
+        'lecturer': issue_token(args.lecturer, 'lecturer'),
+        'student': issue_token(args.student, 'student')
+    }
+    samples = {}
+
+    def call(route, role, path, body):
+        headers = {'Authorization': f'Bearer {tokens[role]}'} if role else {}
+        counters['statements'] = counters['commits'] = 0
+        started = time.perf_counter()
+        response = client.post(path, json=body, headers=headers)
+        elapsed = (time.perf_counter() - started) * 1000
+
+        if response.status_code >= 400:
+            raise SystemExit(f'{route} failed with {response.status_code}: {response.get_data(as_text=True)}')
+
+        samples.setdefault(route, []).append((counters['statements'], counters['commits'], elapsed))
+        return response.get_json()
+
+    for i in range(args.iterations):
+        tag = uuid.uuid4().hex[:12]
+
+        call('register', None, '/register', {'name': f'bench-{tag}', 'password': 'bench', 'role': 'student'})
+        course_id = call('create_course', 'admin', '/courses', {
+            'course_name': f'Bench {tag}', 'lecturer_id': args.lecturer
+        })['course_id']
+        call('register_course', 'student', '/register-student', {'stud_id': args.student, 'course_id': course_id})
+        call('create_event', 'admin', '/calendar', {
+            'event_title': 'Bench', 'event_date': '2025-05-01 10:00:00', 'course_id': course_id
+        })
+        section_id = call('create_section', 'lecturer', f'/sections/{course_id}', {
+            'section_title': 'Week 1'
+        })['section_id']
+        call('create_content', 'lecturer', f'/content/{course_id}', {
+            'content_title': 'Slides', 'content_url': 'https://example.com', 'content_type': 'slide',
+            'section_id': section_id
+        })
+        forum_id = call('create_forum', 'lecturer', f'/forum/{course_id}', {'forum_title': 'General'})['forum_id']
+        thread_id = call('create_thread', 'student', f'/threads/{forum_id}', {'dis_title': 'Question'})['thread_id']
+        call('create_reply', 'lecturer', f'/threads/{thread_id}/replies', {'reply_text': 'Answer'})
+        assign_id = call('create_assignment', 'lecturer', f'/assignments/{course_id}', {
+            'title': 'Bench', 'description': 'Bench', 'due_date': '2025-05-01 23:59:00'
+        })['assign_id']
+        call('submit_assignment', 'student', f'/assignment/{assign_id}/submit', {'submission_url': 'https://example.com'})
+        call('grade_assignment', 'lecturer', f'/assignment/{assign_id}/grade', {'student_id': args.student, 'grade': 90})
+
+    results = {}
+    for route, route_samples in samples.items():
+        statements, commits, latencies = zip(*route_samples)
+        results[route] = {
+            'statements': statistics.mean(statements),
+            'commits': statistics.mean(commits),
+            'p50_ms': statistics.median(latencies)
+        }
+
+    baseline = {}
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)
+
+    print(f"{'route':<20}{'statements':>12}{'commits':>10}{'p50 ms':>10}{'before':>22}")
+    for route, result in results.items():
+        before = baseline.get(route)
+        before_text = f"{before['statements']:.1f} / {before['p50_ms']:.2f}ms" if before else ''
+        print(f"{route:<20}{result['statements']:>12.1f}{result['commits']:>10.1f}{result['p50_ms']:>10.2f}{before_text:>22}")
+
+    if args.save:
+        with open(args.save, 'w') as f:
+            json.dump(results, f, indent=2)
+
+
+if __name__ == '__main__':
+    main()
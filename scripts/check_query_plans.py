@@ -0,0 +1,251 @@
+# Query-plan regression check: runs EXPLAIN on every SQL statement in app.py and
+# ingest.py against a loaded database and fails on full table scans or filesorts.
+#
+# Statements are collected from the text(...) calls in those files, so a new query is
+# covered as soon as it is written. SQL built as an f-string is rendered for one row:
+# a `values` or `cases` list joined from a per-row f-string becomes its first item, and
+# other interpolated names take the representative value in FSTRING_VALUES. A text()
+# call that cannot be rendered fails the check. Bind parameters are filled with real ids
+# sampled from the database. Load data_generation.py output and run `flask db upgrade`
+# first; on near-empty tables MySQL prefers scans and the check is meaningless.
+#
+#   python scripts/check_query_plans.py            # exits 1 on any regression
+#
+# tests/test_query_plans.py runs the same check per statement under pytest when
+# QUERY_PLAN_DATABASE_URL points at such a database.
+
+import argparse
+import ast
+import os
+import re
+import sys
+from datetime import datetime
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from sqlalchemy import text, bindparam
+
+SOURCES = [os.path.join(os.path.dirname(__file__), '..', name) for name in ('app.py', 'ingest.py')]
+
+# Values for names interpolated into f-string SQL that the function does not build itself.
+FSTRING_VALUES = {
+    ('upsert_counts', 'table'): 'course_stats',
+    ('upsert_counts', 'key_column'): 'course_id',
+    ('upsert_counts', 'count_column'): 'student_count',
+}
+
+# Functions whose statements are not checked, with the reason.
+UNCHECKED = {
+    'rebuild_stats': 'maintenance command that rebuilds whole tables by design',
+}
+
+# Handlers whose plans sort by design, with the reason the sort is bounded.
+ALLOWED_FILESORT = {
+    'search': 'ranks matches by computed relevance; only full-text hits are sorted',
+    'nested_replies': 'orders one page of roots plus their subtrees',
+    'student_agenda': 'merges the per-course (course_id, event_date) ranges of one student',
+    'dashboard_events': 'merges the (course_id, event_date) ranges of one user\'s courses',
+    'dashboard_content': 'orders a few rows per course of one user',
+    'get_student_dashboard': 'merges the open assignments of one student\'s courses by due date',
+    'get_lecturer_dashboard': 'merges the open assignments of one lecturer\'s courses by due date',
+}
+
+SAMPLE_QUERIES = {
+    'course_id': "SELECT course_id FROM course_registration GROUP BY course_id ORDER BY COUNT(*) DESC LIMIT 1",
+    'student_id': "SELECT stud_id FROM course_registration LIMIT 1",
+    'lecturer_id': "SELECT lecturer_id FROM course WHERE lecturer_id IS NOT NULL LIMIT 1",
+    'assign_id': "SELECT assign_id FROM assignment LIMIT 1",
+    'forum_id': "SELECT forum_id FROM forum LIMIT 1",
+    'thread_id': "SELECT thread_id FROM thread_reply GROUP BY thread_id ORDER BY COUNT(*) DESC LIMIT 1",
+    'reply_id': "SELECT reply_id FROM thread_reply LIMIT 1",
+}
+
+ALIASES = {
+    'stud_id': 'student_id',
+    'userid': 'student_id',
+    'created_by': 'student_id',
+    'user_id': 'student_id',
+    'parent_reply_id': 'reply_id',
+}
+
+FIXED = {
+    'after': 0,
+    'after_id': 0,
+    'after_at': '1000-01-01 00:00:00',
+    'after_score': 1e308,
+    'after_kind': '',
+    'limit': 51,
+    'per_course': 5,
+    'fetch': 51,
+    'key': 1,
+    'count': 1,
+    'until_at': None,
+    'until_id': None,
+    'snippet_length': 200,
+    'min_students': 50,
+    'min_courses': 5,
+    'grade': 90,
+    'q': 'project',
+    'resource': 'sections',
+    'role': 'student',
+}
+
+DATETIME_PARAMS = {'start', 'end', 'replied_at', 'submitted_at', 'created_at', 'event_date', 'due_date'}
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="EXPLAIN every statement in app.py")
+    parser.add_argument('--min-rows', type=int, default=1000,
+                        help='ignore full scans the optimizer estimates below this many rows')
+    parser.add_argument('--verbose', action='store_true')
+    return parser.parse_args()
+
+
+class UncollectableStatement(Exception):
+    pass
+
+
+def joined_items(function, name):
+    # The per-row f-string and loop variable of `name = '...'.join(f'...' for n in ...)`.
+    for node in ast.walk(function):
+        if (isinstance(node, ast.Assign) and [ast.unparse(target) for target in node.targets] == [name]
+                and isinstance(node.value, ast.Call) and isinstance(node.value.func, ast.Attribute)
+                and node.value.func.attr == 'join' and node.value.args
+                and isinstance(node.value.args[0], ast.GeneratorExp)):
+            generator = node.value.args[0]
+            if isinstance(generator.elt, ast.JoinedStr) and isinstance(generator.generators[0].target, ast.Name):
+                return generator.elt, generator.generators[0].target.id
+    return None, None
+
+
+def render(function, node, bound=None):
+    bound = bound or {}
+    parts = []
+    for value in node.values:
+        if isinstance(value, ast.Constant):
+            parts.append(value.value)
+            continue
+
+        name = ast.unparse(value.value)
+        if name in bound:
+            parts.append(bound[name])
+        elif (function.name, name) in FSTRING_VALUES:
+            parts.append(FSTRING_VALUES[function.name, name])
+        else:
+            item, index = joined_items(function, name)
+            if item is None:
+                raise UncollectableStatement(f'{function.name}:{node.lineno}: cannot render {{{name}}}')
+            parts.append(render(function, item, dict(bound, **{index: '0'})))
+    return ''.join(parts)
+
+
+def collect_statements():
+    statements = []
+    for path in SOURCES:
+        with open(path) as f:
+            tree = ast.parse(f.read())
+
+        for function in ast.walk(tree):
+            if not isinstance(function, ast.FunctionDef) or function.name in UNCHECKED:
+                continue
+            for node in ast.walk(function):
+                if not (isinstance(node, ast.Call) and isinstance(node.func, ast.Name) and node.func.id == 'text'):
+                    continue
+                location = f'{os.path.basename(path)}:{node.lineno}'
+                sql = node.args[0] if node.args else None
+                if isinstance(sql, ast.Constant):
+                    statements.append((function.name, location, sql.value))
+                elif isinstance(sql, ast.JoinedStr):
+                    statements.append((function.name, location, render(function, sql)))
+                else:
+                    raise UncollectableStatement(f'{location} {function.name}: SQL is not a literal or f-string')
+    return statements
+
+
+def checked_statements():
+    return [(function, location, sql) for function, location, sql in collect_statements()
+            if re.match(r'\s*(WITH|SELECT|INSERT|UPDATE|DELETE)', sql, re.IGNORECASE) and 'LAST_INSERT_ID' not in sql]
+
+
+def sample_params(db):
+    samples = {}
+    for name, sql in SAMPLE_QUERIES.items():
+        samples[name] = db.session.execute(text(sql)).scalar() or 1
+    return samples
+
+
+def param_value(name, samples):
+    # Per-row parameters of a multi-row statement, such as stud_id_0, as their column.
+    name = re.sub(r'_\d+$', '', name)
+    if name in FIXED:
+        return FIXED[name]
+    if name in DATETIME_PARAMS:
+        return datetime(2025, 4, 1)
+    name = ALIASES.get(name, name)
+    if name in samples:
+        return samples[name]
+    if name.endswith('_id') or name.endswith('_ids'):
+        return 1
+    return 'sample'
+
+
+def explain(db, sql, samples):
+    statement = text(f"EXPLAIN {sql}")
+    params = {}
+    for name in set(re.findall(r'(?<!:):(\w+)', sql)):
+        if re.search(rf'IN\s+:{name}\b', sql):
+            statement = statement.bindparams(bindparam(name, expanding=True))
+            params[name] = [param_value(name[:-1] if name.endswith('s') else name, samples)]
+        else:
+            params[name] = param_value(name, samples)
+    return db.session.execute(statement, params).mappings().fetchall()
+
+
+def problems(plan, min_rows):
+    found = []
+    for row in plan:
+        table = row['table'] or ''
+        extra = row['Extra'] or ''
+        if row['type'] == 'ALL' and not table.startswith('<') and (row['rows'] or 0) >= min_rows:
+            found.append(f"full table scan on {table} (~{row['rows']} rows)")
+        if 'Using filesort' in extra:
+            found.append(f"filesort on {table or 'result'}")
+    return found
+
+
+def statement_problems(db, function, sql, samples, min_rows):
+    found = problems(explain(db, sql, samples), min_rows)
+    if function in ALLOWED_FILESORT:
+        found = [problem for problem in found if not problem.startswith('filesort')]
+    return found
+
+
+def main():
+    args = parse_args()
+
+    from app import app, db
+
+    failures = 0
+    with app.app_context():
+        samples = sample_params(db)
+        for function, location, sql in checked_statements():
+            try:
+                found = statement_problems(db, function, sql, samples, args.min_rows)
+            except Exception as e:
+                db.session.rollback()
+                print(f"ERROR {location} {function}: {e}")
+                failures += 1
+                continue
+
+            if found:
+                failures += 1
+                print(f"FAIL  {location} {function}: {'; '.join(found)}")
+            elif args.verbose:
+                print(f"ok    {location} {function}")
+
+    print(f"{failures} statement(s) with plan regressions")
+    sys.exit(1 if failures else 0)
+
+
+if __name__ == '__main__':
+    main()
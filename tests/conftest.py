@@ -0,0 +1,74 @@
+import os
+import sys
+import tempfile
+import pytest
+from sqlalchemy import text
+
+# app.py reads its configuration at import time. The tests run against SQLite, with
+# TIMESTAMP columns converted to datetimes as the MySQL driver does.
+DATABASE_PATH = os.path.join(tempfile.mkdtemp(prefix='course-management-tests-'), 'test.db')
+os.environ['DATABASE_URL'] = f'sqlite:///{DATABASE_PATH}?detect_types=1'
+os.environ['SECRET_KEY'] = 'test-secret-key-with-at-least-32-bytes'
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import app as app_module  # noqa: E402
+from cache import LRUBackend  # noqa: E402
+
+# The tables the tested routes touch, in SQLite syntax.
+SCHEMA = """
+CREATE TABLE user (userid INTEGER PRIMARY KEY, name TEXT UNIQUE, email TEXT, role TEXT, password TEXT);
+CREATE TABLE course (course_id INTEGER PRIMARY KEY, course_name TEXT, lecturer_id INTEGER);
+CREATE TABLE course_registration (stud_id INTEGER, course_id INTEGER, PRIMARY KEY (stud_id, course_id));
+CREATE TABLE assignment (assign_id INTEGER PRIMARY KEY, course_id INTEGER, title TEXT, description TEXT,
+                         due_date TIMESTAMP);
+CREATE TABLE submission (assign_id INTEGER, stud_id INTEGER, grade NUMERIC, submission_url TEXT,
+                         submitted_at TIMESTAMP, PRIMARY KEY (assign_id, stud_id));
+CREATE TABLE calendar_event (event_id INTEGER PRIMARY KEY, event_title TEXT, event_date TIMESTAMP,
+                             course_id INTEGER);
+CREATE TABLE course_content (content_id INTEGER PRIMARY KEY, content_title TEXT, content_url TEXT,
+                             content_type TEXT, section_id INTEGER, course_id INTEGER);
+CREATE TABLE forum (forum_id INTEGER PRIMARY KEY, course_id INTEGER, forum_title TEXT);
+CREATE TABLE discussion_thread (thread_id INTEGER PRIMARY KEY, forum_id INTEGER, dis_title TEXT, created_by INTEGER,
+                                reply_count INTEGER NOT NULL DEFAULT 0, last_activity_at TIMESTAMP);
+CREATE TABLE thread_reply (reply_id INTEGER PRIMARY KEY, thread_id INTEGER, user_id INTEGER, reply_text TEXT,
+                           replied_at TIMESTAMP, parent_reply_id INTEGER);
+CREATE TABLE course_stats (course_id INTEGER PRIMARY KEY, student_count INTEGER);
+CREATE TABLE resource_version (course_id INTEGER, resource TEXT, version INTEGER NOT NULL DEFAULT 0,
+                               PRIMARY KEY (course_id, resource));
+"""
+
+
+@pytest.fixture
+def app():
+    with app_module.app.app_context():
+        for statement in SCHEMA.split(';'):
+            if statement.strip():
+                table = statement.split()[2]
+                app_module.db.session.execute(text(f'DROP TABLE IF EXISTS {table}'))
+                app_module.db.session.execute(text(statement))
+        app_module.db.session.commit()
+
+    app_module.response_cache.backend = LRUBackend()
+    for cache in (app_module.course_cache, app_module.assignment_course_cache, app_module.thread_forum_cache):
+        cache.clear()
+    yield app_module.app
+
+
+@pytest.fixture
+def client(app):
+    return app.test_client()
+
+
+@pytest.fixture
+def execute(app):
+    def execute(sql, params=None):
+        with app.app_context():
+            result = app_module.db.session.execute(text(sql), params or {})
+            app_module.db.session.commit()
+            return result
+    return execute
+
+
+def auth(userid, role):
+    return {'Authorization': f'Bearer {app_module.issue_token(userid, role)}'}
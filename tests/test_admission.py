@@ -0,0 +1,153 @@
+import asyncio
+import threading
+import time
+import pytest
+from flask import Flask
+import admission as admission_module
+from admission import AdmissionController, PriorityClass, Shed
+from metrics import Registry
+
+
+@pytest.fixture
+def controller(monkeypatch):
+    # Keeps the controllers' gauges out of the app's registry.
+    monkeypatch.setattr(admission_module, 'registry', Registry())
+
+    def controller(limit=2, app=None, **kwargs):
+        classes = [PriorityClass('critical', 0, share=1.0, queue=4, max_wait=1),
+                   PriorityClass('low', 1, share=0.5, queue=1, max_wait=0.05)]
+        kwargs.setdefault('routes', {'exempt': None, 'report': 'low'})
+        return AdmissionController(app or Flask(__name__), classes, default_class='critical', initial_limit=limit,
+                                   min_limit=1, max_limit=8, **kwargs)
+    return controller
+
+
+def release(controller, name, endpoint='view'):
+    controller.release(controller.classes[name], endpoint, 0.01, 0.0, 0)
+
+
+def test_classes_fill_only_their_share(controller):
+    admission = controller(limit=4)
+    low = admission.classes['low']
+    admission.acquire(low, 'report')
+    admission.acquire(low, 'report')
+
+    with pytest.raises(Shed) as shed:
+        admission.acquire(low, 'report')
+    assert (shed.value.status, shed.value.reason) == (503, 'timeout')
+    assert shed.value.retry_after >= 1
+
+    critical = admission.classes['critical']
+    admission.acquire(critical, 'login')
+    admission.acquire(critical, 'login')
+    assert (critical.in_flight, low.in_flight) == (2, 2)
+
+
+def test_full_queue_is_shed_at_once(controller):
+    admission = controller(limit=1)
+    low = admission.classes['low']
+    admission.acquire(low, 'report')
+    low.waiting = low.queue
+
+    started = time.monotonic()
+    with pytest.raises(Shed) as shed:
+        admission.acquire(low, 'report')
+    assert shed.value.reason == 'queue_full'
+    assert time.monotonic() - started < 0.05
+
+
+def test_route_limit(controller):
+    admission = controller(limit=8, route_limits={'report': 1})
+    low = admission.classes['low']
+    admission.acquire(low, 'report')
+
+    with pytest.raises(Shed) as shed:
+        admission.acquire(low, 'report')
+    assert (shed.value.status, shed.value.reason) == (429, 'route_limit')
+
+
+def test_waiting_higher_class_goes_first(controller):
+    admission = controller(limit=2)
+    critical, low = admission.classes['critical'], admission.classes['low']
+    admission.acquire(critical, 'view')
+    admission.acquire(critical, 'view')
+
+    admitted = []
+    waiter = threading.Thread(target=lambda: (admission.acquire(critical, 'view'), admitted.append('critical')))
+    waiter.start()
+    while not critical.waiting:
+        time.sleep(0.001)
+
+    # A low request arriving now does not take the slot the waiting critical one needs.
+    release(admission, 'critical')
+    waiter.join(1)
+    assert admitted == ['critical']
+    with pytest.raises(Shed):
+        admission.acquire(low, 'report')
+
+
+def test_limit_adapts_to_database_latency(controller):
+    admission = controller(limit=4, target_latency=0.05)
+
+    admission._adjust({'db_time': 1.0, 'queries': 10, 'saturated': True})
+    assert admission.limit == pytest.approx(3.6)
+
+    admission._adjust({'db_time': 0.1, 'queries': 10, 'saturated': True})
+    assert admission.limit == pytest.approx(4.6)
+
+    admission._adjust({'db_time': 0.1, 'queries': 10, 'saturated': False})
+    admission._adjust({'db_time': 0.0, 'queries': 0, 'saturated': True})
+    assert admission.limit == pytest.approx(4.6)
+
+    for _ in range(50):
+        admission._adjust({'db_time': 10.0, 'queries': 1, 'saturated': False})
+    assert admission.limit == admission.min_limit
+
+
+def test_async_acquire_queues_off_the_event_loop(controller):
+    admission = controller(limit=1)
+    critical = admission.classes['critical']
+    admission.acquire(critical, 'view')
+
+    async def run():
+        waiter = asyncio.ensure_future(admission.acquire_async(critical, 'view'))
+        await asyncio.sleep(0.05)
+        assert not waiter.done() and critical.waiting == 1
+        release(admission, 'critical')
+        await asyncio.wait_for(waiter, 1)
+
+    asyncio.run(run())
+    assert critical.in_flight == 1
+
+
+def test_cancelled_async_waiter_gives_its_slot_back(controller):
+    admission = controller(limit=1)
+    critical = admission.classes['critical']
+    admission.acquire(critical, 'view')
+
+    async def run():
+        waiter = asyncio.ensure_future(admission.acquire_async(critical, 'view'))
+        await asyncio.sleep(0.05)
+        waiter.cancel()
+        release(admission, 'critical')
+        await asyncio.sleep(0.05)
+
+    asyncio.run(run())
+    assert (critical.in_flight, admission._in_flight) == (0, 0)
+
+
+def test_shed_requests_get_retry_after(controller):
+    app = Flask(__name__)
+    admission = controller(limit=1, app=app)
+    app.add_url_rule('/report', 'report', lambda: 'ok')
+    app.add_url_rule('/exempt', 'exempt', lambda: 'ok')
+    admission.acquire(admission.classes['critical'], 'view')
+
+    response = app.test_client().get('/report')
+    assert response.status_code == 503
+    assert int(response.headers['Retry-After']) >= 1
+    assert app.test_client().get('/exempt').status_code == 200
+
+    release(admission, 'critical')
+    assert app.test_client().get('/report').status_code == 200
+    assert admission.classes['low'].in_flight == 0
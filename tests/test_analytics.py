@@ -0,0 +1,45 @@
+import math
+import numpy as np
+import pytest
+from analytics import PERCENTILES, grade_distributions
+
+
+def test_summaries_per_group():
+    groups = [0, 0, 0, 1, 1, 0]
+    grades = [50, 70, math.nan, 90, 100, 80]
+
+    first, second = grade_distributions(groups, grades, 2, [5, 2])
+
+    assert (first['expected'], first['submitted'], first['missing'], first['graded'], first['ungraded']) == (5, 4, 1, 3, 1)
+    assert (first['mean'], first['median'], first['min'], first['max']) == (66.67, 70, 50, 80)
+    assert first['std'] == round(float(np.std([50, 70, 80])), 2)
+    assert (second['mean'], second['median'], second['missing']) == (95, 95, 0)
+
+
+def test_percentiles_match_numpy():
+    rng = np.random.default_rng(7)
+    groups = rng.integers(0, 4, 500)
+    grades = rng.uniform(0, 100, 500).round(2)
+
+    summaries = grade_distributions(groups, grades, 4, 125)
+
+    for group, summary in enumerate(summaries):
+        values = grades[groups == group]
+        for p in PERCENTILES:
+            # Rounded to cents, so only equal up to the rounding of the last digit.
+            assert summary['percentiles'][f'p{p}'] == pytest.approx(np.percentile(values, p), abs=0.006)
+
+
+def test_histogram_buckets():
+    summary, = grade_distributions([0, 0, 0, 0], [0, 9.99, 10, 120], 1, 4, bucket=25)
+
+    assert [(b['from'], b['to'], b['count']) for b in summary['histogram']] == [
+        (0, 25, 3), (25, 50, 0), (50, 75, 0), (75, 100, 1)]
+
+
+def test_groups_without_grades():
+    empty, ungraded = grade_distributions([1], [math.nan], 2, 3)
+
+    assert (empty['submitted'], empty['missing'], empty['mean'], empty['median']) == (0, 3, None, None)
+    assert (ungraded['submitted'], ungraded['ungraded'], ungraded['max']) == (1, 1, None)
+    assert all(b['count'] == 0 for b in ungraded['histogram'])
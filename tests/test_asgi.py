@@ -0,0 +1,93 @@
+import asyncio
+import json
+import os
+import pytest
+from conftest import DATABASE_PATH, auth
+
+pytest.importorskip('aiosqlite')
+os.environ.setdefault('ASYNC_DATABASE_URL', f'sqlite+aiosqlite:///{DATABASE_PATH}')
+
+import asgi_app  # noqa: E402
+
+
+@pytest.fixture
+def enrolled(execute):
+    execute("INSERT INTO user VALUES (1, 'student', 's@example.com', 'student', ''), "
+            "(2, 'lecturer', 'l@example.com', 'lecturer', '')")
+    execute("INSERT INTO course VALUES (10, 'Algebra', 2)")
+    execute("INSERT INTO course_registration VALUES (1, 10)")
+
+
+def call(path, headers=None, query=''):
+    scope = {'type': 'http', 'method': 'GET', 'path': path, 'query_string': query.encode(),
+             'headers': [(name.lower().encode(), value.encode()) for name, value in (headers or {}).items()]}
+    messages = []
+
+    async def receive():
+        return {'type': 'http.request', 'body': b'', 'more_body': False}
+
+    async def send(message):
+        messages.append(message)
+
+    async def run():
+        try:
+            await asgi_app.application(scope, receive, send)
+        finally:
+            # Pooled connections belong to this event loop.
+            await asgi_app.engine.dispose()
+
+    asyncio.run(run())
+    start, body = messages
+    return start['status'], dict(start['headers']), json.loads(body['body'])
+
+
+@pytest.mark.parametrize('path, endpoint', [
+    ('/courses/student/1', 'get_student_courses'),
+    ('/course-members/10', 'get_course_members'),
+    ('/calendar/student/1', 'get_student_agenda'),
+    ('/threads/5/replies', 'thread_replies'),
+])
+def test_hot_routes_are_served_natively_with_admission_on(path, endpoint):
+    handler, _, matched = asgi_app.match({'method': 'GET', 'path': path, 'query_string': b'', 'headers': []})
+
+    assert asgi_app.admission is not None
+    assert asgi_app.admission.class_for(endpoint) is not None
+    assert (handler.__module__, matched) == ('asgi_app', endpoint)
+
+
+def test_native_requests_take_an_admission_slot(enrolled, monkeypatch):
+    admission = asgi_app.admission
+    released = []
+    release = admission.release
+    monkeypatch.setattr(admission, 'release', lambda cls, endpoint, *args: (
+        released.append((endpoint, admission._in_flight)), release(cls, endpoint, *args)))
+
+    status, _, body = call('/courses/student/1', auth(1, 'student'))
+
+    assert status == 200
+    assert body == [{'course_id': 10, 'course_name': 'Algebra'}]
+    assert released == [('get_student_courses', 1)]
+    assert admission._in_flight == 0
+
+
+def test_native_requests_are_shed(enrolled, monkeypatch):
+    monkeypatch.setitem(asgi_app.admission.route_limits, 'get_course_members', 0)
+
+    status, headers, body = call('/course-members/10')
+
+    assert status == 429
+    assert int(headers[b'retry-after']) >= 1
+    assert body == {'message': 'Too many concurrent requests for this route'}
+
+
+def test_both_modes_return_the_same_page(client, enrolled, execute):
+    # One more student than a non-streamed page may hold.
+    students = [{'userid': userid, 'name': f'student {userid}'}
+                for userid in range(100, 100 + asgi_app.MAX_PAGE_SIZE + 1)]
+    execute("INSERT INTO user VALUES (:userid, :name, '', 'student', '')", students)
+    execute("INSERT INTO course_registration VALUES (:userid, 10)", students)
+    status, _, body = call('/course-members/10', query=f'limit={asgi_app.MAX_PAGE_SIZE + 2}')
+
+    assert status == 200
+    assert len(body['students']) == asgi_app.MAX_PAGE_SIZE + 2
+    assert body == client.get(f'/course-members/10?limit={asgi_app.MAX_PAGE_SIZE + 2}').get_json()
@@ -0,0 +1,57 @@
+import os
+import subprocess
+import sys
+import pytest
+from conftest import auth
+
+
+@pytest.fixture
+def forum(execute):
+    execute("INSERT INTO user VALUES (1, 'student', 's@example.com', 'student', ''), "
+            "(2, 'other', 'o@example.com', 'student', '')")
+    execute("INSERT INTO course VALUES (10, 'Algebra', NULL)")
+    execute("INSERT INTO forum VALUES (5, 10, 'General')")
+
+
+@pytest.mark.parametrize('path, body', [
+    ('/forum/10', {'forum_title': 'General'}),
+    ('/threads/5', {'dis_title': 'Question'}),
+    ('/threads/1/replies', {'reply_text': 'Answer'}),
+    ('/calendar', {'event_title': 'Lab', 'event_date': '2025-05-01 10:00:00', 'course_id': 10}),
+])
+def test_writes_require_a_token(client, forum, path, body):
+    assert client.post(path, json=body).status_code == 401
+
+
+def test_thread_and_reply_authors_come_from_the_token(client, forum, execute):
+    response = client.post('/threads/5', json={'dis_title': 'Question'}, headers=auth(1, 'student'))
+    assert response.status_code == 200
+    thread_id = response.get_json()['thread_id']
+
+    response = client.post(f'/threads/{thread_id}/replies', json={'reply_text': 'Answer', 'user_id': 1},
+                           headers=auth(1, 'student'))
+    assert response.status_code == 200
+
+    assert execute('SELECT created_by FROM discussion_thread').scalar() == 1
+    assert execute('SELECT user_id FROM thread_reply').scalar() == 1
+
+
+def test_posting_as_someone_else_is_forbidden(client, forum, execute):
+    response = client.post('/threads/5', json={'dis_title': 'Question', 'created_by': 2}, headers=auth(1, 'student'))
+    assert response.status_code == 403
+
+    execute("INSERT INTO discussion_thread (thread_id, forum_id, dis_title, created_by) VALUES (7, 5, 'Q', 2)")
+    response = client.post('/threads/7/replies', json={'reply_text': 'Answer', 'user_id': 2},
+                           headers=auth(1, 'student'))
+    assert response.status_code == 403
+    assert execute('SELECT COUNT(*) FROM thread_reply').scalar() == 0
+
+
+def test_app_refuses_to_start_without_a_secret_key():
+    # Empty rather than unset, so a developer's .env does not fill it in.
+    env = dict(os.environ, SECRET_KEY='')
+    result = subprocess.run([sys.executable, '-c', 'import app'], cwd=os.path.dirname(os.path.dirname(__file__)),
+                            env=env, capture_output=True, text=True)
+
+    assert result.returncode != 0
+    assert 'SECRET_KEY must be set' in result.stderr
@@ -0,0 +1,51 @@
+import pytest
+from flask import request
+import app as app_module
+from conftest import auth
+
+
+@pytest.fixture
+def replica_reads(app, monkeypatch):
+    # Pretends a replica is configured and records which reads would be sent to it.
+    routed = []
+    monkeypatch.setattr(app_module.replica_router, 'binds', ['replica_0'])
+    monkeypatch.setattr(app_module.replica_router, 'choose', lambda: routed.append(request.path))
+    return routed
+
+
+def batch(client, *items):
+    response = client.post('/batch', json={'requests': list(items)}, headers=auth(1, 'student'))
+    assert response.status_code == 200
+    return [item['status'] for item in response.get_json()['responses']]
+
+
+def test_reads_after_a_write_stay_on_the_primary(client, replica_reads):
+    statuses = batch(
+        client,
+        {'method': 'GET', 'path': '/courses/student/1'},
+        {'method': 'POST', 'path': '/register', 'body': {}},
+        {'method': 'GET', 'path': '/courses/student/1?limit=1'},
+    )
+
+    assert statuses == [200, 400, 200]
+    assert replica_reads == ['/courses/student/1']
+
+
+def test_parallel_reads_after_a_write_stay_on_the_primary(client, replica_reads):
+    statuses = batch(
+        client,
+        {'method': 'GET', 'path': '/courses/student/1'},
+        {'method': 'GET', 'path': '/courses/student/1?limit=1'},
+        {'method': 'POST', 'path': '/register', 'body': {}},
+        {'method': 'GET', 'path': '/courses/student/1?limit=2'},
+        {'method': 'GET', 'path': '/courses/student/1?limit=3'},
+    )
+
+    assert statuses == [200, 200, 400, 200, 200]
+    assert sorted(replica_reads) == ['/courses/student/1', '/courses/student/1']
+
+
+def test_batch_items_are_validated(client, app):
+    statuses = batch(client, {'method': 'TRACE', 'path': '/courses'}, {'path': 'courses'}, {'path': '/batch'})
+
+    assert statuses == [400, 400, 400]
@@ -0,0 +1,138 @@
+import time
+import pytest
+from sqlalchemy import create_engine, text
+import app as app_module
+from cache import LRUBackend, ResponseCache, TTLCache
+from conftest import auth
+
+
+def test_ttl_cache_expires_entries():
+    cache = TTLCache(ttl=0.01)
+    cache.set('course', 1)
+    assert cache.get('course') == 1
+
+    time.sleep(0.02)
+    assert cache.get('course') is None
+    assert cache.stats()['hits'] == 1
+
+
+def test_ttl_cache_evicts_least_recently_used():
+    cache = TTLCache(maxsize=2)
+    cache.set('a', 1)
+    cache.set('b', 2)
+    cache.get('a')
+    cache.set('c', 3)
+
+    assert cache.get('b') is None
+    assert cache.get('a') == 1 and cache.get('c') == 3
+
+
+def test_lru_backend_is_bounded_by_bytes():
+    backend = LRUBackend(max_bytes=10)
+    backend.set('a', b'12345', 60)
+    backend.set('b', b'12345', 60)
+    backend.set('c', b'12345', 60)
+
+    assert backend.get('a') is None
+    assert backend.size == 10
+    backend.set('huge', b'x' * 11, 60)
+    assert backend.get('huge') is None
+
+
+def test_response_cache_round_trip():
+    cache = ResponseCache(LRUBackend())
+    generations = cache.snapshot(['course:1'])
+    cache.set('/forum/1?', 200, [('Content-Type', 'application/json')], b'{"forums":[]}', generations)
+
+    entry = cache.get('forum', '/forum/1?')
+    assert entry['status'] == 200
+    assert entry['body'].encode('latin-1') == b'{"forums":[]}'
+    assert cache.stats()['routes']['forum'] == {'hits': 1, 'misses': 0, 'hit_ratio': 1.0}
+
+
+def test_invalidating_a_tag_makes_its_entries_stale():
+    cache = ResponseCache(LRUBackend())
+    cache.set('one', 200, [], b'1', cache.snapshot(['course:1']))
+    cache.set('two', 200, [], b'2', cache.snapshot(['course:2']))
+
+    cache.invalidate('course:1')
+
+    assert cache.get('forum', 'one') is None
+    assert cache.get('forum', 'two') is not None
+
+
+def test_entry_built_during_an_invalidation_is_stale():
+    cache = ResponseCache(LRUBackend())
+    generations = cache.snapshot(['course:1'])
+    cache.invalidate('course:1')
+    cache.set('one', 200, [], b'1', generations)
+
+    assert cache.get('forum', 'one') is None
+
+
+def test_recording_collects_invalidated_tags():
+    cache = ResponseCache(LRUBackend())
+    with cache.recording() as tags:
+        cache.invalidate('course:1', 'forum:2')
+    cache.invalidate('course:3')
+
+    assert tags == {'course:1', 'forum:2'}
+
+
+@pytest.fixture
+def lecturer_courses(execute):
+    execute("INSERT INTO course VALUES (10, 'Algebra', 2), (11, 'Biology', 3)")
+
+
+def test_cached_lecturer_courses_are_not_served_to_other_users(client, lecturer_courses):
+    response = client.get('/courses/lecturer/2', headers=auth(2, 'lecturer'))
+    assert response.status_code == 200
+    assert [course['course_id'] for course in response.get_json()] == [10]
+
+    # The owner's response is cached now; other users must still be refused.
+    assert client.get('/courses/lecturer/2', headers=auth(3, 'lecturer')).status_code == 403
+    assert client.get('/courses/lecturer/2', headers=auth(4, 'student')).status_code == 403
+    assert client.get('/courses/lecturer/2').status_code == 401
+
+
+def test_responses_read_from_a_replica_expire_within_the_replica_lag(client, lecturer_courses, monkeypatch):
+    # The "replica" is the test database under another bind name.
+    with client.application.app_context():
+        monkeypatch.setitem(app_module.db.engines, 'replica_0', app_module.db.engine)
+    monkeypatch.setattr(app_module.replica_router, 'binds', ['replica_0'])
+    monkeypatch.setattr(app_module.replica_router, 'choose', lambda: 'replica_0')
+    stored = []
+    backend = app_module.response_cache.backend
+    monkeypatch.setattr(backend, 'set', lambda key, value, ttl: stored.append(ttl))
+
+    assert client.get('/courses/lecturer/2', headers=auth(2, 'lecturer')).status_code == 200
+    assert stored == [app_module.replica_router.max_lag]
+
+    monkeypatch.setattr(app_module.replica_router, 'choose', lambda: None)
+    assert client.get('/courses/lecturer/2?limit=1', headers=auth(2, 'lecturer')).status_code == 200
+    assert stored[1] == app_module.response_cache.ttl
+
+
+def test_conditional_get_on_a_lagging_replica_is_decided_on_the_primary(client, execute, tmp_path, monkeypatch):
+    # The "replica" is a second database still at an older version of the course list.
+    replica = create_engine(f'sqlite:///{tmp_path / "replica.db"}')
+    with replica.begin() as connection:
+        connection.execute(text('CREATE TABLE course (course_id INTEGER PRIMARY KEY, course_name TEXT, lecturer_id INTEGER)'))
+        connection.execute(text('CREATE TABLE resource_version (course_id INTEGER, resource TEXT, version INTEGER)'))
+        connection.execute(text("INSERT INTO resource_version VALUES (0, 'courses', 1)"))
+    execute("INSERT INTO resource_version VALUES (0, 'courses', 2)")
+    execute("INSERT INTO course VALUES (10, 'Algebra', 2)")
+    with client.application.app_context():
+        monkeypatch.setitem(app_module.db.engines, 'replica_0', replica)
+    monkeypatch.setattr(app_module.replica_router, 'binds', ['replica_0'])
+    monkeypatch.setattr(app_module.replica_router, 'choose', lambda: 'replica_0')
+
+    stale = client.get('/courses').headers['ETag'].strip('"')
+    assert '-1-' in stale
+    assert client.get('/courses', headers={'If-None-Match': stale}).status_code == 200
+
+    current = stale.replace('-1-', '-2-')
+    response = client.get('/courses', headers={'If-None-Match': current})
+    assert response.status_code == 304
+    assert response.headers['ETag'].strip('"') == current
+    replica.dispose()
@@ -0,0 +1,31 @@
+import pytest
+from conftest import auth
+
+
+@pytest.fixture
+def calendar(execute):
+    execute("INSERT INTO course VALUES (10, 'Algebra', 2), (11, 'Biology', 2)")
+    execute("INSERT INTO course_registration VALUES (1, 10)")
+    execute("INSERT INTO calendar_event VALUES (1, 'Lab', '2025-02-03 10:00:00', 10), "
+            "(2, 'Exam', '2025-02-04 09:00:00', 11), (3, 'Later', '2025-03-01 09:00:00', 10)")
+
+
+def test_student_agenda(client, calendar):
+    response = client.get('/calendar/student/1?from=2025-02-01&to=2025-02-10', headers=auth(1, 'student'))
+
+    assert response.status_code == 200
+    assert [event['event_id'] for event in response.get_json()['events']] == [1]
+
+
+def test_student_events_of_a_day(client, calendar):
+    response = client.get('/calendar/student/1/2025-02-03', headers=auth(1, 'student'))
+
+    assert response.status_code == 200
+    assert [event['event_id'] for event in response.get_json()['events']] == [1]
+
+
+@pytest.mark.parametrize('path', ['/calendar/student/1', '/calendar/student/1/2025-02-03'])
+def test_student_calendar_is_private(client, calendar, path):
+    assert client.get(path).status_code == 401
+    assert client.get(path, headers=auth(5, 'student')).status_code == 403
+    assert client.get(path, headers=auth(2, 'lecturer')).status_code == 403
@@ -0,0 +1,41 @@
+from datetime import datetime, timedelta
+import pytest
+import app as app_module
+from conftest import auth
+
+
+@pytest.fixture
+def enrolled(execute, monkeypatch):
+    now = datetime.utcnow().replace(microsecond=0)
+    execute("INSERT INTO user VALUES (1, 'student', 's@example.com', 'student', ''), "
+            "(2, 'lecturer', 'l@example.com', 'lecturer', '')")
+    execute("INSERT INTO course VALUES (10, 'Algebra', 2), (11, 'Biology', 2)")
+    execute("INSERT INTO course_registration VALUES (1, 10), (1, 11)")
+    execute("INSERT INTO assignment VALUES (100, 10, 'Homework', '', :soon), (101, 11, 'Essay', '', :later)",
+            {'soon': now + timedelta(days=2), 'later': now + timedelta(days=3)})
+    execute("INSERT INTO submission VALUES (100, 1, 88.5, 'https://example.com/1', :now)", {'now': now})
+    execute("INSERT INTO calendar_event VALUES (1, 'Lab', :date, 11)", {'date': now + timedelta(days=1)})
+    # The content query uses a LATERAL join, which SQLite does not have.
+    monkeypatch.setattr(app_module, 'dashboard_content', lambda course_ids: [])
+    return now
+
+
+def test_student_dashboard(client, enrolled):
+    response = client.get('/dashboard/student/1', headers=auth(1, 'student'))
+
+    assert response.status_code == 200
+    body = response.get_json()
+    assert [course['course_id'] for course in body['courses']] == [10, 11]
+    assert [(a['assign_id'], a['status']) for a in body['assignments']] == [(100, 'graded'), (101, 'not_submitted')]
+    assert [event['event_id'] for event in body['events']] == [1]
+    # Events and assignments both use ISO 8601 dates.
+    assert body['events'][0]['event_date'] == (enrolled + timedelta(days=1)).isoformat()
+    assert body['assignments'][0]['due_date'] == (enrolled + timedelta(days=2)).isoformat()
+
+
+def test_student_dashboard_requires_token(client, enrolled):
+    assert client.get('/dashboard/student/1').status_code == 401
+
+
+def test_student_dashboard_of_another_student(client, enrolled):
+    assert client.get('/dashboard/student/1', headers=auth(3, 'student')).status_code == 403
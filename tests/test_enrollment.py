@@ -0,0 +1,47 @@
+import pytest
+from sqlalchemy import event
+import app as app_module
+from conftest import auth
+
+
+@pytest.fixture
+def statements(app, monkeypatch):
+    # SQLite has neither FOR UPDATE nor INSERT IGNORE; the statements are recorded as the
+    # app writes them and run in SQLite's dialect.
+    seen = []
+
+    def translate(conn, cursor, statement, parameters, context, executemany):
+        seen.append(' '.join(statement.split()))
+        statement = statement.replace('FOR UPDATE', '').replace('INSERT IGNORE', 'INSERT OR IGNORE')
+        return statement, parameters
+
+    with app.app_context():
+        engine = app_module.db.engine
+    event.listen(engine, 'before_cursor_execute', translate, retval=True)
+    # The stats upserts use ON DUPLICATE KEY UPDATE.
+    monkeypatch.setattr(app_module, 'record_enrollments', lambda pairs: None)
+    yield seen
+    event.remove(engine, 'before_cursor_execute', translate)
+
+
+@pytest.fixture
+def people(execute):
+    execute("INSERT INTO user VALUES (1, 'admin', '', 'admin', ''), (10, 'a', '', 'student', ''), "
+            "(11, 'b', '', 'student', ''), (20, 'lecturer', '', 'lecturer', '')")
+    execute("INSERT INTO course VALUES (100, 'Algebra', 20), (101, 'Biology', 20)")
+    execute("INSERT INTO course_registration VALUES (10, 100)")
+
+
+def test_bulk_enrollment_locks_only_the_chunk_pairs(client, people, statements, execute):
+    registrations = [{'stud_id': 10, 'course_id': 100}, {'stud_id': 11, 'course_id': 101},
+                     {'stud_id': 20, 'course_id': 100}, {'stud_id': 11, 'course_id': 999}, {'stud_id': 'x'}]
+
+    response = client.post('/register-students', json={'registrations': registrations}, headers=auth(1, 'admin'))
+
+    assert [result['status'] for result in response.get_json()['results']] == [
+        'already_registered', 'registered', 'not_a_student', 'course_not_found', 'invalid']
+    locks = [statement for statement in statements if 'FOR UPDATE' in statement]
+    assert locks == ['SELECT stud_id, course_id FROM course_registration '
+                     'WHERE (stud_id, course_id) IN ((?, ?), (?, ?)) FOR UPDATE']
+    assert execute('SELECT stud_id, course_id FROM course_registration ORDER BY stud_id').fetchall() == [
+        (10, 100), (11, 101)]
@@ -0,0 +1,34 @@
+from decimal import Decimal
+import pytest
+from app import parse_grade_row
+from conftest import auth
+
+
+@pytest.mark.parametrize('row, parsed', [
+    ([1, 90], (1, Decimal('90'))),
+    (('7', ' 88.5 '), (7, Decimal('88.5'))),
+    (['1', '999.99'], (1, Decimal('999.99'))),
+])
+def test_parse_grade_row(row, parsed):
+    assert parse_grade_row(row) == parsed
+
+
+@pytest.mark.parametrize('row', ['95', '12', b'12', {'student_id': 1, 'grade': 2}, [1], [1, 2, 3],
+                                 [None, 90], [1, None], [1, 'A'], [1, -1], [1, 1000], [1, 'NaN']])
+def test_parse_grade_row_rejects(row):
+    assert parse_grade_row(row) is None
+
+
+@pytest.fixture
+def assignment(execute):
+    execute("INSERT INTO course VALUES (10, 'Algebra', 2)")
+    execute("INSERT INTO assignment VALUES (100, 10, 'Homework', '', '2025-02-03 10:00:00')")
+
+
+@pytest.mark.parametrize('body', ['["95", "87"]', '[95]', '{"student_id": 1, "grade": 90}', ''])
+def test_bulk_grading_rejects_malformed_uploads(client, assignment, body):
+    response = client.post('/assignment/100/grades', data=body, content_type='application/json',
+                           headers=auth(2, 'lecturer'))
+
+    assert response.status_code == 400
+    assert response.get_json()['error']
@@ -0,0 +1,37 @@
+import time
+import pytest
+from werkzeug.security import generate_password_hash
+from hashing import HashingBusy, PasswordHasher
+
+
+def test_timed_out_hash_keeps_its_slot_until_it_finishes():
+    hasher = PasswordHasher(workers=1, queue_depth=0, timeout=0.05)
+
+    with pytest.raises(HashingBusy):
+        hasher._run(time.sleep, 0.5)
+    # The sleep is still running in the pool, so its slot is still taken.
+    assert not hasher._slots.acquire(blocking=False)
+
+    time.sleep(0.6)
+    assert hasher._run(abs, -1) == 1
+
+
+def test_hash_and_verify():
+    hasher = PasswordHasher(method='pbkdf2:sha256:1000', workers=1, queue_depth=1)
+    pwhash = hasher.hash('secret')
+
+    assert hasher.verify(pwhash, 'secret') and not hasher.verify(pwhash, 'wrong')
+    assert not hasher.needs_rehash(pwhash)
+
+
+@pytest.mark.parametrize('method', ['scrypt', 'pbkdf2:sha256', 'pbkdf2:sha256:1000'])
+def test_hashes_of_the_configured_method_are_not_rehashed(method):
+    # Werkzeug writes the method's default parameters into the hash.
+    assert not PasswordHasher(method=method).needs_rehash(generate_password_hash('secret', method))
+
+
+def test_hashes_of_another_method_are_rehashed():
+    pwhash = generate_password_hash('secret', 'pbkdf2:sha256:1000')
+
+    assert PasswordHasher(method='scrypt').needs_rehash(pwhash)
+    assert PasswordHasher(method='pbkdf2:sha256:2000').needs_rehash(pwhash)
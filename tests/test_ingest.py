@@ -0,0 +1,67 @@
+import json
+import os
+import socket
+import time
+import pytest
+import app as app_module
+from ingest import SubmissionQueue
+from conftest import auth
+
+
+def wait_for(condition, timeout=2.0):
+    deadline = time.monotonic() + timeout
+    while not condition():
+        if time.monotonic() > deadline:
+            raise AssertionError('timed out')
+        time.sleep(0.01)
+
+
+@pytest.fixture
+def queue(tmp_path, monkeypatch):
+    queue = SubmissionQueue(app_module.app, app_module.db, str(tmp_path), flush_interval=0.01)
+    stored = []
+    monkeypatch.setattr(queue, 'store', stored.extend)
+    queue.stored = stored
+    return queue
+
+
+def record(assign_id, stud_id):
+    return {'receipt_id': f'{assign_id}-{stud_id}', 'assign_id': assign_id, 'stud_id': stud_id,
+            'submission_url': 'https://example.com', 'submitted_at': '2025-02-03T10:00:00'}
+
+
+def test_start_replays_logs_of_dead_processes(queue, tmp_path):
+    orphan = tmp_path / f'submissions-{socket.gethostname()}-999999.wal'
+    orphan.write_bytes(b''.join(json.dumps(record(1, n)).encode() + b'\n' for n in (1, 2)) + b'{"cut sh')
+
+    queue.start()
+
+    wait_for(lambda: len(queue.stored) == 2)
+    assert [r['stud_id'] for r in queue.stored] == [1, 2]
+    wait_for(lambda: not orphan.exists())
+
+
+def test_queued_submissions_are_stored_in_order(queue):
+    queue.start()
+    first = queue.enqueue(1, 1, 'https://example.com/a')
+    assert queue.enqueue(1, 1, 'https://example.com/b') is None
+    queue.enqueue(1, 2, 'https://example.com/c')
+
+    wait_for(lambda: len(queue.stored) == 2)
+    assert queue.stored[0] == first
+    wait_for(lambda: queue.queued(1, 1) is None)
+    wait_for(lambda: os.path.getsize(queue.path) == 0)
+
+
+def test_direct_submissions_are_stored_in_whole_seconds(client, execute, monkeypatch):
+    monkeypatch.setattr(app_module, 'submission_queue', None)
+    execute("INSERT INTO user VALUES (1, 'student', '', 'student', '')")
+    execute("INSERT INTO course VALUES (10, 'Algebra', NULL)")
+    execute("INSERT INTO course_registration VALUES (1, 10)")
+    execute("INSERT INTO assignment VALUES (100, 10, 'Homework', '', '2025-03-01 00:00:00')")
+
+    response = client.post('/assignment/100/submit', json={'submission_url': 'https://example.com'},
+                           headers=auth(1, 'student'))
+
+    assert response.status_code == 201
+    assert execute('SELECT submitted_at FROM submission').scalar().microsecond == 0
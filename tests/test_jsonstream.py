@@ -0,0 +1,78 @@
+import importlib.util
+import json
+import sys
+from datetime import date, datetime
+from decimal import Decimal
+import pytest
+import jsonstream
+
+
+@pytest.fixture(params=['orjson', 'json'])
+def encoder(request, monkeypatch):
+    if request.param == 'orjson':
+        if jsonstream.orjson is None:
+            pytest.skip('orjson is not installed')
+        return jsonstream
+
+    # A second copy of the module, loaded as if orjson were missing.
+    monkeypatch.setitem(sys.modules, 'orjson', None)
+    spec = importlib.util.spec_from_file_location('jsonstream_fallback', jsonstream.__file__)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    assert module.orjson is None
+    return module
+
+
+def document(chunks):
+    return json.loads(b''.join(chunks))
+
+
+def test_bare_array(encoder):
+    rows = [(1, 'Algebra'), (2, 'Biology')]
+
+    assert document(encoder.encode_rows(rows, ('course_id', 'course_name'))) == [
+        {'course_id': 1, 'course_name': 'Algebra'}, {'course_id': 2, 'course_name': 'Biology'}]
+
+
+def test_empty_rows(encoder):
+    assert document(encoder.encode_rows([], ('course_id',))) == []
+    assert document(encoder.encode_rows([], ('course_id',), key='courses')) == {'courses': []}
+
+
+def test_object_with_head_and_tail(encoder):
+    seen = []
+
+    def rows():
+        yield (1,)
+        seen.append('rows done')
+
+    def tail():
+        assert seen == ['rows done']
+        return {'next_cursor': 'abc'}
+
+    body = document(encoder.encode_rows(rows(), ('student_id',), key='students', head={'lecturer': None}, tail=tail))
+
+    assert body == {'lecturer': None, 'students': [{'student_id': 1}], 'next_cursor': 'abc'}
+    assert list(body) == ['lecturer', 'students', 'next_cursor']
+
+
+def test_dates_and_decimals(encoder):
+    rows = [(datetime(2025, 2, 3, 10, 30), date(2025, 2, 3), Decimal('88.50'), 'naïve')]
+
+    assert document(encoder.encode_rows(rows, ('at', 'on', 'grade', 'name'))) == [
+        {'at': '2025-02-03T10:30:00', 'on': '2025-02-03', 'grade': 88.5, 'name': 'naïve'}]
+
+
+def test_rows_are_encoded_in_chunks(encoder):
+    rows = [(n, 'x' * 20) for n in range(100)]
+
+    chunks = list(encoder.encode_rows(rows, ('id', 'name'), chunk_size=256))
+
+    assert len(chunks) > 5
+    assert all(len(chunk) < 256 + 64 for chunk in chunks)
+    assert [row['id'] for row in document(chunks)] == list(range(100))
+
+
+def test_unknown_types_are_rejected(encoder):
+    with pytest.raises(TypeError):
+        b''.join(encoder.encode_rows([(object(),)], ('value',)))
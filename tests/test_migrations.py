@@ -0,0 +1,16 @@
+import os
+from alembic.config import Config
+from alembic.script import ScriptDirectory
+
+MIGRATIONS_PATH = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'migrations')
+
+
+def test_revisions_form_a_single_chain():
+    config = Config(os.path.join(MIGRATIONS_PATH, 'alembic.ini'))
+    config.set_main_option('script_location', MIGRATIONS_PATH)
+    scripts = ScriptDirectory.from_config(config)
+
+    assert len(scripts.get_heads()) == 1
+    revisions = [script.revision for script in scripts.walk_revisions('base', 'heads')]
+    assert revisions == sorted(revisions, reverse=True)
+    assert revisions[-1] == '0001'
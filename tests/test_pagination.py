@@ -0,0 +1,41 @@
+import base64
+from datetime import datetime
+import pytest
+from app import InvalidCursor, decode_cursor, encode_cursor, next_page
+
+
+def test_cursor_round_trip():
+    token = encode_cursor('2025-02-03 10:00:00', 42)
+
+    assert '=' not in token
+    assert decode_cursor(token, 2) == ['2025-02-03 10:00:00', 42]
+
+
+def test_cursor_encodes_datetimes_as_strings():
+    assert decode_cursor(encode_cursor(datetime(2025, 2, 3, 10, 0), 7), 2) == ['2025-02-03 10:00:00', 7]
+
+
+def b64(raw):
+    return base64.urlsafe_b64encode(raw).decode().rstrip('=')
+
+
+@pytest.mark.parametrize('token', ['not a cursor', '!!!!', b64(b'{"after": 1}'), b64(b'[1, 2]'), b64(b'\xff\xfe'), ''])
+def test_invalid_cursors_are_rejected(token):
+    with pytest.raises(InvalidCursor):
+        decode_cursor(token, 1)
+
+
+def test_next_page_uses_the_extra_row():
+    rows = [(1,), (2,), (3,)]
+
+    assert next_page(rows, 3, lambda row: row) == (rows, None)
+    page, cursor = next_page(rows, 2, lambda row: row)
+    assert page == [(1,), (2,)]
+    assert decode_cursor(cursor, 1) == [2]
+
+
+def test_invalid_cursor_is_a_bad_request(client):
+    response = client.get('/courses?after=garbage')
+
+    assert response.status_code == 400
+    assert response.get_json() == {'message': 'Invalid pagination cursor'}
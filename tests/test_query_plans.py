@@ -0,0 +1,87 @@
+import ast
+import os
+import sys
+from types import SimpleNamespace
+import pytest
+from sqlalchemy import create_engine
+from sqlalchemy.orm import Session
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'scripts'))
+
+import check_query_plans  # noqa: E402
+
+# A MySQL database loaded with data_generation.py output and migrated to head; the plan
+# tests are skipped without one.
+QUERY_PLAN_DATABASE_URL = os.getenv('QUERY_PLAN_DATABASE_URL')
+MIN_ROWS = int(os.getenv('QUERY_PLAN_MIN_ROWS', 1000))
+
+STATEMENTS = check_query_plans.checked_statements()
+
+
+def plan_row(table, type, rows, extra=None):
+    return {'table': table, 'type': type, 'rows': rows, 'Extra': extra}
+
+
+def test_statements_are_collected_from_app():
+    functions = {function for function, _, _ in STATEMENTS}
+
+    assert {'get_courses', 'get_course_members', 'student_agenda', 'enroll_chunk', '_insert'} <= functions
+    assert all(sql.lstrip().split()[0].upper() in ('WITH', 'SELECT', 'INSERT', 'UPDATE', 'DELETE')
+               for _, _, sql in STATEMENTS)
+
+
+def test_fstring_statements_are_rendered_for_one_row():
+    rendered = {function: ' '.join(sql.split()) for function, _, sql in STATEMENTS
+                if function in ('upsert_counts', 'grade_chunk')}
+
+    assert rendered['upsert_counts'].startswith(
+        'INSERT INTO course_stats (course_id, student_count) VALUES (:key_0, :count_0)')
+    assert 'CASE stud_id WHEN :stud_id_0 THEN :grade_0 END' in rendered['grade_chunk']
+    assert all('{' not in sql for _, _, sql in STATEMENTS)
+    assert check_query_plans.param_value('stud_id_0', {'student_id': 3}) == 3
+
+
+def test_statements_that_cannot_be_rendered_fail():
+    function = ast.parse('def f(table):\n    text(f"SELECT * FROM {table}")').body[0]
+
+    with pytest.raises(check_query_plans.UncollectableStatement):
+        check_query_plans.render(function, function.body[0].value.args[0])
+
+
+def test_full_scans_and_filesorts_are_problems():
+    plan = [plan_row('course', 'ALL', 5000), plan_row('user', 'eq_ref', 1, 'Using filesort'),
+            plan_row('small', 'ALL', 10), plan_row('<derived2>', 'ALL', 5000)]
+
+    assert check_query_plans.problems(plan, 1000) == ['full table scan on course (~5000 rows)', 'filesort on user']
+
+
+def test_parameters_get_sampled_or_fixed_values():
+    samples = {'course_id': 7, 'student_id': 3}
+
+    assert check_query_plans.param_value('course_id', samples) == 7
+    assert check_query_plans.param_value('stud_id', samples) == 3
+    assert check_query_plans.param_value('limit', samples) == check_query_plans.FIXED['limit']
+    assert check_query_plans.param_value('forum_id', samples) == 1
+
+
+@pytest.fixture(scope='module')
+def loaded_database():
+    if not QUERY_PLAN_DATABASE_URL:
+        pytest.skip('QUERY_PLAN_DATABASE_URL is not set')
+    engine = create_engine(QUERY_PLAN_DATABASE_URL)
+    with Session(engine) as session:
+        db = SimpleNamespace(session=session)
+        yield db, check_query_plans.sample_params(db)
+    engine.dispose()
+
+
+@pytest.mark.parametrize('function, location, sql', STATEMENTS,
+                         ids=[f'{function}:{location}' for function, location, _ in STATEMENTS])
+def test_query_plan(loaded_database, function, location, sql):
+    db, samples = loaded_database
+    try:
+        found = check_query_plans.statement_problems(db, function, sql, samples, MIN_ROWS)
+    finally:
+        db.session.rollback()
+
+    assert not found, f'{location} {function}: {"; ".join(found)}'
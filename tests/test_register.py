@@ -0,0 +1,33 @@
+import pytest
+import app as app_module
+
+
+@pytest.fixture
+def register(client, monkeypatch):
+    monkeypatch.setattr(app_module.password_hasher, 'hash', lambda password: f'hash of {password}')
+    # SQLite reports a unique violation by message rather than MySQL's error code.
+    monkeypatch.setattr(app_module, 'mysql_error_code', lambda e: app_module.DUPLICATE_KEY
+                        if 'UNIQUE constraint failed: user.name' in str(e.orig) else None)
+
+    def register(name):
+        return client.post('/register', json={'name': name, 'password': 'secret', 'role': 'student'})
+    return register
+
+
+def test_register(register, execute):
+    response = register('ada')
+
+    assert response.status_code == 200
+    userid = response.get_json()['user']['userid']
+    assert execute('SELECT name, password FROM user WHERE userid = :userid', {'userid': userid}).fetchone() == (
+        'ada', 'hash of secret')
+
+
+def test_taken_name_is_rejected_by_the_unique_index(register, execute):
+    assert register('ada').status_code == 200
+
+    response = register('ada')
+
+    assert response.status_code == 400
+    assert response.get_json() == {'message': 'User already exists'}
+    assert execute('SELECT COUNT(*) FROM user').scalar() == 1
@@ -0,0 +1,76 @@
+from datetime import datetime
+import pytest
+
+
+@pytest.fixture
+def members(execute):
+    execute("INSERT INTO user VALUES (2, 'lecturer', 'l@example.com', 'lecturer', '')")
+    for userid in range(10, 15):
+        execute("INSERT INTO user VALUES (:userid, :name, '', 'student', '')",
+                {'userid': userid, 'name': f'student {userid}'})
+    execute("INSERT INTO course VALUES (10, 'Algebra', 2), (11, 'Biology', 2)")
+    execute("INSERT INTO course_registration VALUES (10, 10), (11, 10), (12, 10), (13, 10), (14, 10), (12, 11)")
+
+
+def test_course_members_are_paged_through_the_body_cursor(client, members):
+    pages = []
+    path = '/course-members/10?limit=2'
+    while path:
+        body = client.get(path).get_json()
+        assert body['lecturer'] == {'lecturer_id': 2, 'name': 'lecturer', 'email': 'l@example.com'}
+        pages.append([student['student_id'] for student in body['students']])
+        path = f"/course-members/10?limit=2&after={body['next_cursor']}" if body['next_cursor'] else None
+
+    assert pages == [[10, 11], [12, 13], [14]]
+
+
+def test_last_full_page_has_no_cursor(client, members):
+    body = client.get('/course-members/10?limit=5').get_json()
+
+    assert len(body['students']) == 5
+    assert body['next_cursor'] is None
+
+
+def test_courses_are_paged_through_the_header(client, members):
+    response = client.get('/courses?limit=1')
+
+    assert response.get_json() == [{'course_id': 10, 'course_name': 'Algebra'}]
+    response = client.get(f"/courses?limit=1&after={response.headers['X-Next-Cursor']}")
+    assert response.get_json() == [{'course_id': 11, 'course_name': 'Biology'}]
+    assert 'X-Next-Cursor' not in response.headers
+
+
+def test_replies_are_paged_through_the_header(client, members, execute):
+    # Two replies share a timestamp, so a page boundary falls between them.
+    for reply_id, minute in [(1, 0), (2, 1), (3, 1), (4, 2), (5, 3)]:
+        execute("INSERT INTO thread_reply VALUES (:reply_id, 7, 10, 'text', :at, NULL)",
+                {'reply_id': reply_id, 'at': datetime(2025, 2, 3, 10, minute)})
+    execute("INSERT INTO thread_reply VALUES (6, 8, 10, 'other thread', :at, NULL)", {'at': datetime(2025, 2, 3)})
+
+    pages = []
+    path = '/threads/7/replies?limit=2'
+    while path:
+        response = client.get(path)
+        pages.append([reply['reply_id'] for reply in response.get_json()])
+        cursor = response.headers.get('X-Next-Cursor')
+        path = f'/threads/7/replies?limit=2&after={cursor}' if cursor else None
+
+    assert pages == [[1, 2], [3, 4], [5]]
+    assert client.get('/threads/7/replies?limit=5').get_json()[1]['replied_at'] == '2025-02-03T10:01:00'
+
+
+def test_assignments_are_paged_through_the_body_cursor(client, members, execute):
+    for assign_id in range(100, 105):
+        execute("INSERT INTO assignment VALUES (:assign_id, 10, 'Homework', '', :due)",
+                {'assign_id': assign_id, 'due': datetime(2025, 3, 1)})
+
+    pages = []
+    path = '/assignments/10?limit=2'
+    while path:
+        response = client.get(path)
+        body = response.get_json()
+        assert 'X-Next-Cursor' not in response.headers
+        pages.append([assignment['assign_id'] for assignment in body['assignments']])
+        path = f"/assignments/10?limit=2&after={body['next_cursor']}" if body['next_cursor'] else None
+
+    assert pages == [[100, 101], [102, 103], [104]]